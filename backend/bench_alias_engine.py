@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: linear dictionary scan vs precompiled alias engine in augment_with_chinese.
+
+Usage:
+    python3 backend/bench_alias_engine.py              # dictionaries at 1x, 3x, 10x
+    BENCH_EVENTS=500 BENCH_MAX_SCALE=30 python3 backend/bench_alias_engine.py
+
+Each event augments the entityGroups stored in data.json (or synthetic dictionary-term
+groups when it is missing). Dictionaries are grown with synthetic keys that never
+match, so the output is identical and only the lookup cost changes: the legacy scan
+grows linearly with dictionary size, the compiled engine stays flat.
+"""
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import build_index  # noqa: E402
+
+
+def legacy_augment(entity_groups, entity_map, keyword_map, alias_map):
+    """The pre-engine per-term scan over every dictionary key, kept here as the baseline."""
+    new_entity_groups = []
+    for group in entity_groups:
+        new_group = list(group)
+        group_terms_set = set(build_index._normalize_keyword(t) for t in new_group if t)
+        for term in list(group):
+            term_normalized = build_index._normalize_keyword(term)
+            if not term_normalized:
+                continue
+            term_lower = term_normalized.lower()
+            for key, values in entity_map.items():
+                key_lower = key.lower()
+                if key_lower == term_lower or (len(key_lower) >= 3 and key_lower in term_lower):
+                    for value in values:
+                        normalized = build_index._normalize_keyword(value)
+                        if normalized and normalized not in group_terms_set:
+                            new_group.append(value)
+                            group_terms_set.add(normalized)
+            for mapping in (keyword_map, alias_map):
+                for key, values in mapping.items():
+                    if key.lower() == term_lower:
+                        for value in values:
+                            normalized = build_index._normalize_keyword(value)
+                            if normalized and normalized not in group_terms_set:
+                                new_group.append(value)
+                                group_terms_set.add(normalized)
+        if new_group:
+            new_entity_groups.append(new_group)
+    return new_entity_groups
+
+
+def load_events(count):
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data.json")
+    groups = []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        for event in (data.get("events") or {}).values():
+            # Strip previous augmentation so every event does real work.
+            raw = [[t for t in g if t.isascii()] for g in event.get("entityGroups") or []]
+            raw = [g for g in raw if g]
+            if raw:
+                groups.append(raw)
+    except (OSError, ValueError):
+        pass
+    if not groups:
+        rng = random.Random(0)
+        terms = sorted(build_index.CN_EN_ENTITY_MAP)
+        groups = [[[t] for t in rng.sample(terms, 2)] for _ in range(count)]
+    return (groups * (count // len(groups) + 1))[:count]
+
+
+def grow(mapping, scale, tag):
+    """`mapping` plus (scale - 1) * len(mapping) synthetic keys that match nothing."""
+    grown = dict(mapping)
+    for i in range(len(mapping) * (scale - 1)):
+        grown[f"zq{tag}{i:06d}"] = [f"zq{tag}{i:06d}"]
+    return grown
+
+
+def _per_event_us(fn, events):
+    started = time.perf_counter()
+    for groups in events:
+        fn(groups)
+    return (time.perf_counter() - started) * 1e6 / len(events)
+
+
+def main():
+    n_events = int(os.environ.get("BENCH_EVENTS", "300"))
+    max_scale = int(os.environ.get("BENCH_MAX_SCALE", "10"))
+    scales = [s for s in (1, 3, 10, 30) if s <= max_scale]
+    events = load_events(n_events)
+
+    print(f"{'scale':>5} {'keys':>7} {'impl':<8} {'us/event':>10} {'compile ms':>11}")
+    for scale in scales:
+        maps = (
+            grow(build_index.CN_EN_ENTITY_MAP, scale, "e"),
+            grow(build_index.CN_EN_KEYWORD_MAP, scale, "k"),
+            grow(build_index.ENTITY_ALIAS_MAP, scale, "a"),
+        )
+        keys = sum(len(m) for m in maps)
+
+        started = time.perf_counter()
+        engine = build_index._compile_alias_engine(*maps)
+        compile_ms = (time.perf_counter() - started) * 1000
+
+        legacy = _per_event_us(lambda g: legacy_augment(g, *maps), events)
+        saved = build_index._ALIAS_ENGINE
+        build_index._ALIAS_ENGINE = engine
+        try:
+            for groups in events[:50]:
+                assert build_index.augment_with_chinese([], [], groups)[1] == legacy_augment(groups, *maps)
+            compiled = _per_event_us(lambda g: build_index.augment_with_chinese([], [], g), events)
+        finally:
+            build_index._ALIAS_ENGINE = saved
+
+        print(f"{scale:>5} {keys:>7} {'legacy':<8} {legacy:>10.1f} {'':>11}")
+        print(f"{scale:>5} {keys:>7} {'engine':<8} {compiled:>10.1f} {compile_ms:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: recursive vs iterative market flattening.
+
+Usage:
+    python3 backend/bench_flatten_markets.py            # 10k .. 1M nodes
+    BENCH_MAX_NODES=100000 python3 backend/bench_flatten_markets.py
+
+For each synthetic tree shape it reports wall time per node and the peak extra
+memory (tracemalloc) spent *while walking* the tree. The iterative generator is
+consumed without materializing a list, so its extra memory only depends on depth.
+"""
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import build_index  # noqa: E402
+
+
+def legacy_flatten_markets(node):
+    """The pre-generator recursive implementation, kept here as the baseline."""
+    flattened = []
+
+    if isinstance(node, list):
+        for item in node:
+            flattened.extend(legacy_flatten_markets(item))
+        return flattened
+
+    if not isinstance(node, dict):
+        return flattened
+
+    flattened.append(node)
+    children = node.get("childMarkets")
+    if isinstance(children, list) and children:
+        for child in children:
+            flattened.extend(legacy_flatten_markets(child))
+    return flattened
+
+
+def make_tree(total_nodes, fanout, depth_cap):
+    """Build a list of top-level markets with `total_nodes` dicts in total.
+
+    Each top-level market gets a subtree of branching factor `fanout`, nested at
+    most `depth_cap` levels deep.
+    """
+    roots = []
+    made = 0
+    while made < total_nodes:
+        root = {"marketId": made, "childMarkets": []}
+        made += 1
+        frontier = [(root, 1)]
+        while frontier and made < total_nodes:
+            parent, depth = frontier.pop(0)
+            if depth >= depth_cap:
+                continue
+            for _ in range(fanout):
+                if made >= total_nodes:
+                    break
+                child = {"marketId": made, "childMarkets": []}
+                made += 1
+                parent["childMarkets"].append(child)
+                frontier.append((child, depth + 1))
+        roots.append(root)
+    return roots
+
+
+def make_chain(total_nodes):
+    """A single market nested `total_nodes` levels deep (recursion-limit stress)."""
+    root = {"marketId": 0, "childMarkets": []}
+    cur = root
+    for i in range(1, total_nodes):
+        child = {"marketId": i, "childMarkets": []}
+        cur["childMarkets"].append(child)
+        cur = child
+    return [root]
+
+
+def _measure(fn):
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    count = fn()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return count, elapsed, peak
+
+
+def run_legacy(tree):
+    return len(legacy_flatten_markets(tree))
+
+
+def run_iterative(tree):
+    count = 0
+    for _ in build_index._iter_flatten_markets(tree):
+        count += 1
+    return count
+
+
+def main():
+    max_nodes = int(os.environ.get("BENCH_MAX_NODES", "1000000"))
+    sizes = [n for n in (10_000, 100_000, 1_000_000) if n <= max_nodes]
+    shapes = [
+        ("flat (fanout 0)", lambda n: make_tree(n, fanout=0, depth_cap=1)),
+        ("wide (fanout 8, depth 4)", lambda n: make_tree(n, fanout=8, depth_cap=4)),
+        ("deep (fanout 2, depth 16)", lambda n: make_tree(n, fanout=2, depth_cap=16)),
+    ]
+
+    print(f"{'shape':<28} {'nodes':>9} {'impl':<10} {'ms':>9} {'ns/node':>8} {'peak KiB':>10}")
+    for label, factory in shapes:
+        for n in sizes:
+            tree = factory(n)
+            for impl, fn in (("recursive", run_legacy), ("iterative", run_iterative)):
+                count, elapsed, peak = _measure(lambda: fn(tree))
+                assert count == n, (impl, count, n)
+                print(
+                    f"{label:<28} {n:>9} {impl:<10} {elapsed * 1000:>9.1f} "
+                    f"{elapsed * 1e9 / n:>8.0f} {peak / 1024:>10.1f}"
+                )
+            del tree
+
+    # Pathological depth: the recursive version overflows the interpreter stack.
+    n = min(max_nodes, 100_000)
+    chain = make_chain(n)
+    try:
+        legacy = _measure(lambda: run_legacy(chain))
+        print(f"{'chain':<28} {n:>9} {'recursive':<10} {legacy[1] * 1000:>9.1f}")
+    except RecursionError:
+        print(f"{'chain':<28} {n:>9} {'recursive':<10} {'RecursionError':>9}")
+    count, elapsed, peak = _measure(lambda: run_iterative(chain))
+    assert count == n
+    print(
+        f"{'chain':<28} {n:>9} {'iterative':<10} {elapsed * 1000:>9.1f} "
+        f"{elapsed * 1e9 / n:>8.0f} {peak / 1024:>10.1f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
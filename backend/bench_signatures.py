@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: djb2-over-JSON (pre-v2) vs blake2b (v2) event signatures.
+
+Usage:
+    python3 backend/bench_signatures.py                # 1k .. 100k events
+    BENCH_MAX_EVENTS=10000 python3 backend/bench_signatures.py
+
+Each synthetic event has a title, ~1.2 KB of rules and 8 options; both sigCore and
+sigFull are computed per event, as `build_data` and `build_poly_data` do.
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import build_index  # noqa: E402
+
+
+def make_events(count):
+    rng = random.Random(24)
+    words = "will the fed cut rates bitcoin above election winner market resolve yes no by end of".split()
+    events = []
+    for i in range(count):
+        title = f"Event {i}: " + " ".join(rng.choices(words, k=8)) + "?"
+        rules = " ".join(rng.choices(words, k=300))[:1200]
+        options = [f"Option {i}-{j}" for j in range(8)]
+        events.append((title, [str(j) for j in range(8)], options, rules))
+    return events
+
+
+def run(core_fn, full_fn, events):
+    started = time.perf_counter()
+    for title, market_ids, options, rules in events:
+        core_fn(title, rules)
+        full_fn(title, market_ids, options, rules)
+    return time.perf_counter() - started
+
+
+def main():
+    max_events = int(os.environ.get("BENCH_MAX_EVENTS", "100000"))
+    sizes = [n for n in (1_000, 10_000, 100_000) if n <= max_events]
+    impls = (
+        ("djb2", build_index._legacy_event_signature_core, build_index._legacy_event_signature_full),
+        ("v2", build_index._event_signature_core, build_index._event_signature_full),
+    )
+
+    print(f"{'events':>8} {'impl':<6} {'s':>8} {'us/event':>9}")
+    for n in sizes:
+        events = make_events(n)
+        for impl, core_fn, full_fn in impls:
+            elapsed = run(core_fn, full_fn, events)
+            print(f"{n:>8} {impl:<6} {elapsed:>8.3f} {elapsed * 1e6 / n:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
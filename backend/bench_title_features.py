@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: per-event CPU of the title-derived helpers, with and without TitleFeatures.
+
+Usage:
+    python3 backend/bench_title_features.py
+    BENCH_ROUNDS=20 python3 backend/bench_title_features.py
+
+Each event runs the title work `build_data` does for an event that goes to the LLM:
+the local tier, validation of a response (normalize, invalid terms, repair), the title
+n-gram supplement and the final entityGroups normalization. The "str" column passes
+the title string to every helper, so each one re-derives lowercase/compact/tokens/
+n-grams/allow terms (the behaviour before TitleFeatures); "features" builds one
+TitleFeatures per event and passes it everywhere.
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import build_index as b  # noqa: E402
+
+
+def load_titles():
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data.json")
+    titles = []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        for section in ("events", "markets"):
+            titles.extend(str(v.get("title") or "") for v in (data.get(section) or {}).values())
+    except (OSError, ValueError):
+        pass
+    titles = [t for t in titles if t.strip()]
+    return titles or [
+        "Will the Fed cut rates in March 2026?",
+        "BTC/USDT above $100k by December 31?",
+        "LPL: WBG vs IG (Feb. 25 1:00AM ET)",
+        "Will Kraken IPO before 2027?",
+    ]
+
+
+def response_for(title):
+    """A plausible LLM answer: two title words plus an alias that needs repair."""
+    words = [w for w in title.split() if len(w) > 3][:2]
+    return {"keywords": words, "entities": words, "entityGroups": [[w.lower()] for w in words] + [["bitcoin"]]}
+
+
+def process_event(title, result):
+    """The title-derived work of one event; `title` is a str or a TitleFeatures."""
+    local = b._local_keywords_and_entities(title, ["Yes", "No"])
+    allow_terms = b._title_features(title).allow_terms if isinstance(title, b.TitleFeatures) else {
+        b._normalize_keyword(t) for t in b._allowed_entity_alias_terms_from_title(title)
+    }
+    groups, entities = result["entityGroups"], result["entities"]
+    accepted = b._cascade_accepts(result, title)
+    normalized = b._normalize_entity_groups(groups, title, allow_terms)
+    invalid = b._collect_invalid_entity_terms(groups, entities, title, allow_terms)
+    repaired = b._repair_entity_groups(groups, entities, result["keywords"], title, allow_terms)
+    supplement = b._title_ngram_keywords(title)
+    final = [
+        t for group in (normalized or repaired) for t in group
+        if b._is_valid_entity_term(t) and b._term_is_from_title(t, title, allow_terms)
+    ]
+    return local, accepted, normalized, invalid, repaired, supplement, final
+
+
+def run(titles, results, use_features, rounds):
+    best = float("inf")
+    out = None
+    for _ in range(rounds):
+        started = time.perf_counter()
+        out = [
+            process_event(b.TitleFeatures(t) if use_features else t, r)
+            for t, r in zip(titles, results)
+        ]
+        best = min(best, time.perf_counter() - started)
+    return best, out
+
+
+def main():
+    rounds = int(os.environ.get("BENCH_ROUNDS", "10"))
+    titles = load_titles()
+    results = [response_for(t) for t in titles]
+    # Warm the validator cache so both columns measure the title work only.
+    run(titles, results, False, 1)
+
+    str_s, str_out = run(titles, results, False, rounds)
+    feat_s, feat_out = run(titles, results, True, rounds)
+    assert str_out == feat_out
+
+    n = len(titles)
+    print(f"{'events':>7} {'impl':<9} {'us/event':>9}")
+    print(f"{n:>7} {'str':<9} {str_s * 1e6 / n:>9.1f}")
+    print(f"{n:>7} {'features':<9} {feat_s * 1e6 / n:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: per-character loop vs compiled regex in _simple_tokenize.
+
+Usage:
+    python3 backend/bench_tokenize.py                  # rules text of 1 KB .. 100 KB
+    BENCH_REPEAT=20 python3 backend/bench_tokenize.py
+
+Inputs are built by concatenating the market rules stored in data.json (synthetic
+rules-like text when it is missing) up to each size; both implementations must
+return identical tokens.
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import build_index  # noqa: E402
+
+
+def legacy_simple_tokenize(text):
+    """The pre-regex per-character implementation, kept here as the baseline."""
+    if not text:
+        return []
+    s = str(text)
+    out = []
+    cur = []
+    for i in range(len(s)):
+        ch = s[i]
+        o = ord(ch)
+        is_ascii_alnum = (48 <= o <= 57) or (65 <= o <= 90) or (97 <= o <= 122)
+        if is_ascii_alnum:
+            cur.append(ch.lower())
+            continue
+
+        if ch == "/" and cur:
+            if i + 1 < len(s):
+                nxt = s[i + 1]
+                no = ord(nxt)
+                nxt_is_ascii_alnum = (48 <= no <= 57) or (65 <= no <= 90) or (97 <= no <= 122)
+                if nxt_is_ascii_alnum:
+                    cur.append("/")
+                    continue
+
+        if ch == "-" and cur:
+            if i + 1 < len(s):
+                nxt = s[i + 1]
+                no = ord(nxt)
+                nxt_is_ascii_alnum = (48 <= no <= 57) or (65 <= no <= 90) or (97 <= no <= 122)
+                if nxt_is_ascii_alnum:
+                    cur.append("-")
+                    continue
+
+        if ch == "$":
+            if cur:
+                out.append("".join(cur))
+                cur = []
+            cur.append("$")
+            continue
+
+        if cur:
+            out.append("".join(cur))
+            cur = []
+
+    if cur:
+        out.append("".join(cur))
+    return out
+
+
+def load_corpus():
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data.json")
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        parts = [str(e.get("rules") or "") + " " + str(e.get("title") or "") for e in (data.get("events") or {}).values()]
+        corpus = "\n".join(p for p in parts if p.strip())
+    except (OSError, ValueError):
+        corpus = ""
+    if not corpus:
+        corpus = (
+            "This market will resolve to \"Yes\" if the BTC/USDT 1-minute candle on Binance closes "
+            "above $100,000 (GPT-6 release, 25bps cut) before December 31, 2025 11:59 PM ET. "
+        ) * 10
+    return corpus
+
+
+def _best_ms(fn, text, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(text)
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main():
+    repeat = int(os.environ.get("BENCH_REPEAT", "5"))
+    corpus = load_corpus()
+
+    print(f"{'KB':>5} {'tokens':>7} {'loop ms':>9} {'regex ms':>9} {'speedup':>8}")
+    for kb in (1, 10, 100):
+        size = kb * 1024
+        text = (corpus * (size // len(corpus) + 1))[:size]
+        tokens = build_index._simple_tokenize(text)
+        assert tokens == legacy_simple_tokenize(text)
+        legacy = _best_ms(legacy_simple_tokenize, text, repeat)
+        compiled = _best_ms(build_index._simple_tokenize, text, repeat)
+        print(f"{kb:>5} {len(tokens):>7} {legacy:>9.2f} {compiled:>9.2f} {legacy / compiled:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
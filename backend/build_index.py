@@ -1,12 +1,26 @@
+import codecs
+import functools
+import hashlib
 import json
 import os
 import re
+import threading
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone, timedelta
+from typing import Any, Dict, NamedTuple, Optional
 
 import requests
 import zhipuai
 
+import http_cache
+import http_client
+import llm_cache
+import llm_checkpoint
+import llm_pool
+import replay
+
 
 OPINION_API_URL = os.environ.get("OPINION_API_URL", "").strip() or "http://opinion.api.predictscan.dev:10001/api/markets"
 OPINION_WRAP_EVENTS_URL = "http://opinion.api.predictscan.dev:10001/api/markets/wrap-events"
@@ -22,6 +36,32 @@ FULL_AI_REFRESH = os.environ.get("FULL_AI_REFRESH", "0").strip().lower() in ("1"
 SKIP_AI = os.environ.get("SKIP_AI", "0").strip().lower() in ("1", "true", "yes", "y", "on")
 ZHIPU_TIMEOUT_SECONDS = float(os.environ.get("ZHIPU_TIMEOUT_SECONDS", "30"))
 ZHIPU_MAX_RETRIES = int(os.environ.get("ZHIPU_MAX_RETRIES", "2"))
+# Jittered exponential backoff between LLM retries (a 429 Retry-After hint wins if longer).
+ZHIPU_BACKOFF_BASE_SECONDS = float(os.environ.get("ZHIPU_BACKOFF_BASE_SECONDS", "2"))
+ZHIPU_BACKOFF_MAX_SECONDS = float(os.environ.get("ZHIPU_BACKOFF_MAX_SECONDS", "60"))
+# Dictionary-first tier: titles whose entities the local extractor resolves with at
+# least LOCAL_TIER_MIN_CONFIDENCE (e.g. "X vs Y", known tickers/people/institutions)
+# skip the LLM; everything else is escalated to `generate_keywords`. Any capitalized
+# title word the local groups do not cover escalates, so precision is guarded by the
+# extractor rather than by keeping the tier off; LOCAL_TIER=0 sends every title to the LLM.
+LOCAL_TIER = os.environ.get("LOCAL_TIER", "1").strip().lower() in ("1", "true", "yes", "y", "on")
+LOCAL_TIER_MIN_CONFIDENCE = float(os.environ.get("LOCAL_TIER_MIN_CONFIDENCE", "0.8"))
+# Comma-separated models tried cheapest first (e.g. "glm-4-flash,GLM-4.7"). A lower
+# tier's answer is kept only if its entityGroups validate cleanly; otherwise the event
+# escalates to the next model. Defaults to MODEL_NAME alone.
+MODEL_CASCADE = [m.strip() for m in os.environ.get("LLM_MODEL_CASCADE", "").split(",") if m.strip()] or [MODEL_NAME]
+# When enabled (default), parse the markets payload incrementally and hand flattened
+# market nodes to `build_data` one top-level market at a time instead of holding the
+# whole decoded list in memory.
+STREAM_MARKETS = os.environ.get("STREAM_MARKETS", "1").strip().lower() in ("1", "true", "yes", "y", "on")
+STREAM_CHUNK_BYTES = int(os.environ.get("STREAM_CHUNK_BYTES", "65536"))
+# When enabled (default), skip the rebuild entirely if the markets and wrap-events
+# bodies hash identically to the ones the last successful build consumed, that build
+# left no `needsAi` events, and no market has crossed its cutoffAt in the meantime.
+SKIP_UNCHANGED_BUILD = os.environ.get("SKIP_UNCHANGED_BUILD", "1").strip().lower() in ("1", "true", "yes", "y", "on")
+BUILD_STATE_PATH = os.environ.get("BUILD_STATE_PATH", "").strip() or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), ".cache", "build_index-state.json"
+)
 
 
 # ============================================================================
@@ -515,33 +555,200 @@ def _parse_cutoff_epoch_seconds(value):
     return cutoff
 
 
+_FLATTEN_DONE = object()
+
+
+def _iter_flatten_markets(node):
+    """Yield market nodes depth-first (parent before its `childMarkets`).
+
+    Uses an explicit stack of iterators, so arbitrarily deep trees neither copy
+    intermediate lists nor hit the interpreter recursion limit.
+    """
+    stack = [iter((node,))]
+    while stack:
+        item = next(stack[-1], _FLATTEN_DONE)
+        if item is _FLATTEN_DONE:
+            stack.pop()
+            continue
+        if isinstance(item, list):
+            stack.append(iter(item))
+            continue
+        if not isinstance(item, dict):
+            continue
+        yield item
+        children = item.get("childMarkets")
+        if isinstance(children, list) and children:
+            stack.append(iter(children))
+
+
 def _flatten_markets(node):
-    flattened = []
+    return list(_iter_flatten_markets(node))
 
-    if isinstance(node, list):
-        for item in node:
-            flattened.extend(_flatten_markets(item))
-        return flattened
 
-    if not isinstance(node, dict):
-        return flattened
+_JSON_DECODER = json.JSONDecoder()
+_JSON_WHITESPACE = " \t\n\r"
 
-    flattened.append(node)
-    children = node.get("childMarkets")
-    if isinstance(children, list) and children:
-        for child in children:
-            flattened.extend(_flatten_markets(child))
-    return flattened
 
+def _iter_text_chunks(byte_chunks):
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    for chunk in byte_chunks:
+        if not chunk:
+            continue
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
 
-def fetch_all_markets():
-    """Fetch all markets from Predictscan's Opinion markets API (full list, no auth)."""
+
+class _JsonStreamReader:
+    """Pull-based JSON reader over an iterable of text chunks.
+
+    Only the unconsumed tail of the document is buffered, so reading the items of a
+    large top-level array one at a time keeps memory bounded by the largest item.
+    """
+
+    def __init__(self, text_chunks):
+        self._chunks = iter(text_chunks)
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self, min_chars=1):
+        if self._eof:
+            return False
+        if self._pos:
+            self._buf = self._buf[self._pos :]
+            self._pos = 0
+        added = 0
+        parts = [self._buf]
+        while added < min_chars:
+            try:
+                chunk = next(self._chunks)
+            except StopIteration:
+                self._eof = True
+                break
+            parts.append(chunk)
+            added += len(chunk)
+        self._buf = "".join(parts)
+        return added > 0
+
+    def peek(self):
+        """Return the next non-whitespace character without consuming it ("" at EOF)."""
+        while True:
+            buf = self._buf
+            pos = self._pos
+            while pos < len(buf) and buf[pos] in _JSON_WHITESPACE:
+                pos += 1
+            self._pos = pos
+            if pos < len(buf):
+                return buf[pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, ch):
+        found = self.peek()
+        if found != ch:
+            raise ValueError(f"invalid JSON stream: expected {ch!r}, found {found or 'EOF'!r}")
+        self._pos += 1
+
+    def value(self):
+        """Decode and consume the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                obj, end = _JSON_DECODER.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                # Incomplete value: at least double the buffered tail so that very
+                # large values are re-scanned only O(log n) times.
+                if not self._fill(min_chars=max(len(self._buf) - self._pos, 1)):
+                    raise
+                continue
+            # Bare numbers/literals may continue in the next chunk.
+            if end >= len(self._buf) and not isinstance(obj, (dict, list, str)) and self._fill():
+                continue
+            self._pos = end
+            return obj
+
+
+def _iter_json_array_items(reader):
+    reader.expect("[")
+    if reader.peek() == "]":
+        reader.expect("]")
+        return
+    while True:
+        yield reader.value()
+        if reader.peek() == ",":
+            reader.expect(",")
+            continue
+        reader.expect("]")
+        return
+
+
+def _iter_market_payload_items(reader):
+    """Yield top-level market items from a streamed markets payload.
+
+    Mirrors the API variants accepted by `_markets_from_payload` (list | {data: [...]} |
+    {list: [...]}) with the same precedence: `data` wins when both keys hold lists. A
+    `data` array is streamed; a `list` array is buffered until the rest of the object
+    shows there is no `data` array after it.
+    """
+    head = reader.peek()
+    if head == "[":
+        yield from _iter_json_array_items(reader)
+        return
+
+    if head == "{":
+        reader.expect("{")
+        fallback = None
+        if reader.peek() != "}":
+            while True:
+                key = reader.value()
+                reader.expect(":")
+                if key == "data" and reader.peek() == "[":
+                    yield from _iter_json_array_items(reader)
+                    return
+                value = reader.value()
+                if key == "list" and isinstance(value, list):
+                    fallback = value
+                if reader.peek() == ",":
+                    reader.expect(",")
+                    continue
+                break
+        if fallback is not None:
+            yield from fallback
+            return
+
+    raise ValueError("Predictscan market API error: Invalid response format (expected list)")
+
+
+def fetch_markets_body():
+    """Conditionally download the markets payload to the on-disk HTTP cache."""
     if DEBUG:
         print(f"[debug] fetching markets (full list) from {OPINION_API_URL}", flush=True)
-    response = requests.get(OPINION_API_URL, timeout=30)
-    response.raise_for_status()
-    payload = response.json()
+    return http_cache.fetch(OPINION_API_URL, endpoint="opinion.markets", timeout=30)
+
+
+def iter_all_markets(body=None):
+    """Stream flattened market nodes from Predictscan's Opinion markets API.
+
+    The cached response body is decoded incrementally; each top-level market (plus
+    its `childMarkets`) is flattened and yielded before the next one is parsed.
+    """
+    if body is None:
+        body = fetch_markets_body()
+    reader = _JsonStreamReader(_iter_text_chunks(body.iter_bytes(STREAM_CHUNK_BYTES)))
+    for item in _iter_market_payload_items(reader):
+        yield from _iter_flatten_markets(item)
+
+
+def fetch_all_markets():
+    """Fetch all markets from Predictscan's Opinion markets API (full list, no auth)."""
+    return _markets_from_payload(fetch_markets_body().json())
+
 
+def _markets_from_payload(payload):
     # API variants: list | {data: [...]} | {list: [...]}.
     if isinstance(payload, dict):
         if isinstance(payload.get("data"), list):
@@ -559,9 +766,7 @@ def fetch_parent_events():
     if DEBUG:
         print(f"[debug] fetching parent events from {OPINION_WRAP_EVENTS_URL}", flush=True)
     try:
-        response = requests.get(OPINION_WRAP_EVENTS_URL, timeout=30)
-        response.raise_for_status()
-        payload = response.json()
+        payload = http_cache.fetch(OPINION_WRAP_EVENTS_URL, endpoint="opinion.wrap-events", timeout=30).json()
 
         # Extract data array
         if isinstance(payload, dict) and isinstance(payload.get("data"), list):
@@ -735,6 +940,28 @@ def _extract_json_array(text):
     return keywords
 
 
+def _unwrap_json_code_block(text):
+    """Strip whitespace and, if present, the markdown code fence around a JSON payload."""
+    cleaned = (text or "").strip()
+    if "```" in cleaned:
+        parts = cleaned.split("```")
+        for part in parts:
+            candidate = part.strip()
+            # Try object format first
+            if candidate.startswith("{") and candidate.endswith("}"):
+                return candidate
+            # Try array format (legacy)
+            if candidate.startswith("[") and candidate.endswith("]"):
+                return candidate
+            # Handle json-prefixed code blocks
+            if candidate.startswith("json"):
+                if "{" in candidate and "}" in candidate:
+                    return candidate[candidate.find("{") : candidate.rfind("}") + 1].strip()
+                elif "[" in candidate and "]" in candidate:
+                    return candidate[candidate.find("[") : candidate.rfind("]") + 1].strip()
+    return cleaned
+
+
 def _extract_keywords_and_entities(text):
     """Extract keywords plus entity groups from AI response.
 
@@ -748,32 +975,10 @@ def _extract_keywords_and_entities(text):
     - Legacy object format with "entities": ["A", "B"] is treated as AND of singletons: [["A"], ["B"]]
     - Legacy array format is treated as keywords only.
     """
-    cleaned = (text or "").strip()
+    cleaned = _unwrap_json_code_block(text)
     if not cleaned:
         return {"keywords": [], "entities": [], "entityGroups": []}
 
-    # Try to extract JSON from markdown code blocks
-    if "```" in cleaned:
-        parts = cleaned.split("```")
-        for part in parts:
-            candidate = part.strip()
-            # Try object format first
-            if candidate.startswith("{") and candidate.endswith("}"):
-                cleaned = candidate
-                break
-            # Try array format (legacy)
-            if candidate.startswith("[") and candidate.endswith("]"):
-                cleaned = candidate
-                break
-            # Handle json-prefixed code blocks
-            if candidate.startswith("json"):
-                if "{" in candidate and "}" in candidate:
-                    cleaned = candidate[candidate.find("{") : candidate.rfind("}") + 1].strip()
-                    break
-                elif "[" in candidate and "]" in candidate:
-                    cleaned = candidate[candidate.find("[") : candidate.rfind("]") + 1].strip()
-                    break
-
     try:
         data = json.loads(cleaned)
     except json.JSONDecodeError:
@@ -784,50 +989,7 @@ def _extract_keywords_and_entities(text):
 
     # Handle new object format
     if isinstance(data, dict):
-        keywords_raw = data.get("keywords", [])
-        entity_groups_raw = data.get("entityGroups") or data.get("entity_groups") or data.get("ENTITY_GROUPS")
-        entities_raw = data.get("entities", [])
-
-        keywords = []
-        if isinstance(keywords_raw, list):
-            for item in keywords_raw:
-                if isinstance(item, str):
-                    kw = item.strip()
-                    if kw:
-                        keywords.append(kw)
-
-        entity_groups = []
-        if isinstance(entity_groups_raw, list):
-            for group in entity_groups_raw:
-                if isinstance(group, list):
-                    g = []
-                    for item in group:
-                        if isinstance(item, str):
-                            term = item.strip()
-                            if term:
-                                g.append(term)
-                    if g:
-                        entity_groups.append(g)
-                elif isinstance(group, str):
-                    term = group.strip()
-                    if term:
-                        entity_groups.append([term])
-
-        # Legacy: "entities": ["A", "B"] means AND of required entities.
-        if not entity_groups and isinstance(entities_raw, list):
-            for item in entities_raw:
-                if isinstance(item, str):
-                    ent = item.strip()
-                    if ent:
-                        entity_groups.append([ent])
-
-        entities = []
-        for group in entity_groups:
-            head = (group[0] if group else "").strip()
-            if head and head not in entities:
-                entities.append(head)
-
-        return {"keywords": keywords, "entities": entities, "entityGroups": entity_groups}
+        return _keywords_and_entities_from_object(data)
 
     # Handle legacy array format (backwards compatibility)
     if isinstance(data, list):
@@ -842,6 +1004,54 @@ def _extract_keywords_and_entities(text):
     return {"keywords": [], "entities": [], "entityGroups": []}
 
 
+def _keywords_and_entities_from_object(data):
+    """Normalize one decoded `{"keywords": [...], "entityGroups": [...]}` object."""
+    keywords_raw = data.get("keywords", [])
+    entity_groups_raw = data.get("entityGroups") or data.get("entity_groups") or data.get("ENTITY_GROUPS")
+    entities_raw = data.get("entities", [])
+
+    keywords = []
+    if isinstance(keywords_raw, list):
+        for item in keywords_raw:
+            if isinstance(item, str):
+                kw = item.strip()
+                if kw:
+                    keywords.append(kw)
+
+    entity_groups = []
+    if isinstance(entity_groups_raw, list):
+        for group in entity_groups_raw:
+            if isinstance(group, list):
+                g = []
+                for item in group:
+                    if isinstance(item, str):
+                        term = item.strip()
+                        if term:
+                            g.append(term)
+                if g:
+                    entity_groups.append(g)
+            elif isinstance(group, str):
+                term = group.strip()
+                if term:
+                    entity_groups.append([term])
+
+    # Legacy: "entities": ["A", "B"] means AND of required entities.
+    if not entity_groups and isinstance(entities_raw, list):
+        for item in entities_raw:
+            if isinstance(item, str):
+                ent = item.strip()
+                if ent:
+                    entity_groups.append([ent])
+
+    entities = []
+    for group in entity_groups:
+        head = (group[0] if group else "").strip()
+        if head and head not in entities:
+            entities.append(head)
+
+    return {"keywords": keywords, "entities": entities, "entityGroups": entity_groups}
+
+
 def _normalize_keyword(keyword):
     kw = (keyword or "").strip().lower()
     kw = " ".join(kw.split())
@@ -1042,6 +1252,21 @@ _ENTITY_DISALLOWED_QUESTION_WORDS = {
 }
 
 
+# Precomputed for the single-pass `_is_valid_entity_term`.
+_ENTITY_REJECT_TOKENS = frozenset(_ENTITY_DISALLOWED_QUESTION_WORDS | _ENTITY_MONTHS | _ENTITY_TIME_WORDS)
+_ENTITY_GENERIC_TOKENS = frozenset(_GENERIC_ENTITY_TOKENS)
+_ENTITY_GENERIC_CONTENT_TOKENS = frozenset(_GENERIC_ENTITY_TOKENS - _ENTITY_ALLOWED_CONNECTORS)
+# Any whole token that is a basis-points amount ("25bp") or a month+day ("dec31st"),
+# or a date anywhere in the term ("2025-12-31", "12/31/2025").
+_ENTITY_REJECT_RE = re.compile(
+    r"(?<!\S)(?:\d{1,3}(?:bp|bps|basispoints?)"
+    r"|(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)\d{1,2}(?:st|nd|rd|th)?)(?!\S)"
+    r"|\b(?:(?:19|20)\d{2}[-/]\d{1,2}[-/]\d{1,2}|\d{1,2}[-/]\d{1,2}[-/](?:19|20)\d{2})\b"
+)
+_ENTITY_TERM_CACHE_SIZE = 1 << 16
+
+
+@functools.lru_cache(maxsize=_ENTITY_TERM_CACHE_SIZE)
 def _is_valid_entity_term(normalized_term):
     term = _normalize_keyword(normalized_term)
     if not term:
@@ -1054,81 +1279,116 @@ def _is_valid_entity_term(normalized_term):
     if term.startswith("team") and len(term) <= 12:
         return False
 
+    if len(term) < 3 and term not in _ENTITY_ALLOW_SHORT:
+        return False
+
     tokens = term.split()
     if len(tokens) > 4:
         return False
 
-    # Disallow obvious question/auxiliary words anywhere in the entity phrase.
-    if any(tok in _ENTITY_DISALLOWED_QUESTION_WORDS for tok in tokens):
-        return False
+    # One pass over the tokens: question/auxiliary words, months and time words anywhere
+    # in the phrase reject it, as does a 4-digit year token.
+    has_generic = False
+    has_generic_content = False
+    all_glue = True
+    for tok in tokens:
+        if tok in _ENTITY_REJECT_TOKENS:
+            return False
+        if tok.isdigit():
+            if len(tok) == 4:
+                return False
+        elif tok in _ENTITY_GENERIC_TOKENS:
+            has_generic = True
+            has_generic_content = has_generic_content or tok in _ENTITY_GENERIC_CONTENT_TOKENS
+        else:
+            all_glue = False
 
-    if any(tok in _ENTITY_MONTHS for tok in tokens):
+    if len(tokens) == 1:
+        # Reject single-token generic words (e.g. "will", "company").
+        if has_generic:
+            return False
+    # For multi-word entities, allow light connector words, but reject generic content words
+    # that typically encode outcomes or mechanics (e.g. "launch", "acquire", "decision"),
+    # and phrases that are composed entirely of generic glue words.
+    elif has_generic_content or all_glue:
         return False
 
-    if any(tok in _ENTITY_TIME_WORDS for tok in tokens):
+    if _ENTITY_REJECT_RE.search(term):
         return False
 
-    if any(tok.isdigit() and len(tok) == 4 for tok in tokens):
-        return False
+    return True
 
-    # Reject single-token generic words (e.g. "will", "company").
-    if len(tokens) == 1 and tokens[0] in _GENERIC_ENTITY_TOKENS:
-        return False
 
-    # For multi-word entities, allow light connector words, but reject generic content words
-    # that typically encode outcomes or mechanics (e.g. "launch", "acquire", "decision").
-    if len(tokens) >= 2 and any(
-        (tok in _GENERIC_ENTITY_TOKENS) and (tok not in _ENTITY_ALLOWED_CONNECTORS) for tok in tokens
-    ):
-        return False
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+# Chinese character range: U+4E00 to U+9FFF
+_CJK_RE = re.compile("[\u4e00-\u9fff]")
 
-    # Reject phrases that are composed entirely of generic glue words.
-    if len(tokens) >= 2 and all((tok in _GENERIC_ENTITY_TOKENS) or tok.isdigit() for tok in tokens):
-        return False
 
-    # Reject basis-points tokens like "25bp"/"25bps".
-    if any(re.match(r"^\d{1,3}(?:bp|bps|basispoints?)$", tok) for tok in tokens):
-        return False
+def _compact_alnum(text):
+    return _NON_ALNUM_RE.sub("", str(text or "").lower())
 
-    if term.isdigit() and len(term) == 4:
-        return False
 
-    if len(term) < 3 and term not in _ENTITY_ALLOW_SHORT:
-        return False
+class TitleFeatures:
+    """Title-derived values shared by the entity/keyword helpers for one event.
 
-    # Drop month+day tokens like "dec31", "dec31st", etc.
-    if any(re.match(r"^(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)\d{1,2}(?:st|nd|rd|th)?$", tok) for tok in tokens):
-        return False
+    Build one per event and pass it wherever a helper takes `title` (they also accept
+    the plain string); each value is computed on first use and then reused.
+    """
 
-    # Drop date-like strings such as "2025-12-31" or "12/31/2025".
-    if re.search(r"\b(19|20)\d{2}[-/]\d{1,2}[-/]\d{1,2}\b", term):
-        return False
-    if re.search(r"\b\d{1,2}[-/]\d{1,2}[-/](19|20)\d{2}\b", term):
-        return False
+    def __init__(self, title):
+        self.raw = str(title or "")
+        self.text = self.raw.strip()
 
-    return True
+    @functools.cached_property
+    def lower(self):
+        return self.raw.lower()
 
+    @functools.cached_property
+    def compact(self):
+        return _compact_alnum(self.raw)
+
+    @functools.cached_property
+    def words(self):
+        """`\\w+` runs of the lowercased title: `"btc" in words` is `re.search(r"\\bbtc\\b", lower)`."""
+        return frozenset(re.findall(r"\w+", self.lower))
+
+    @functools.cached_property
+    def tokens(self):
+        return tuple(_simple_tokenize(self.raw))
+
+    @functools.cached_property
+    def ngrams(self):
+        """All `_title_ngram_keywords` phrases, before the `max_phrases` cut."""
+        return _title_ngrams(self.tokens)
+
+    @functools.cached_property
+    def allow_terms(self):
+        return frozenset(_allowed_entity_alias_terms_from_title(self))
+
+
+def _title_features(title):
+    return title if isinstance(title, TitleFeatures) else TitleFeatures(title)
 
-def _compact_alnum(text):
-    return re.sub(r"[^a-z0-9]+", "", str(text or "").lower())
 
 def _allowed_entity_alias_terms_from_title(title):
-    lower = str(title or "").lower()
+    features = _title_features(title)
+    lower = features.lower
+    words = features.words
     allow = set()
 
-    if ("bitcoin" in lower) or re.search(r"\bbtc\b", lower):
+    if ("bitcoin" in lower) or ("btc" in words):
         allow.update({"btc", "bitcoin"})
 
-    if ("ethereum" in lower) or re.search(r"\beth\b", lower):
+    if ("ethereum" in lower) or ("eth" in words):
         allow.update({"eth", "ethereum"})
 
-    if ("fomc" in lower) or ("federal reserve" in lower) or re.search(r"\bfed\b", lower):
+    if ("fomc" in lower) or ("federal reserve" in lower) or ("fed" in words):
         allow.update({"fed", "fomc", "federalreserve", "federal reserve"})
 
     if "binance" in lower:
         allow.update({"binance"})
 
-    if re.search(r"\bcz\b", lower) or ("changpeng zhao" in lower) or ("changpengzhao" in lower):
+    if ("cz" in words) or ("changpeng zhao" in lower) or ("changpengzhao" in lower):
         allow.update({"cz", "changpengzhao", "changpeng zhao"})
 
     return allow
@@ -1141,10 +1401,9 @@ def _term_is_from_title(term, title, allow_terms):
     if nterm in (allow_terms or set()):
         return True
     # Allow Chinese characters (these are dictionary translations, not from title)
-    # Chinese character range: U+4E00 to U+9FFF
-    if any('\u4e00' <= ch <= '\u9fff' for ch in nterm):
+    if _CJK_RE.search(nterm):
         return True
-    t_compact = _compact_alnum(title)
+    t_compact = _title_features(title).compact
     n_compact = _compact_alnum(nterm)
     return bool(n_compact and t_compact and n_compact in t_compact)
 
@@ -1154,6 +1413,7 @@ def _normalize_entity_groups(entity_groups, title, allow_terms, max_groups=2, ma
     if not isinstance(entity_groups, list) or not entity_groups:
         return normalized
 
+    title = _title_features(title)
     for group in entity_groups:
         if not isinstance(group, list):
             continue
@@ -1180,6 +1440,7 @@ def _normalize_entity_groups(entity_groups, title, allow_terms, max_groups=2, ma
 
 
 def _collect_invalid_entity_terms(entity_groups, entities, title, allow_terms):
+    title = _title_features(title)
     bad = []
 
     def add(term):
@@ -1217,12 +1478,100 @@ def _collect_invalid_entity_terms(entity_groups, entities, title, allow_terms):
     return bad[:20]
 
 
+_entity_equivalents_cache = None
+
+
+def _entity_equivalents():
+    """Normalized term -> all terms sharing an ENTITY_ALIAS_MAP / CN_EN_ENTITY_MAP entry with it."""
+    global _entity_equivalents_cache
+    if _entity_equivalents_cache is None:
+        equivalents = {}
+        entries = [[canonical, *aliases] for canonical, aliases in ENTITY_ALIAS_MAP.items()]
+        entries.extend([en_key, *translations] for en_key, translations in CN_EN_ENTITY_MAP.items())
+        for entry in entries:
+            terms = [t for t in (_normalize_keyword(x) for x in entry) if t]
+            for term in terms:
+                equivalents.setdefault(term, set()).update(terms)
+        _entity_equivalents_cache = equivalents
+    return _entity_equivalents_cache
+
+
+def _repair_entity_groups(entity_groups, entities, keywords, title, allow_terms):
+    """Deterministically salvage entityGroups from an LLM response that failed validation.
+
+    1. Keep response terms that are valid and literally in the title (or allow terms),
+       swapping dictionary aliases/translations for the form the title actually uses.
+    2. Otherwise keep the title-derived fallback groups that the response corroborates
+       (one of its valid terms, keywords included, occurs in the group).
+
+    Returns normalized groups, or [] when nothing can be salvaged.
+    """
+    equivalents = _entity_equivalents()
+    title = _title_features(title)
+    title_compact = title.compact
+
+    def in_title(term):
+        if term in (allow_terms or set()):
+            return True
+        compact = _compact_alnum(term)
+        return bool(compact and title_compact and compact in title_compact)
+
+    def salvage(term):
+        nterm = _normalize_keyword(term) if isinstance(term, str) else ""
+        if not nterm:
+            return None
+        for cand in [nterm, *sorted(equivalents.get(nterm, ()))]:
+            if _is_valid_entity_term(cand) and in_title(cand):
+                return cand
+        return None
+
+    raw_groups = []
+    if isinstance(entity_groups, list):
+        for group in entity_groups:
+            raw_groups.append(group if isinstance(group, list) else [group])
+    if not raw_groups and isinstance(entities, list):
+        raw_groups = [[e] for e in entities]
+
+    repaired = []
+    for group in raw_groups:
+        salvaged = []
+        for term in group:
+            cand = salvage(term)
+            if cand and cand not in salvaged:
+                salvaged.append(cand)
+        if salvaged:
+            repaired.append(salvaged)
+    normalized = _normalize_entity_groups(repaired, title, allow_terms)
+    if normalized:
+        return normalized
+
+    # Evidence: every valid entity-like term the response mentioned, plus its aliases.
+    mentioned = set()
+    response_terms = [t for group in raw_groups for t in group]
+    response_terms.extend(keywords if isinstance(keywords, list) else [])
+    for term in response_terms:
+        nterm = _normalize_keyword(term) if isinstance(term, str) else ""
+        if not nterm:
+            continue
+        for cand in [nterm, *equivalents.get(nterm, ())]:
+            if _is_valid_entity_term(cand):
+                mentioned.add(_compact_alnum(cand))
+    mentioned.discard("")
+    corroborated = [
+        group
+        for group in _fallback_entity_groups_from_title(title)
+        if any(m in _compact_alnum(term) for term in group for m in mentioned)
+    ]
+    return _normalize_entity_groups(corroborated, title, allow_terms)
+
+
 def _fallback_entity_groups_from_title(title):
-    raw = str(title or "").strip()
-    if not raw:
+    features = _title_features(title)
+    if not features.text:
         return []
 
-    lower = raw.lower()
+    lower = features.lower
+    words = features.words
     groups = []
 
     if "tiktok" in lower:
@@ -1240,21 +1589,21 @@ def _fallback_entity_groups_from_title(title):
     if "champions league" in lower:
         return [["champions league", "uefa champions league", "uefa"]]
 
-    if "premier league" in lower or re.search(r"\bepl\b", lower):
+    if "premier league" in lower or "epl" in words:
         return [["premier league", "english premier league", "epl"]]
 
     if "la liga" in lower or "laliga" in lower:
         return [["la liga", "laliga"]]
 
-    if ("fomc" in lower) or ("federal reserve" in lower) or re.search(r"\bfed\b", lower):
+    if ("fomc" in lower) or ("federal reserve" in lower) or ("fed" in words):
         groups.append(["fed", "fomc", "federal reserve", "federalreserve"])
-    if ("bitcoin" in lower) or re.search(r"\bbtc\b", lower):
+    if ("bitcoin" in lower) or ("btc" in words):
         groups.append(["btc", "bitcoin"])
-    if ("ethereum" in lower) or re.search(r"\beth\b", lower):
+    if ("ethereum" in lower) or ("eth" in words):
         groups.append(["eth", "ethereum"])
     if "binance" in lower:
         groups.append(["binance"])
-    if re.search(r"\bcz\b", lower) or ("changpeng zhao" in lower):
+    if ("cz" in words) or ("changpeng zhao" in lower):
         groups.append(["cz", "changpengzhao"])
 
     seen = set()
@@ -1263,14 +1612,14 @@ def _fallback_entity_groups_from_title(title):
             seen.add(t)
 
     candidates = []
-    for token in _simple_tokenize(raw):
+    for token in features.tokens:
         token = str(token or "").lstrip("$#")
         term = _normalize_keyword(token)
         if not term:
             continue
         candidates.append(term)
 
-    candidates.extend(_title_ngram_keywords(raw, max_phrases=24))
+    candidates.extend(features.ngrams[:24])
 
     scored = []
     for cand in candidates:
@@ -1279,7 +1628,7 @@ def _fallback_entity_groups_from_title(title):
             continue
         if not _is_valid_entity_term(cand):
             continue
-        if not _term_is_from_title(cand, raw, allow_terms=set()):
+        if not _term_is_from_title(cand, features, allow_terms=set()):
             continue
         toks = cand.split()
         specificity = sum(1 for t in toks if (t not in _GENERIC_ENTITY_TOKENS) and (not t.isdigit()))
@@ -1299,55 +1648,21 @@ def _fallback_entity_groups_from_title(title):
     return groups
 
 
+# A token starts at "$" or an ASCII letter/digit and continues over ASCII letters/digits;
+# "/" and "-" stay inside it only when another letter/digit follows ("btc/usdt", "gpt-6").
+# "$" always starts a new token ("$btc"), so a bare "$" is a token of its own.
+_SIMPLE_TOKEN_RE = re.compile(r"(?:\$|[A-Za-z0-9])(?:[A-Za-z0-9]|[/-](?=[A-Za-z0-9]))*")
+
+
 def _simple_tokenize(text):
     if not text:
         return []
-    s = str(text)
-    out = []
-    cur = []
-    for i in range(len(s)):
-        ch = s[i]
-        o = ord(ch)
-        is_ascii_alnum = (48 <= o <= 57) or (65 <= o <= 90) or (97 <= o <= 122)
-        if is_ascii_alnum:
-            cur.append(ch.lower())
-            continue
-
-        # Keep simple pairs like "btc/usdt" together.
-        if ch == "/" and cur:
-            if i + 1 < len(s):
-                nxt = s[i + 1]
-                no = ord(nxt)
-                nxt_is_ascii_alnum = (48 <= no <= 57) or (65 <= no <= 90) or (97 <= no <= 122)
-                if nxt_is_ascii_alnum:
-                    cur.append("/")
-                    continue
-
-        # Keep simple pairs like "gpt-6" together.
-        if ch == "-" and cur:
-            if i + 1 < len(s):
-                nxt = s[i + 1]
-                no = ord(nxt)
-                nxt_is_ascii_alnum = (48 <= no <= 57) or (65 <= no <= 90) or (97 <= no <= 122)
-                if nxt_is_ascii_alnum:
-                    cur.append("-")
-                    continue
-
-        # Keep "$btc" together.
-        if ch == "$":
-            if cur:
-                out.append("".join(cur))
-                cur = []
-            cur.append("$")
-            continue
-
-        if cur:
-            out.append("".join(cur))
-            cur = []
-
-    if cur:
-        out.append("".join(cur))
-    return out
+    tokens = _SIMPLE_TOKEN_RE.findall(str(text))
+    if not tokens:
+        return []
+    # Lowercase after matching: str.lower() on the whole text could turn non-ASCII letters
+    # (e.g. the Kelvin sign) into ASCII ones. Tokens never contain spaces.
+    return " ".join(tokens).lower().split(" ")
 
 
 def _fallback_keywords(event_title, option_titles, rules_text, max_keywords=25):
@@ -1398,7 +1713,8 @@ def _fallback_keywords(event_title, option_titles, rules_text, max_keywords=25):
     return keywords
 
 
-def _title_ngram_keywords(title, max_phrases=12):
+def _title_ngrams(tokens):
+    """Unique title bigrams/trigrams (stop words dropped) in order; see `_title_ngram_keywords`."""
     stop = {
         "a",
         "an",
@@ -1426,7 +1742,7 @@ def _title_ngram_keywords(title, max_phrases=12):
         "with",
     }
 
-    words = [w for w in _simple_tokenize(title or "") if w and w not in stop]
+    words = [w for w in tokens if w and w not in stop]
     # Drop extremely short tokens except year-like numbers.
     filtered = []
     for w in words:
@@ -1463,9 +1779,162 @@ def _title_ngram_keywords(title, max_phrases=12):
             continue
         if p not in out:
             out.append(p)
-        if len(out) >= max_phrases:
-            break
-    return out
+    return tuple(out)
+
+
+def _title_ngram_keywords(title, max_phrases=12):
+    return list(_title_features(title).ngrams[:max_phrases])
+
+
+# "KPL: RW vs WE (Feb. 24 1:00AM ET)" -> ("RW", "WE (Feb. 24 1:00AM ET)"); the right side
+# is trimmed further by `_VERSUS_SIDE_END_RE`.
+_VERSUS_TITLE_RE = re.compile(r"^\s*(?:[^:?]{1,24}:\s*)?(.+?)\s+vs\.?\s+(.+?)\s*$", re.IGNORECASE)
+_VERSUS_SIDE_END_RE = re.compile(r"\s*(?::|\(|\?|\s-\s|\|).*$")
+# A side is plain words joined by spaces, ".", "-" or "&"; quotes or other punctuation
+# mean the "vs" sits inside a phrase ('Aster "Human vs AI": ...'), not between two teams.
+_VERSUS_SIDE_RE = re.compile(r"[^\W_]+(?:[ .&-]+[^\W_]+)*\.?")
+_PROPER_NOUN_RE = re.compile(r"\b[A-Z][A-Za-z0-9&'.-]*")
+
+_local_dictionary_terms_cache = None
+
+
+def _local_dictionary_terms():
+    """ASCII entity terms known to ENTITY_ALIAS_MAP / CN_EN_ENTITY_MAP that pass entity validation."""
+    global _local_dictionary_terms_cache
+    if _local_dictionary_terms_cache is None:
+        _local_dictionary_terms_cache = frozenset(
+            term for term in _entity_equivalents() if term.isascii() and _is_valid_entity_term(term)
+        )
+    return _local_dictionary_terms_cache
+
+
+def _dictionary_entity_groups(title):
+    """Dictionary terms in title order (longest match first), one group per distinct entity."""
+    terms = _local_dictionary_terms()
+    equivalents = _entity_equivalents()
+    words = [w.lstrip("$#") for w in _title_features(title).tokens]
+    groups = []
+    i = 0
+    while i < len(words):
+        match = None
+        for n in (3, 2, 1):
+            cand = " ".join(words[i : i + n])
+            if i + n <= len(words) and cand in terms:
+                match = (cand, n)
+                break
+        if match is None:
+            i += 1
+            continue
+        term, n = match
+        same = equivalents.get(term, {term})
+        if not any(t in same for group in groups for t in group):
+            groups.append([term])
+        i += n
+    return groups
+
+
+def _versus_entity_groups(title):
+    features = _title_features(title)
+    # Question-style titles ("Who wins X vs Y?") are about an outcome, not two entities.
+    if "?" in features.text or features.words & _ENTITY_DISALLOWED_QUESTION_WORDS:
+        return []
+    m = _VERSUS_TITLE_RE.match(features.text)
+    if not m:
+        return []
+    sides = [m.group(1), _VERSUS_SIDE_END_RE.sub("", m.group(2))]
+    groups = []
+    for side in sides:
+        side = side.strip()
+        if not _VERSUS_SIDE_RE.fullmatch(side):
+            return []
+        term = _normalize_keyword(side.strip(" .!?"))
+        if not _is_valid_entity_term(term):
+            return []
+        groups.append([term])
+    return groups
+
+
+def _local_keywords_and_entities(title, option_titles=None):
+    """Dictionary-first extraction of keywords/entityGroups without the LLM.
+
+    `confidence` (0..1) is 0.9 for "X vs Y" titles with two valid sides, 1.0 when the
+    groups come from the entity dictionaries and 0.4 for the heuristic title fallback.
+    It drops to 0.0 when a capitalized title word (a likely entity) is not covered by
+    the groups, so the LLM sees the title instead of that entity being lost.
+    Callers escalate to `generate_keywords` below LOCAL_TIER_MIN_CONFIDENCE.
+    """
+    features = _title_features(title)
+    title = features.text
+    allow_terms = features.allow_terms
+
+    groups = _versus_entity_groups(features)
+    if groups:
+        confidence = 0.9
+    else:
+        groups = _dictionary_entity_groups(features)
+        confidence = 1.0
+        if not groups:
+            groups = _fallback_entity_groups_from_title(features)
+            confidence = 0.4
+        covered = [_compact_alnum(t) for group in groups for t in group]
+        for word in _PROPER_NOUN_RE.findall(title):
+            term = _normalize_keyword(re.sub(r"(?:'s|[.'])$", "", word))
+            if term in _GENERIC_ENTITY_TOKENS or not _is_valid_entity_term(term):
+                continue
+            compact = _compact_alnum(term)
+            if not any(compact in c or c in compact for c in covered if c):
+                confidence = 0.0
+                break
+
+    entity_groups = _normalize_entity_groups(groups, features, allow_terms)
+    if not entity_groups:
+        confidence = 0.0
+    keywords = [t for group in entity_groups for t in group]
+    normalized_title = _normalize_keyword(title)
+    for kw in _fallback_keywords(title, option_titles, ""):
+        # Title tokens such as months, years or "decision" only add noise to matching.
+        if kw not in keywords and (kw == normalized_title or _is_valid_entity_term(kw)):
+            keywords.append(kw)
+    return {
+        "keywords": keywords,
+        "entities": [g[0] for g in entity_groups],
+        "entityGroups": entity_groups,
+        "confidence": round(confidence, 3),
+    }
+
+
+# Signatures are "v2:" + blake2b-128 over a length-prefixed encoding of the fields.
+# Builds before v2 stored 8-hex-digit djb2 hashes of a JSON payload; those are still
+# recognized (see `_signature_matches`) until the next build rewrites them.
+SIGNATURE_PREFIX = "v2:"
+
+
+def _signature_digest(kind, fields):
+    """Hash `fields` (strings) unambiguously: each is encoded as a 4-byte length plus UTF-8 bytes."""
+    h = hashlib.blake2b(kind.encode("ascii"), digest_size=16)
+    for field in fields:
+        # surrogatepass: titles decoded from JSON may carry lone surrogates.
+        data = field.encode("utf-8", "surrogatepass")
+        h.update(len(data).to_bytes(4, "big"))
+        h.update(data)
+    return SIGNATURE_PREFIX + h.hexdigest()
+
+
+def _event_signature_core(event_title, rules_best):
+    title = str(event_title or "").strip()
+    rules_preview = str(rules_best or "").strip()[:1200]
+    return _signature_digest("core", (title, rules_preview))
+
+
+def _event_signature_full(event_title, market_ids, option_titles_all, rules_best):
+    title = str(event_title or "").strip()
+    options = [str(x).strip() for x in (option_titles_all or []) if str(x).strip()]
+    unique_options = sorted(set(options))[:80]
+    rules_preview = str(rules_best or "").strip()[:1200]
+    # The option count is length-prefixed like every other field, so the variable-length
+    # option list cannot run into the rules.
+    fields = [title, str(len(market_ids or [])), str(len(unique_options))] + unique_options + [rules_preview]
+    return _signature_digest("full", fields)
 
 
 def _djb2_32(text):
@@ -1475,7 +1944,8 @@ def _djb2_32(text):
     return h
 
 
-def _event_signature_core(event_title, rules_best):
+def _legacy_event_signature_core(event_title, rules_best):
+    """The pre-v2 sigCore, only computed to match signatures stored by older builds."""
     title = str(event_title or "").strip()
     rules_preview = str(rules_best or "").strip()[:1200]
     payload = {
@@ -1486,7 +1956,8 @@ def _event_signature_core(event_title, rules_best):
     return f"{_djb2_32(stable):08x}"
 
 
-def _event_signature_full(event_title, market_ids, option_titles_all, rules_best):
+def _legacy_event_signature_full(event_title, market_ids, option_titles_all, rules_best):
+    """The pre-v2 sigFull, only computed to match signatures stored by older builds."""
     title = str(event_title or "").strip()
     options = [str(x).strip() for x in (option_titles_all or []) if str(x).strip()]
     unique_options = sorted(set(options))[:80]
@@ -1501,6 +1972,21 @@ def _event_signature_full(event_title, market_ids, option_titles_all, rules_best
     return f"{_djb2_32(stable):08x}"
 
 
+def _is_legacy_signature(sig):
+    sig = str(sig or "").strip()
+    return bool(sig) and not sig.startswith(SIGNATURE_PREFIX)
+
+
+def _signature_matches(stored, current, legacy):
+    """True if `stored` is `current`, or the pre-v2 form of it (`legacy()` is only called then)."""
+    stored = str(stored or "").strip()
+    if not stored or not current:
+        return False
+    if stored == current:
+        return True
+    return _is_legacy_signature(stored) and stored == legacy()
+
+
 def _load_previous_data(output_path):
     """Load previous data.json for incremental updates.
 
@@ -1514,16 +2000,16 @@ def _load_previous_data(output_path):
     if previous_data_url:
         try:
             print(f"[info] attempting to load previous data from URL: {previous_data_url}", flush=True)
-            response = requests.get(previous_data_url, timeout=30)
-            if response.status_code == 200:
-                data = response.json()
-                if isinstance(data, dict):
-                    print("[info] successfully loaded previous data from URL", flush=True)
-                    return data
-            elif response.status_code == 404:
+            data = http_cache.fetch(previous_data_url, endpoint="previous-data", timeout=30).json()
+            if isinstance(data, dict):
+                print("[info] successfully loaded previous data from URL", flush=True)
+                return data
+        except requests.HTTPError as exc:
+            status = exc.response.status_code if exc.response is not None else None
+            if status == 404:
                 print("[info] previous data not found at URL (404), will do full rebuild", flush=True)
             else:
-                print(f"[warn] failed to fetch previous data from URL: HTTP {response.status_code}", flush=True)
+                print(f"[warn] failed to fetch previous data from URL: HTTP {status}", flush=True)
         except Exception as exc:
             print(f"[warn] failed to load previous data from URL: {exc}", flush=True)
 
@@ -1542,37 +2028,293 @@ def _load_previous_data(output_path):
     return None
 
 
-def _zhipu_chat_completion(api_key, messages):
-    if hasattr(zhipuai, "ZhipuAI"):
-        try:
-            client = zhipuai.ZhipuAI(api_key=api_key, timeout=ZHIPU_TIMEOUT_SECONDS)
-        except TypeError:
-            client = zhipuai.ZhipuAI(api_key=api_key)
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
 
-        try:
-            resp = client.chat.completions.create(
-                model=MODEL_NAME,
-                messages=messages,
-                temperature=0.2,
-                top_p=0.7,
-                timeout=ZHIPU_TIMEOUT_SECONDS,
-            )
-        except TypeError:
-            resp = client.chat.completions.create(
-                model=MODEL_NAME,
-                messages=messages,
-                temperature=0.2,
-                top_p=0.7,
-            )
-        return resp.choices[0].message.content
 
-    zhipuai.api_key = api_key
-    resp = zhipuai.model_api.invoke(
-        model=MODEL_NAME,
-        prompt=messages,
-        temperature=0.2,
-        top_p=0.7,
-    )
+def _build_state_config(api_key):
+    return {
+        "source": OPINION_API_URL,
+        "fullAiRefresh": bool(FULL_AI_REFRESH),
+        "skipAi": bool(SKIP_AI),
+        "hasApiKey": bool(api_key),
+        "localTier": bool(LOCAL_TIER),
+        "localTierMinConfidence": LOCAL_TIER_MIN_CONFIDENCE,
+        "modelCascade": list(MODEL_CASCADE),
+        "llmBatchSize": llm_pool.LLM_BATCH_SIZE,
+        "llmMaxCalls": llm_pool.LLM_MAX_CALLS,
+        "llmTimeBudgetSeconds": llm_pool.LLM_TIME_BUDGET_SECONDS,
+    }
+
+
+def _build_inputs_sha256(markets_body):
+    """Hashes of the upstream bodies this build consumed (None when a fetch failed)."""
+    return {
+        "markets": markets_body.sha256,
+        "wrapEvents": http_cache.body_sha256(OPINION_WRAP_EVENTS_URL),
+    }
+
+
+def _needs_ai_count(data):
+    return sum(
+        1
+        for section in ("events", "markets")
+        for item in (data.get(section) or {}).values()
+        if isinstance(item, dict) and item.get("needsAi")
+    )
+
+
+def _write_build_state(output_path, built_at, api_key, markets_body, data):
+    state = {
+        "builtAt": int(built_at),
+        "outputPath": os.path.abspath(output_path),
+        "outputSha256": _file_sha256(output_path),
+        "inputsSha256": _build_inputs_sha256(markets_body),
+        "needsAi": _needs_ai_count(data),
+        "config": _build_state_config(api_key),
+    }
+    try:
+        os.makedirs(os.path.dirname(BUILD_STATE_PATH), exist_ok=True)
+        with open(BUILD_STATE_PATH, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+    except OSError as exc:
+        print(f"[warn] failed to write build state: {exc}", flush=True)
+
+
+def _unchanged_since_last_build(markets_body, parent_events, output_path, api_key, now):
+    """Return True when the previous output is still exactly what a rebuild would produce.
+
+    Requires both upstream bodies to hash identically to the ones the last
+    *successful* build consumed (the HTTP cache's own "unchanged" flag only compares
+    against the last fetch, which may belong to a failed or cancelled run), the
+    previous output file to be untouched and free of `needsAi` events, the same
+    build configuration, and no market or parent event whose cutoffAt fell between
+    the last build and now.
+    """
+    if FULL_AI_REFRESH or not (SKIP_UNCHANGED_BUILD and http_cache.HTTP_CACHE_ENABLED):
+        return False
+    try:
+        with open(BUILD_STATE_PATH, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return False
+    if not isinstance(state, dict) or state.get("config") != _build_state_config(api_key):
+        return False
+    inputs = _build_inputs_sha256(markets_body)
+    if None in inputs.values() or state.get("inputsSha256") != inputs:
+        return False
+    if state.get("needsAi") != 0:
+        return False
+    if state.get("outputPath") != os.path.abspath(output_path) or not os.path.exists(output_path):
+        return False
+    if _file_sha256(output_path) != state.get("outputSha256"):
+        return False
+    built_at = state.get("builtAt")
+    if not isinstance(built_at, int):
+        return False
+
+    def crossed(value):
+        cutoff = _parse_cutoff_epoch_seconds(value)
+        return cutoff is not None and built_at < cutoff <= now
+
+    for market in iter_all_markets(markets_body):
+        if crossed(market.get("cutoffAt")):
+            return False
+    for parent in (parent_events or {}).values():
+        if crossed(parent.get("cutoffAt")):
+            return False
+    return True
+
+
+class StartupInputs(NamedTuple):
+    """Results of the independent startup fetches issued by `main`."""
+
+    markets_body: "http_cache.CachedBody"
+    parent_events: Dict[str, Any]
+    previous_data: Optional[Dict[str, Any]]
+    timings_ms: Dict[str, int]
+
+
+def fetch_startup_inputs(previous_data_path):
+    """Fetch markets, wrap-events and previous data concurrently.
+
+    Degrade semantics match the sequential flow: a markets failure is raised,
+    wrap-events falls back to `{}` and previous data to `None`.
+    """
+    started = time.perf_counter()
+    timings = {}
+
+    def run(name, fn, *args):
+        t0 = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            timings[name] = int((time.perf_counter() - t0) * 1000)
+
+    with ThreadPoolExecutor(max_workers=3, thread_name_prefix="startup") as pool:
+        markets_future = pool.submit(run, "markets", fetch_markets_body)
+        parent_future = pool.submit(run, "wrapEvents", fetch_parent_events)
+        previous_future = pool.submit(run, "previousData", _load_previous_data, previous_data_path)
+
+        try:
+            parent_events = parent_future.result()
+        except Exception as exc:
+            print(f"[warn] failed to fetch parent events from wrap-events API: {exc}", flush=True)
+            parent_events = {}
+        try:
+            previous_data = previous_future.result()
+        except Exception as exc:
+            print(f"[warn] failed to load previous data: {exc}", flush=True)
+            previous_data = None
+        markets_body = markets_future.result()
+
+    timings["total"] = int((time.perf_counter() - started) * 1000)
+    print(
+        "[info] startup fetch: "
+        + " ".join(f"{name}={ms}ms" for name, ms in timings.items()),
+        flush=True,
+    )
+    return StartupInputs(
+        markets_body=markets_body,
+        parent_events=parent_events if isinstance(parent_events, dict) else {},
+        previous_data=previous_data,
+        timings_ms=timings,
+    )
+
+
+def _zhipu_chat_completion(api_key, messages, model=MODEL_NAME):
+    """Chat completion through the shared limiter, retrying transient failures.
+
+    Rate-limit, timeout and server errors are retried up to ZHIPU_MAX_RETRIES times
+    with jittered backoff (honouring Retry-After on 429); a 429 also halves the
+    limiter's concurrency. Other errors propagate immediately. With LLM_HEDGE an
+    attempt may race a duplicate request (`llm_pool.call_hedged`).
+    """
+    limiter = llm_pool.get_limiter()
+
+    def request():
+        return _zhipu_chat_completion_once(api_key, messages, model)
+
+    attempt = 0
+    while True:
+        try:
+            # Every request from any pool worker (hedges included) waits for a limiter slot
+            # first; only the provider call itself is timed and recorded as an attempt.
+            if llm_pool.LLM_HEDGE:
+                content = llm_pool.call_hedged(request, model, limiter, classify=_classify_llm_error)
+            else:
+                with limiter:
+                    content = llm_pool.timed_attempt(request, model, classify=_classify_llm_error)
+        except Exception as exc:
+            kind = _classify_llm_error(exc)
+            if kind is None or attempt >= ZHIPU_MAX_RETRIES:
+                llm_pool.record_failure()
+                raise
+            retry_after = None
+            if kind == "rate_limit":
+                limiter.on_rate_limited()
+                retry_after = http_client.retry_after_seconds(getattr(exc, "response", None))
+            delay = http_client.backoff_seconds(
+                attempt, retry_after, base=ZHIPU_BACKOFF_BASE_SECONDS, cap=ZHIPU_BACKOFF_MAX_SECONDS
+            )
+            print(
+                f"[warn] llm: {kind} ({exc.__class__.__name__}); retry {attempt + 1}/{ZHIPU_MAX_RETRIES} in {delay:.1f}s",
+                flush=True,
+            )
+            llm_pool.record_retry()
+            attempt += 1
+            time.sleep(delay)
+            continue
+        limiter.on_success()
+        return content
+
+
+def _classify_llm_error(exc):
+    """Return "rate_limit", "timeout" or "server" for retryable LLM errors, else None."""
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    name = exc.__class__.__name__
+    if status == 429 or name in ("APIReachLimitError", "RateLimitError"):
+        return "rate_limit"
+    if "Timeout" in name or isinstance(exc, (TimeoutError, requests.Timeout)):
+        return "timeout"
+    if name == "APIConnectionError" or isinstance(exc, (ConnectionError, requests.ConnectionError)):
+        return "timeout"
+    if (isinstance(status, int) and status >= 500) or name in ("APIInternalError", "APIServerFlowExceedError"):
+        return "server"
+    return None
+
+
+def _zhipu_chat_completion_once(api_key, messages, model=MODEL_NAME):
+    if replay.active():
+        request = {"model": model, "messages": messages}
+        return replay.call("llm", request, lambda: _zhipu_chat_completion_live(api_key, messages, model))
+    return _zhipu_chat_completion_live(api_key, messages, model)
+
+
+_zhipu_clients = {}
+_zhipu_clients_lock = threading.Lock()
+
+
+def _get_zhipu_client(api_key):
+    """Long-lived client per API key so HTTP connections stay warm across calls.
+
+    SDK-internal retries are disabled; `_zhipu_chat_completion` owns the policy.
+    """
+    client = _zhipu_clients.get(api_key)
+    if client is None:
+        with _zhipu_clients_lock:
+            client = _zhipu_clients.get(api_key)
+            if client is None:
+                try:
+                    client = zhipuai.ZhipuAI(api_key=api_key, timeout=ZHIPU_TIMEOUT_SECONDS, max_retries=0)
+                except TypeError:
+                    try:
+                        client = zhipuai.ZhipuAI(api_key=api_key, timeout=ZHIPU_TIMEOUT_SECONDS)
+                    except TypeError:
+                        client = zhipuai.ZhipuAI(api_key=api_key)
+                _zhipu_clients[api_key] = client
+    return client
+
+
+def _zhipu_chat_completion_live(api_key, messages, model=MODEL_NAME):
+    if hasattr(zhipuai, "ZhipuAI"):
+        client = _get_zhipu_client(api_key)
+
+        try:
+            resp = client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=0.2,
+                top_p=0.7,
+                timeout=ZHIPU_TIMEOUT_SECONDS,
+            )
+        except TypeError:
+            resp = client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=0.2,
+                top_p=0.7,
+            )
+        usage = getattr(resp, "usage", None)
+        if usage is not None:
+            llm_pool.record_usage(
+                model, getattr(usage, "prompt_tokens", 0) or 0, getattr(usage, "completion_tokens", 0) or 0
+            )
+        return resp.choices[0].message.content
+
+    zhipuai.api_key = api_key
+    resp = zhipuai.model_api.invoke(
+        model=model,
+        prompt=messages,
+        temperature=0.2,
+        top_p=0.7,
+    )
 
     if isinstance(resp, dict):
         for path in (
@@ -1597,46 +2339,26 @@ def _zhipu_chat_completion(api_key, messages):
     return str(resp)
 
 
-def generate_keywords(api_key, title, rules, context=None):
-    """Generate keywords and entities for a prediction market.
+def _cached_chat_completion(api_key, messages, parse, cacheable, model=MODEL_NAME):
+    """Return `parse(content)` for a chat completion of `messages` by `model`.
 
-    Returns:
-        dict with keys:
-        - "keywords": list of keyword strings
-        - "entities": list of 1-3 canonical entity strings (for display/debug)
-        - "entityGroups": list of OR-groups; all groups required (AND)
+    Identical prompts are answered from the persistent `llm_cache`; a live
+    response is stored only when `cacheable(parse(content))` holds.
     """
-    system = (
-        "You generate high-quality matching keywords and strict subject-identifying entity requirements for a prediction market. "
-        "Return ONLY a JSON object (no prose). "
-        "Include keywords (general terms, synonyms, slang) and entityGroups (high-precision identifiers)."
-    )
-    avoid_terms = None
-    if isinstance(context, dict):
-        avoid_terms = context.get("avoidEntityTerms")
-    avoid_terms_list = []
-    if isinstance(avoid_terms, (list, tuple)):
-        for t in avoid_terms:
-            nt = _normalize_keyword(t)
-            if nt and nt not in avoid_terms_list:
-                avoid_terms_list.append(nt)
-            if len(avoid_terms_list) >= 20:
-                break
-
-    avoid_block = ""
-    if avoid_terms_list:
-        avoid_joined = ", ".join(avoid_terms_list)
-        avoid_block = (
-            "\n"
-            "Previous attempt produced invalid entity terms. DO NOT use any of these in entityGroups:\n"
-            f"- Avoid: {avoid_joined}\n"
-        )
-
-    user = (
-        f"Market title: {title}\n"
-        f"Market rules: {_truncate(rules, 1200)}\n\n"
-        "Rules:\n"
-        "- Output must be a JSON object with 'keywords' and 'entityGroups' fields (no extra fields).\n"
+    key = llm_cache.cache_key(model, messages)
+    content = llm_cache.get(key)
+    if content is not None:
+        return parse(content)
+    content = _zhipu_chat_completion(api_key=api_key, messages=messages, model=model)
+    result = parse(content)
+    if cacheable(result):
+        llm_cache.put(key, model, content)
+    return result
+
+
+def _keyword_prompt_rules(avoid_block=""):
+    """Shared keyword/entityGroups instructions for single and batched prompts."""
+    return (
         "- keywords: 10-15 English search terms (entities, synonyms, abbreviations, slang)\n"
         "  * Keep keywords in English only for now\n"
         "- entityGroups: STRICT subject-identifying requirements as an AND-of-ORs (CNF) with bilingual support\n"
@@ -1675,6 +2397,50 @@ def generate_keywords(api_key, title, rules, context=None):
         '- Title: "Oscars 2026: Best Actor Winner" -> entityGroups: [["Oscars", "Academy Awards", "Oscar", "奥斯卡"]]\n'
         '- Title: "Who will acquire TikTok?" -> entityGroups: [["TikTok", "抖音"]]\n'
         '- Title: "Tesla stock above $300?" -> entityGroups: [["Tesla", "特斯拉"]]\n'
+    )
+
+
+def generate_keywords(api_key, title, rules, context=None, model=MODEL_NAME):
+    """Generate keywords and entities for a prediction market.
+
+    Returns:
+        dict with keys:
+        - "keywords": list of keyword strings
+        - "entities": list of 1-3 canonical entity strings (for display/debug)
+        - "entityGroups": list of OR-groups; all groups required (AND)
+    """
+    system = (
+        "You generate high-quality matching keywords and strict subject-identifying entity requirements for a prediction market. "
+        "Return ONLY a JSON object (no prose). "
+        "Include keywords (general terms, synonyms, slang) and entityGroups (high-precision identifiers)."
+    )
+    avoid_terms = None
+    if isinstance(context, dict):
+        avoid_terms = context.get("avoidEntityTerms")
+    avoid_terms_list = []
+    if isinstance(avoid_terms, (list, tuple)):
+        for t in avoid_terms:
+            nt = _normalize_keyword(t)
+            if nt and nt not in avoid_terms_list:
+                avoid_terms_list.append(nt)
+            if len(avoid_terms_list) >= 20:
+                break
+
+    avoid_block = ""
+    if avoid_terms_list:
+        avoid_joined = ", ".join(avoid_terms_list)
+        avoid_block = (
+            "\n"
+            "Previous attempt produced invalid entity terms. DO NOT use any of these in entityGroups:\n"
+            f"- Avoid: {avoid_joined}\n"
+        )
+
+    user = (
+        f"Market title: {title}\n"
+        f"Market rules: {_truncate(rules, 1200)}\n\n"
+        "Rules:\n"
+        "- Output must be a JSON object with 'keywords' and 'entityGroups' fields (no extra fields).\n"
+        f"{_keyword_prompt_rules(avoid_block)}"
         "\n"
         "Example output format:\n"
         '{\n'
@@ -1696,16 +2462,20 @@ def generate_keywords(api_key, title, rules, context=None):
         ctx_label_parts.append(f"url={ctx_best_market_url}")
     ctx_label = (" " + " ".join(ctx_label_parts)) if ctx_label_parts else ""
 
-    # No retry - 429 rate limit errors are better handled by not retrying
+    messages = [
+        {"role": "system", "content": system},
+        {"role": "user", "content": user},
+    ]
+    # Transient errors (429/timeouts/5xx) are retried inside `_zhipu_chat_completion`;
+    # whatever still fails is logged here and yields empty results.
     try:
-        content = _zhipu_chat_completion(
-            api_key=api_key,
-            messages=[
-                {"role": "system", "content": system},
-                {"role": "user", "content": user},
-            ],
+        result = _cached_chat_completion(
+            api_key,
+            messages,
+            parse=_extract_keywords_and_entities,
+            cacheable=lambda r: bool(r.get("keywords") or r.get("entityGroups")),
+            model=model,
         )
-        result = _extract_keywords_and_entities(content)
         if DEBUG:
             print(
                 f"[debug] generated for title={title!r}: "
@@ -1724,10 +2494,207 @@ def generate_keywords(api_key, title, rules, context=None):
         return {"keywords": [], "entities": [], "entityGroups": []}
 
 
+def _extract_batch_keywords_and_entities(text, event_ids):
+    """Split a batched response (JSON object keyed by event id) into per-event results.
+
+    Events missing from the response, or whose entry is not an object, are omitted.
+    """
+    cleaned = _unwrap_json_code_block(text)
+    try:
+        data = json.loads(cleaned) if cleaned else None
+    except json.JSONDecodeError:
+        if DEBUG:
+            preview = cleaned[:500].replace("\n", "\\n")
+            print(f"[warn] batched LLM output was not valid JSON; preview={preview}", flush=True)
+        return {}
+    if not isinstance(data, dict):
+        return {}
+
+    results = {}
+    for event_id in event_ids:
+        entry = data.get(str(event_id))
+        if isinstance(entry, dict):
+            results[event_id] = _keywords_and_entities_from_object(entry)
+    return results
+
+
+def generate_keywords_batch(api_key, items, model=MODEL_NAME):
+    """Generate keywords and entities for several prediction markets in one request.
+
+    `items` is a list of `(event_id, title, rules)`. Returns a dict of event id ->
+    result in the `generate_keywords` shape; events the model skipped or answered
+    malformed are missing, and callers fall back to single-event calls for them.
+    """
+    system = (
+        "You generate high-quality matching keywords and strict subject-identifying entity requirements for several prediction markets. "
+        "Return ONLY a JSON object keyed by market id (no prose). "
+        "For each market include keywords (general terms, synonyms, slang) and entityGroups (high-precision identifiers)."
+    )
+    blocks = []
+    for event_id, title, rules in items:
+        blocks.append(
+            f"Market id: {event_id}\n"
+            f"Market title: {title}\n"
+            f"Market rules: {_truncate(rules, 1200)}\n"
+        )
+    user = (
+        "Markets:\n\n"
+        + "\n".join(blocks)
+        + "\n"
+        "Rules (apply to each market independently):\n"
+        "- Output must be a JSON object keyed by market id; each value is an object with 'keywords' and 'entityGroups' fields (no extra fields).\n"
+        + _keyword_prompt_rules()
+        + "\n"
+        "Example output format:\n"
+        "{\n"
+        '  "1001": {"keywords": ["Russia", "Ukraine", "war", "ceasefire"], "entityGroups": [["Russia", "俄罗斯"], ["Ukraine", "乌克兰"]]},\n'
+        '  "1002": {"keywords": ["Tesla", "TSLA", "stock", "Elon Musk"], "entityGroups": [["Tesla", "特斯拉"]]}\n'
+        "}\n"
+    )
+    messages = [
+        {"role": "system", "content": system},
+        {"role": "user", "content": user},
+    ]
+    event_ids = [event_id for event_id, _, _ in items]
+    try:
+        return _cached_chat_completion(
+            api_key,
+            messages,
+            parse=lambda content: _extract_batch_keywords_and_entities(content, event_ids),
+            cacheable=lambda r: len(r) == len(event_ids),
+            model=model,
+        )
+    except KeyboardInterrupt:
+        raise
+    except Exception as exc:
+        print(f"[warn] batched keyword generation failed for {len(items)} events: {exc}", flush=True)
+        return {}
+
+
+def _cascade_accepts(result, title):
+    """Whether a lower cascade tier's answer is good enough to skip the next model."""
+    if not isinstance(result, dict):
+        return False
+    title = _title_features(title)
+    allow_terms = title.allow_terms
+    entity_groups = result.get("entityGroups", []) or result.get("entity_groups", [])
+    entities = result.get("entities", [])
+    if not _normalize_entity_groups(entity_groups, title, allow_terms):
+        return False
+    return not _collect_invalid_entity_terms(entity_groups, entities, title, allow_terms)
+
+
+def generate_keywords_cascade(api_key, title, rules, context=None, start_tier=0, title_features=None):
+    """`generate_keywords` through MODEL_CASCADE, starting at tier `start_tier`.
+
+    Every tier but the last must pass `_cascade_accepts`; the last tier's answer is
+    returned as is (callers apply their usual repair/retry to it).
+    """
+    tiers = MODEL_CASCADE[min(start_tier, len(MODEL_CASCADE) - 1) :]
+    features = title_features or _title_features(title)
+    for model in tiers[:-1]:
+        result = generate_keywords(api_key, title, rules, context=context, model=model)
+        accepted = _cascade_accepts(result, features)
+        llm_pool.record_tier_result(model, escalated=not accepted)
+        if accepted:
+            return result
+        if DEBUG:
+            print(f"[debug] llm: escalating title={_truncate(str(title or ''), 80)!r} past {model}", flush=True)
+    result = generate_keywords(api_key, title, rules, context=context, model=tiers[-1])
+    llm_pool.record_tier_result(tiers[-1], escalated=False)
+    return result
+
+
+class _AliasEngine:
+    """CN_EN_ENTITY_MAP / CN_EN_KEYWORD_MAP / ENTITY_ALIAS_MAP compiled for `augment_with_chinese`.
+
+    Exact-key rules become hash lookups; the CN_EN_ENTITY_MAP "key (3+ chars) contained
+    in the term" rule becomes an Aho-Corasick automaton, so a lookup costs
+    O(len(term) + matches) instead of a scan over every dictionary key.
+    """
+
+    def __init__(self, entity_map, keyword_map, alias_map):
+        def normalized(values):
+            return [(v, _normalize_keyword(v)) for v in values]
+
+        # Entity entries keep their dictionary position so matches are emitted in order.
+        self._entity_values = [normalized(values) for values in entity_map.values()]
+        self._entity_exact = {}
+        for index, key in enumerate(entity_map):
+            self._entity_exact.setdefault(key.lower(), []).append(index)
+        self._keyword_exact = {}
+        for key, values in keyword_map.items():
+            self._keyword_exact.setdefault(key.lower(), []).extend(normalized(values))
+        self._alias_exact = {}
+        for key, values in alias_map.items():
+            self._alias_exact.setdefault(key.lower(), []).extend(normalized(values))
+
+        # Aho-Corasick over the lowered entity keys of 3+ characters.
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        for index, key in enumerate(entity_map):
+            key_lower = key.lower()
+            if len(key_lower) < 3:
+                continue
+            state = 0
+            for ch in key_lower:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = nxt
+            self._out[state].append(index)
+        # Breadth-first failure links; depth-1 states fail to the root.
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[nxt] = self._goto[fallback].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def _contained_entity_keys(self, term):
+        found = set()
+        state = 0
+        for ch in term:
+            while state and ch not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(ch, 0)
+            found.update(self._out[state])
+        return found
+
+    def lookup(self, term_normalized):
+        """Candidate `(term, normalized)` additions for one normalized group term, in order."""
+        term_lower = term_normalized.lower()
+        indexes = self._contained_entity_keys(term_lower)
+        indexes.update(self._entity_exact.get(term_lower, ()))
+        out = []
+        for index in sorted(indexes):
+            out.extend(self._entity_values[index])
+        out.extend(self._keyword_exact.get(term_lower, ()))
+        out.extend(self._alias_exact.get(term_lower, ()))
+        return out
+
+
+def _compile_alias_engine(entity_map, keyword_map, alias_map):
+    return _AliasEngine(entity_map, keyword_map, alias_map)
+
+
+# Compiled once; rebuild with `_compile_alias_engine` if the dictionaries change at runtime.
+_ALIAS_ENGINE = _compile_alias_engine(CN_EN_ENTITY_MAP, CN_EN_KEYWORD_MAP, ENTITY_ALIAS_MAP)
+
+
 def augment_with_chinese(keywords, entities, entity_groups):
     """Augment LLM-generated entityGroups with Chinese translations and aliases from dictionaries.
 
-    This function uses predefined dictionaries to add:
+    This function uses predefined dictionaries (precompiled into `_ALIAS_ENGINE`) to add:
     1. Chinese translations (from CN_EN_ENTITY_MAP and CN_EN_KEYWORD_MAP)
     2. Common aliases/abbreviations (from ENTITY_ALIAS_MAP)
 
@@ -1762,44 +2729,12 @@ def augment_with_chinese(keywords, entities, entity_groups):
             if not term_normalized:
                 continue
 
-            # Check entity map for Chinese translations
-            for en_key, cn_translations in CN_EN_ENTITY_MAP.items():
-                en_key_lower = en_key.lower()
-                term_lower = term_normalized.lower()
-
-                # Exact match or term contains the key
-                if en_key_lower == term_lower or (len(en_key_lower) >= 3 and en_key_lower in term_lower):
-                    for cn_term in cn_translations:
-                        cn_normalized = _normalize_keyword(cn_term)
-                        if cn_normalized and cn_normalized not in group_terms_set:
-                            new_group.append(cn_term)
-                            group_terms_set.add(cn_normalized)
-
-            # Check keyword map for entity terms
-            for en_key, cn_translations in CN_EN_KEYWORD_MAP.items():
-                en_key_lower = en_key.lower()
-                term_lower = term_normalized.lower()
-
-                # Exact match
-                if en_key_lower == term_lower:
-                    for cn_term in cn_translations:
-                        cn_normalized = _normalize_keyword(cn_term)
-                        if cn_normalized and cn_normalized not in group_terms_set:
-                            new_group.append(cn_term)
-                            group_terms_set.add(cn_normalized)
-
-            # Check alias map for abbreviations and variants
-            for canonical, aliases in ENTITY_ALIAS_MAP.items():
-                canonical_lower = canonical.lower()
-                term_lower = term_normalized.lower()
-
-                # Exact match with canonical term
-                if canonical_lower == term_lower:
-                    for alias in aliases:
-                        alias_normalized = _normalize_keyword(alias)
-                        if alias_normalized and alias_normalized not in group_terms_set:
-                            new_group.append(alias)
-                            group_terms_set.add(alias_normalized)
+            # Chinese translations (CN_EN_ENTITY_MAP exact or contained key, CN_EN_KEYWORD_MAP
+            # exact key), then ENTITY_ALIAS_MAP aliases, in dictionary order.
+            for extra, extra_normalized in _ALIAS_ENGINE.lookup(term_normalized):
+                if extra_normalized and extra_normalized not in group_terms_set:
+                    new_group.append(extra)
+                    group_terms_set.add(extra_normalized)
 
         if new_group:
             new_entity_groups.append(new_group)
@@ -1817,7 +2752,160 @@ def augment_with_chinese(keywords, entities, entity_groups):
     return keywords, new_entity_groups
 
 
-def build_data(markets, api_key, previous_data=None, parent_events=None):
+def _bump_stat(stats, lock, key, amount=1):
+    with lock:
+        stats[key] = stats.get(key, 0) + amount
+
+
+def _generate_event_keywords(api_key, event_id, bucket, rules_text, option_titles, ai_stats, stats_lock, start_tier=0):
+    """Run `generate_keywords_cascade` (plus its single validation retry) for one event.
+
+    Safe to call from LLM pool workers: shared counters go through `stats_lock`.
+    Returns `(keywords, entities, entity_groups)` before normalization.
+    """
+    keywords = []
+    entities = []
+    entity_groups = []
+    _bump_stat(ai_stats, stats_lock, "calls")
+    try:
+        title_for_ai = bucket.get("title") or event_id
+        best_market_id = bucket.get("bestMarketId")
+        best_market_url = (
+            f"{FRONTEND_BASE_URL}/market/{best_market_id}?ref={REF_PARAM}"
+            if best_market_id
+            else None
+        )
+        features = bucket.get("titleFeatures") or _title_features(title_for_ai)
+        allow_terms = features.allow_terms
+
+        safe_title = _truncate(str(title_for_ai or "").strip(), 160)
+        print(f"[info] llm: generating entities/keywords for event={event_id} title={safe_title!r}", flush=True)
+        result = generate_keywords_cascade(
+            api_key,
+            title=title_for_ai,
+            rules=rules_text,
+            context={
+                "eventId": event_id,
+                "bestMarketId": best_market_id,
+                "bestMarketUrl": best_market_url,
+            },
+            start_tier=start_tier,
+            title_features=features,
+        )
+        if isinstance(result, dict):
+            keywords = result.get("keywords", [])
+            entities = result.get("entities", [])
+            entity_groups = result.get("entityGroups", []) or result.get("entity_groups", [])
+
+            # Augment with Chinese translations from dictionary
+            keywords, entity_groups = augment_with_chinese(keywords, entities, entity_groups)
+            normalized_try = _normalize_entity_groups(entity_groups, features, allow_terms)
+
+            if not normalized_try:
+                # Salvage what we can locally before paying for a second round-trip.
+                repaired = _repair_entity_groups(entity_groups, entities, keywords, features, allow_terms)
+                if repaired:
+                    _bump_stat(ai_stats, stats_lock, "repaired")
+                    if DEBUG:
+                        print(f"[debug] llm: repaired entityGroups locally for event={event_id}: {repaired}", flush=True)
+                    keywords, entity_groups = augment_with_chinese(keywords, entities, repaired)
+                    normalized_try = repaired
+
+            if not normalized_try:
+                bad_terms = _collect_invalid_entity_terms(entity_groups, entities, features, allow_terms)
+                _bump_stat(ai_stats, stats_lock, "retries")
+                if bad_terms:
+                    print(
+                        f"[warn] llm: retrying once for event={event_id} due to invalid entityGroups; avoid={bad_terms}",
+                        flush=True,
+                    )
+                else:
+                    print(
+                        f"[warn] llm: retrying once for event={event_id} due to empty/invalid entityGroups",
+                        flush=True,
+                    )
+                retry_ctx = {
+                    "eventId": event_id,
+                    "bestMarketId": best_market_id,
+                    "bestMarketUrl": best_market_url,
+                }
+                if bad_terms:
+                    retry_ctx["avoidEntityTerms"] = bad_terms
+                retry = generate_keywords(
+                    api_key,
+                    title=title_for_ai,
+                    rules=rules_text,
+                    context=retry_ctx,
+                    model=MODEL_CASCADE[-1],
+                )
+                if isinstance(retry, dict):
+                    keywords = retry.get("keywords", keywords)
+                    entities = retry.get("entities", entities)
+                    entity_groups = retry.get("entityGroups", []) or retry.get("entity_groups", [])
+
+                    # Augment retry result with Chinese translations
+                    keywords, entity_groups = augment_with_chinese(keywords, entities, entity_groups)
+        elif isinstance(result, list):
+            # Backwards compatibility with old array format
+            keywords = result
+            entities = []
+            entity_groups = []
+    except Exception as exc:
+        _bump_stat(ai_stats, stats_lock, "errors")
+        if DEBUG:
+            print(f"[warn] llm error for event={event_id}: {exc}", flush=True)
+        keywords = _fallback_keywords(bucket.get("title") or event_id, option_titles, rules_text)
+        entities = []
+        entity_groups = []
+    return keywords, entities, entity_groups
+
+
+def _generate_batch_keywords(api_key, jobs, ai_stats, stats_lock):
+    """Run one batched request for several event jobs on the first cascade tier.
+
+    Returns `{event_id: (keywords, entities, entity_groups)}` for the entries whose
+    entityGroups validate; the rest are left to single-event calls (which start at
+    the next tier when there is one).
+    """
+    _bump_stat(ai_stats, stats_lock, "batch_calls")
+    print(f"[info] llm: generating entities/keywords for {len(jobs)} events in one batch", flush=True)
+    model = MODEL_CASCADE[0]
+    cascading = len(MODEL_CASCADE) > 1
+    results = generate_keywords_batch(
+        api_key,
+        [(event_id, bucket.get("title") or event_id, rules_text) for event_id, bucket, rules_text, _ in jobs],
+        model=model,
+    )
+    accepted = {}
+    for event_id, bucket, _, _ in jobs:
+        result = results.get(event_id)
+        title = bucket.get("titleFeatures") or _title_features(bucket.get("title") or event_id)
+        if cascading:
+            # Lower tiers are held to the cascade bar; no local repair.
+            ok = _cascade_accepts(result, title)
+            llm_pool.record_tier_result(model, escalated=not ok)
+            if not ok:
+                continue
+        if not result:
+            continue
+        allow_terms = title.allow_terms
+        entities = result.get("entities", [])
+        keywords, entity_groups = augment_with_chinese(result.get("keywords", []), entities, result.get("entityGroups", []))
+        if not _normalize_entity_groups(entity_groups, title, allow_terms):
+            repaired = _repair_entity_groups(entity_groups, entities, keywords, title, allow_terms)
+            if not repaired:
+                continue
+            _bump_stat(ai_stats, stats_lock, "repaired")
+            keywords, entity_groups = augment_with_chinese(keywords, entities, repaired)
+        accepted[event_id] = (keywords, entities, entity_groups)
+        if not cascading:
+            llm_pool.record_tier_result(model, escalated=False)
+    _bump_stat(ai_stats, stats_lock, "batched", len(accepted))
+    _bump_stat(ai_stats, stats_lock, "batch_fallbacks", len(jobs) - len(accepted))
+    return accepted
+
+
+def build_data(markets, api_key, previous_data=None, parent_events=None, checkpoint=None):
     now = _now_epoch_seconds()
     parent_events = parent_events or {}
 
@@ -1851,7 +2939,20 @@ def build_data(markets, api_key, previous_data=None, parent_events=None):
         "empty": 0,
         "non_empty": 0,
         "errors": 0,
+        "skipped_new": 0,
+        "reused_by_signature": 0,
+        "repaired": 0,
+        "batch_calls": 0,
+        "batched": 0,
+        "batch_fallbacks": 0,
+        "local_tier": 0,
+        "escalated": 0,
+        "over_budget": 0,
+        "resumed": 0,
     }
+    # Workers of the LLM pool update `ai_stats` concurrently.
+    ai_stats_lock = threading.Lock()
+    llm_cache_before = llm_cache.stats_snapshot()
     event_stats = {
         "events": 0,
     }
@@ -1860,7 +2961,6 @@ def build_data(markets, api_key, previous_data=None, parent_events=None):
     max_markets = int(max_markets_env) if (max_markets_env and max_markets_env.isdigit()) else None
     max_events_env = os.environ.get("MAX_EVENTS")
     max_events = int(max_events_env) if (max_events_env and max_events_env.isdigit()) else None
-    sleep_seconds = float(os.environ.get("SLEEP_SECONDS", "0.2"))
     scan_log_every = int(os.environ.get("SCAN_LOG_EVERY", "100"))
 
     if max_markets is not None or max_events is not None:
@@ -1888,6 +2988,21 @@ def build_data(markets, api_key, previous_data=None, parent_events=None):
         events_out = dict(prev_events)
     ai_stats["onlyAiForNew"] = bool(only_ai_for_new)
 
+    # sigCore -> previous AI output, so an event re-listed under a new id (or a recurring
+    # sibling with identical title and rules) reuses it instead of calling the LLM.
+    prev_by_signature = {}
+    if not FULL_AI_REFRESH:
+        for prev_source in (prev_events, prev_markets):
+            for prev in prev_source.values():
+                if not isinstance(prev, dict):
+                    continue
+                prev_sig_core = str(prev.get("sigCore") or "").strip()
+                prev_groups = prev.get("entityGroups")
+                if prev_sig_core and isinstance(prev_groups, list) and prev_groups and not prev.get("needsAi"):
+                    prev_by_signature.setdefault(prev_sig_core, prev)
+    # Previous output written before v2 signatures; matched via the legacy form below.
+    has_legacy_signatures = any(_is_legacy_signature(sig) for sig in prev_by_signature)
+
     # Track resolved event IDs to remove them from output later
     resolved_event_ids = set()
     # Track all event IDs seen in current API response (to detect missing events in incremental mode)
@@ -2092,8 +3207,14 @@ def build_data(markets, api_key, previous_data=None, parent_events=None):
         )
         bucket["sigCore"] = sig_core
         bucket["sigFull"] = sig_full
+        # Shared by the local tier, the LLM validation and the output normalization below.
+        bucket["titleFeatures"] = TitleFeatures(bucket.get("title") or event_id)
+        if has_legacy_signatures and sig_core not in prev_by_signature:
+            legacy_core = _legacy_event_signature_core(bucket.get("title") or event_id, bucket.get("rulesBest") or "")
+            if legacy_core in prev_by_signature:
+                prev_by_signature[sig_core] = prev_by_signature[legacy_core]
 
-        reusable = bool(only_ai_for_new and event_id in existing_event_ids)
+        reusable = bool(only_ai_for_new and event_id in existing_event_ids) or sig_core in prev_by_signature
 
         if reusable:
             planned_reuse += 1
@@ -2109,6 +3230,11 @@ def build_data(markets, api_key, previous_data=None, parent_events=None):
             flush=True,
         )
 
+    # Pass 1: decide per event whether it is reused, skipped, falls back or needs the LLM.
+    pending = []
+    signature_results = {}
+    local_results = {}
+    resumed_results = {}
     for event_id, bucket in event_accumulator.items():
         if max_events is not None and event_stats["events"] >= max_events:
             break
@@ -2149,8 +3275,6 @@ def build_data(markets, api_key, previous_data=None, parent_events=None):
         if event_stats["events"] == 1:
             to_run = min(total_events, max_events) if max_events is not None else total_events
             print(f"[info] processing {to_run} events (from {kept} markets): {planned_reuse} reused, {planned_llm} need LLM", flush=True)
-        if event_stats["events"] % 10 == 0:
-            print(f"[info] events keyworded: {event_stats['events']}", flush=True)
 
         rules_text = bucket.get("rulesBest") or ""
         option_titles = bucket.get("optionTitles") or []
@@ -2158,25 +3282,19 @@ def build_data(markets, api_key, previous_data=None, parent_events=None):
             options_preview = ", ".join(option_titles[:20])
             rules_text = (rules_text + "\n\nOptions: " + options_preview).strip()
 
-        sig_core = bucket.get("sigCore") or _event_signature_core(bucket.get("title") or event_id, bucket.get("rulesBest") or "")
-        sig_full = bucket.get("sigFull") or _event_signature_full(
-            event_title=bucket.get("title") or event_id,
-            market_ids=bucket.get("marketIds") or [],
-            option_titles_all=bucket.get("optionTitlesAll") or option_titles,
-            rules_best=bucket.get("rulesBest") or "",
-        )
-
-        reused = False
-        keywords = []
-        entities = []
-        entity_groups = []
-
         if only_ai_for_new and event_id in existing_event_ids:
             # Check if previous event has entityGroups
             prev_entity_groups = prev_events.get(event_id, {}).get("entityGroups") or []
-            if prev_entity_groups:
-                # Only-AI-for-new mode: keep previous outputs untouched for existing event IDs with entityGroups.
+            if prev_entity_groups and not prev_events.get(event_id, {}).get("needsAi"):
+                # Only-AI-for-new mode: keep previous AI outputs for existing event IDs with entityGroups,
+                # but store the current (v2) signatures so the legacy djb2 path retires after one build.
                 ai_stats["reused"] += 1
+                if event_id in events_out:
+                    events_out[event_id] = dict(
+                        events_out[event_id], sig=bucket["sigFull"], sigFull=bucket["sigFull"], sigCore=bucket["sigCore"]
+                    )
+                if event_id in markets_out:
+                    markets_out[event_id] = dict(markets_out[event_id], sigCore=bucket["sigCore"])
                 continue
             else:
                 # Previous event exists but has no entityGroups - regenerate with LLM
@@ -2184,101 +3302,167 @@ def build_data(markets, api_key, previous_data=None, parent_events=None):
                 if DEBUG:
                     print(f"[debug] event={event_id} exists but has empty entityGroups, regenerating with LLM", flush=True)
 
+        prev_match = prev_by_signature.get(bucket.get("sigCore") or "")
+        if prev_match is not None:
+            ai_stats["reused_by_signature"] += 1
+            signature_results[event_id] = (
+                list(prev_match.get("keywords") or []),
+                list(prev_match.get("entities") or []),
+                [list(g) for g in prev_match.get("entityGroups") or [] if isinstance(g, list)],
+            )
+            if DEBUG:
+                print(f"[debug] event={event_id} reuses AI output by sigCore={bucket.get('sigCore')}", flush=True)
+            pending.append((event_id, bucket, is_true_parent_event, rules_text, option_titles))
+            continue
+
         # If SKIP_AI is enabled, skip new events (don't generate keywords for them)
         if SKIP_AI and event_id not in existing_event_ids:
             ai_stats["skipped_new"] += 1
             continue
 
-        if not api_key:
+        resumed = None
+        if checkpoint is not None:
+            resumed = checkpoint.lookup(
+                event_id,
+                bucket.get("sigCore") or "",
+                legacy_sig_core=lambda: _legacy_event_signature_core(bucket.get("title") or event_id, bucket.get("rulesBest") or ""),
+            )
+        if resumed is not None:
+            # Finished by an interrupted earlier run (see `llm_checkpoint`).
+            ai_stats["resumed"] += 1
+            resumed_results[event_id] = (
+                list(resumed.get("keywords") or []),
+                list(resumed.get("entities") or []),
+                [list(g) for g in resumed.get("entityGroups") or [] if isinstance(g, list)],
+            )
+            pending.append((event_id, bucket, is_true_parent_event, rules_text, option_titles))
+            continue
+
+        if LOCAL_TIER and not SKIP_AI:
+            local = _local_keywords_and_entities(bucket["titleFeatures"], option_titles)
+            if local["confidence"] >= LOCAL_TIER_MIN_CONFIDENCE:
+                ai_stats["local_tier"] += 1
+                keywords, entity_groups = augment_with_chinese(local["keywords"], local["entities"], local["entityGroups"])
+                local_results[event_id] = (keywords, local["entities"], entity_groups)
+                if DEBUG:
+                    print(
+                        f"[debug] event={event_id} resolved locally (confidence={local['confidence']}): {local['entityGroups']}",
+                        flush=True,
+                    )
+            elif api_key:
+                ai_stats["escalated"] += 1
+
+        pending.append((event_id, bucket, is_true_parent_event, rules_text, option_titles))
+
+    # Pass 2: run the LLM for every pending event on the shared pool (rate limited in
+    # `_zhipu_chat_completion`). Jobs start in priority order -- events the previous run
+    # left as `needsAi` first, then by bestMarketVolume -- so whatever exceeds
+    # LLM_TIME_BUDGET_SECONDS / LLM_MAX_CALLS is the least important work. Results are
+    # merged in event order below.
+    llm_results = {}
+    budget = llm_pool.CallBudget()
+    if api_key and not SKIP_AI:
+        llm_jobs = [
+            (event_id, bucket, rules_text, option_titles)
+            for event_id, bucket, _, rules_text, option_titles in pending
+            if event_id not in signature_results and event_id not in local_results and event_id not in resumed_results
+        ]
+        llm_jobs.sort(
+            key=lambda job: (
+                not (prev_events.get(job[0], {}).get("needsAi") or prev_markets.get(job[0], {}).get("needsAi")),
+                -float(job[1].get("bestMarketVolume") or 0),
+            )
+        )
+        sig_cores = {job[0]: job[1].get("sigCore") or "" for job in llm_jobs}
+
+        def journal(event_id, result):
+            # Journal each finished event as soon as it completes, so a killed run
+            # resumes without repeating the call.
+            if checkpoint is not None and result[2]:
+                checkpoint.record(event_id, sig_cores[event_id], *result)
+
+        def run_batch(batch):
+            if budget.exhausted():
+                return {}
+            accepted = _generate_batch_keywords(api_key, batch, ai_stats, ai_stats_lock)
+            for event_id, result in accepted.items():
+                journal(event_id, result)
+            return accepted
+
+        def run_single(job):
+            if budget.exhausted():
+                return None
+            result = _generate_event_keywords(
+                api_key, job[0], job[1], job[2], job[3], ai_stats, ai_stats_lock, start_tier=single_start_tier
+            )
+            journal(job[0], result)
+            return result
+
+        batch_size = llm_pool.LLM_BATCH_SIZE
+        single_start_tier = 0
+        if batch_size > 1 and len(llm_jobs) > 1:
+            # The batch already asked the first cascade tier.
+            single_start_tier = 1
+            batches = [llm_jobs[i : i + batch_size] for i in range(0, len(llm_jobs), batch_size)]
+            for accepted in llm_pool.map_ordered(run_batch, batches, label="llm-batch"):
+                llm_results.update(accepted)
+        # Entries a batch could not answer (or everything, when batching is off) get
+        # their own call with the usual single validation retry.
+        single_jobs = [job for job in llm_jobs if job[0] not in llm_results]
+        results = llm_pool.map_ordered(run_single, single_jobs)
+        llm_results.update({job[0]: result for job, result in zip(single_jobs, results) if result is not None})
+        over_budget = len(llm_jobs) - len(llm_results)
+        if over_budget:
+            print(
+                f"[warn] llm: budget exhausted after {budget.calls_used()} calls; "
+                f"{over_budget} events get fallback keywords and needsAi=true",
+                flush=True,
+            )
+
+    # Pass 3: merge results into the outputs in deterministic event order.
+    for processed_events, (event_id, bucket, is_true_parent_event, rules_text, option_titles) in enumerate(pending, start=1):
+        if processed_events % 10 == 0:
+            print(f"[info] events keyworded: {processed_events}", flush=True)
+
+        sig_core = bucket.get("sigCore") or _event_signature_core(bucket.get("title") or event_id, bucket.get("rulesBest") or "")
+        sig_full = bucket.get("sigFull") or _event_signature_full(
+            event_title=bucket.get("title") or event_id,
+            market_ids=bucket.get("marketIds") or [],
+            option_titles_all=bucket.get("optionTitlesAll") or option_titles,
+            rules_best=bucket.get("rulesBest") or "",
+        )
+
+        reused = False
+        needs_ai = False
+        keywords = []
+        entities = []
+        entity_groups = []
+
+        if event_id in signature_results:
+            reused = True
+            keywords, entities, entity_groups = signature_results[event_id]
+        elif event_id in local_results:
+            keywords, entities, entity_groups = local_results[event_id]
+        elif event_id in resumed_results:
+            keywords, entities, entity_groups = resumed_results[event_id]
+        elif not api_key:
             ai_stats["fallback"] += 1
             keywords = _fallback_keywords(bucket.get("title") or event_id, option_titles, rules_text)
             entity_groups = []
             entities = []
-        else:
+        elif SKIP_AI:
             ai_stats["calls"] += 1
-            try:
-                title_for_ai = bucket.get("title") or event_id
-                best_market_id = bucket.get("bestMarketId")
-                best_market_url = (
-                    f"{FRONTEND_BASE_URL}/market/{best_market_id}?ref={REF_PARAM}"
-                    if best_market_id
-                    else None
-                )
-                allow_terms = {_normalize_keyword(t) for t in _allowed_entity_alias_terms_from_title(title_for_ai)}
-
-                # Skip LLM if SKIP_AI is enabled
-                if SKIP_AI:
-                    keywords = _fallback_keywords(bucket.get("title") or event_id, option_titles, rules_text)
-                    entities = []
-                    entity_groups = []
-                    ai_stats["fallback"] += 1
-                else:
-                    safe_title = _truncate(str(title_for_ai or "").strip(), 160)
-                    print(f"[info] llm: generating entities/keywords for event={event_id} title={safe_title!r}", flush=True)
-                    result = generate_keywords(
-                        api_key,
-                        title=title_for_ai,
-                        rules=rules_text,
-                        context={
-                            "eventId": event_id,
-                            "bestMarketId": best_market_id,
-                            "bestMarketUrl": best_market_url,
-                        },
-                    )
-                    if isinstance(result, dict):
-                        keywords = result.get("keywords", [])
-                        entities = result.get("entities", [])
-                        entity_groups = result.get("entityGroups", []) or result.get("entity_groups", [])
-
-                        # Augment with Chinese translations from dictionary
-                        keywords, entity_groups = augment_with_chinese(keywords, entities, entity_groups)
-                        normalized_try = _normalize_entity_groups(entity_groups, title_for_ai, allow_terms)
-
-                        if not normalized_try:
-                            bad_terms = _collect_invalid_entity_terms(entity_groups, entities, title_for_ai, allow_terms)
-                            ai_stats["retries"] += 1
-                            if bad_terms:
-                                print(
-                                    f"[warn] llm: retrying once for event={event_id} due to invalid entityGroups; avoid={bad_terms}",
-                                    flush=True,
-                                )
-                            else:
-                                print(
-                                    f"[warn] llm: retrying once for event={event_id} due to empty/invalid entityGroups",
-                                    flush=True,
-                                )
-                            retry_ctx = {
-                                "eventId": event_id,
-                                "bestMarketId": best_market_id,
-                                "bestMarketUrl": best_market_url,
-                            }
-                            if bad_terms:
-                                retry_ctx["avoidEntityTerms"] = bad_terms
-                            retry = generate_keywords(
-                                api_key,
-                                title=title_for_ai,
-                                rules=rules_text,
-                                context=retry_ctx,
-                            )
-                            if isinstance(retry, dict):
-                                keywords = retry.get("keywords", keywords)
-                                entities = retry.get("entities", entities)
-                                entity_groups = retry.get("entityGroups", []) or retry.get("entity_groups", [])
-
-                                # Augment retry result with Chinese translations
-                                keywords, entity_groups = augment_with_chinese(keywords, entities, entity_groups)
-                    elif isinstance(result, list):
-                        # Backwards compatibility with old array format
-                        keywords = result
-                        entities = []
-                        entity_groups = []
-            except Exception as exc:
-                ai_stats["errors"] += 1
-                if DEBUG:
-                    print(f"[warn] llm error for event={event_id}: {exc}", flush=True)
-                keywords = _fallback_keywords(bucket.get("title") or event_id, option_titles, rules_text)
-                entities = []
-                entity_groups = []
+            keywords = _fallback_keywords(bucket.get("title") or event_id, option_titles, rules_text)
+            entities = []
+            entity_groups = []
+            ai_stats["fallback"] += 1
+        elif event_id not in llm_results:
+            # Over the LLM budget: deterministic fallback now, backfilled first next run.
+            ai_stats["over_budget"] += 1
+            needs_ai = True
+            keywords = _fallback_keywords(bucket.get("title") or event_id, option_titles, rules_text)
+        else:
+            keywords, entities, entity_groups = llm_results[event_id]
         if not keywords:
             ai_stats["empty"] += 1
         else:
@@ -2286,7 +3470,8 @@ def build_data(markets, api_key, previous_data=None, parent_events=None):
 
         # Always supplement with deterministic title n-grams so short tweets
         # like "Kraken IPO..." still match even if the LLM returns only longer phrases.
-        supplement = _title_ngram_keywords(bucket.get("title") or event_id)
+        title_features = bucket.get("titleFeatures") or TitleFeatures(bucket.get("title") or event_id)
+        supplement = _title_ngram_keywords(title_features)
         for s in supplement:
             if s not in keywords:
                 keywords.append(s)
@@ -2299,7 +3484,7 @@ def build_data(markets, api_key, previous_data=None, parent_events=None):
 
         normalized_entities = []
         normalized_entity_groups = []
-        allow_terms = {_normalize_keyword(t) for t in _allowed_entity_alias_terms_from_title(bucket.get("title") or event_id)}
+        allow_terms = title_features.allow_terms
 
         if isinstance(entity_groups, list) and entity_groups:
             for group in entity_groups:
@@ -2314,7 +3499,7 @@ def build_data(markets, api_key, previous_data=None, parent_events=None):
                         continue
                     if not _is_valid_entity_term(nterm):
                         continue
-                    if not _term_is_from_title(nterm, bucket.get("title") or event_id, allow_terms):
+                    if not _term_is_from_title(nterm, title_features, allow_terms):
                         continue
                     if nterm not in ng:
                         ng.append(nterm)
@@ -2333,7 +3518,7 @@ def build_data(markets, api_key, previous_data=None, parent_events=None):
                     continue
                 if not _is_valid_entity_term(nent):
                     continue
-                if not _term_is_from_title(nent, bucket.get("title") or event_id, allow_terms):
+                if not _term_is_from_title(nent, title_features, allow_terms):
                     continue
                 normalized_entity_groups.append([nent])
                 if len(normalized_entity_groups) >= 2:
@@ -2362,11 +3547,19 @@ def build_data(markets, api_key, previous_data=None, parent_events=None):
                 "sigCore": sig_core,
                 "reused": reused,
             }
+            if needs_ai:
+                events_out[event_id]["needsAi"] = True
 
         if event_id in markets_out:
             markets_out[event_id]["keywords"] = normalized
             markets_out[event_id]["entities"] = normalized_entities
             markets_out[event_id]["entityGroups"] = normalized_entity_groups
+            # Lets the next build reuse these results by signature for binary markets too.
+            markets_out[event_id]["sigCore"] = sig_core
+            if needs_ai:
+                markets_out[event_id]["needsAi"] = True
+            else:
+                markets_out[event_id].pop("needsAi", None)
             if event_id in events_out and events_out[event_id].get("bestLabels"):
                 markets_out[event_id]["labels"] = events_out[event_id]["bestLabels"]
 
@@ -2385,9 +3578,6 @@ def build_data(markets, api_key, previous_data=None, parent_events=None):
             event_inverted.setdefault(term, set()).add(event_id)
             inverted.setdefault(term, set()).add(event_id)
 
-        if sleep_seconds > 0 and api_key:
-            time.sleep(sleep_seconds)
-
     # Remove pseudo-parent events (binary markets wrapped as events) from events_out
     # These should only exist in markets_out, not events_out
     if pseudo_parent_event_ids:
@@ -2554,6 +3744,11 @@ def build_data(markets, api_key, previous_data=None, parent_events=None):
                         flush=True,
                     )
 
+    llm_cache_after = llm_cache.stats_snapshot()
+    ai_stats["cache_hits"] = llm_cache_after["hits"] - llm_cache_before["hits"]
+    ai_stats["cache_misses"] = llm_cache_after["misses"] - llm_cache_before["misses"]
+    ai_stats["client"] = llm_pool.stats_snapshot()
+
     if validation_errors:
         print(f"[warn] data validation found {len(validation_errors)} errors:", flush=True)
         for error in validation_errors[:10]:  # Show first 10 errors
@@ -2619,17 +3814,32 @@ def main():
             flush=True,
         )
 
-    print("[info] fetching markets...", flush=True)
-    markets = fetch_all_markets()
-    print(f"[info] fetched {len(markets)} market nodes (including parents)", flush=True)
-
-    print("[info] fetching parent events for cutoff validation...", flush=True)
-    parent_events = fetch_parent_events()
+    started_at = _now_epoch_seconds()
+    print("[info] fetching markets, parent events and previous data...", flush=True)
+    inputs = fetch_startup_inputs(os.path.join(os.path.dirname(os.path.dirname(__file__)), "data.json"))
+    markets_body = inputs.markets_body
+    parent_events = inputs.parent_events
+    previous_data = inputs.previous_data
+
+    if _unchanged_since_last_build(markets_body, parent_events, output_path, api_key, started_at):
+        print("[info] markets and wrap-events unchanged since last build and no cutoff crossed; skipping rebuild", flush=True)
+        http_client.log_stats()
+        return
+
+    if STREAM_MARKETS:
+        print("[info] streaming markets (parsed incrementally during build)...", flush=True)
+        markets = iter_all_markets(markets_body)
+    else:
+        markets = _markets_from_payload(markets_body.json())
+        print(f"[info] fetched {len(markets)} market nodes (including parents)", flush=True)
 
-    previous_data = _load_previous_data(os.path.join(os.path.dirname(os.path.dirname(__file__)), "data.json"))
     if previous_data is not None:
         print("[info] loaded previous data for reuse", flush=True)
-    data = build_data(markets, api_key=api_key, previous_data=previous_data, parent_events=parent_events)
+    checkpoint = llm_checkpoint.Journal("build_index")
+    checkpoint.load()
+    data = build_data(
+        markets, api_key=api_key, previous_data=previous_data, parent_events=parent_events, checkpoint=checkpoint
+    )
 
     output_dir = os.path.dirname(output_path)
     if output_dir:
@@ -2639,6 +3849,10 @@ def main():
         f.write("\n")
 
     print(f"[info] wrote {output_path}", flush=True)
+    checkpoint.clear()
+    _write_build_state(output_path, started_at, api_key, markets_body, data)
+    http_client.log_stats()
+    llm_pool.log_stats()
 
 
 if __name__ == "__main__":
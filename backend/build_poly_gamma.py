@@ -1,12 +1,18 @@
 import json
 import os
+import queue
+import threading
 import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timezone
-from typing import Any, Dict, Iterable, List, Optional, Tuple
-
-import requests
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
 import build_index as opinion_build
+import http_client
+import llm_cache
+import llm_checkpoint
+import llm_pool
 
 
 GAMMA_API_BASE = os.environ.get("POLY_GAMMA_API_BASE", "").strip() or "https://gamma-api.polymarket.com"
@@ -17,6 +23,20 @@ SKIP_AI = os.environ.get("SKIP_AI", "").strip().lower() in ("1", "true", "yes",
 INCREMENTAL_ONLY = os.environ.get("INCREMENTAL_ONLY", "0").strip().lower() in ("1", "true", "yes", "y", "on")
 SCAN_LOG_EVERY = int(os.environ.get("POLY_SCAN_LOG_EVERY", "200"))
 FETCH_LOG_EVERY_PAGES = int(os.environ.get("POLY_FETCH_LOG_EVERY_PAGES", "5"))
+# Number of Gamma `/events` pages kept in flight while crawling (1 = strictly sequential).
+FETCH_CONCURRENCY = max(1, int(os.environ.get("POLY_FETCH_CONCURRENCY", "4")))
+# Overlap crawling with processing: pages are fetched by a background producer while
+# `build_poly_data` consumes events; at most POLY_PIPELINE_QUEUE_PAGES pages are buffered.
+PIPELINE = os.environ.get("POLY_PIPELINE", "1").strip().lower() in ("1", "true", "yes", "y", "on")
+PIPELINE_QUEUE_PAGES = max(1, int(os.environ.get("POLY_PIPELINE_QUEUE_PAGES", "8")))
+# Push the volume threshold down to Gamma as `volume_min` (expiry stays client-side).
+SERVER_FILTERS = os.environ.get("POLY_SERVER_FILTERS", "1").strip().lower() in ("1", "true", "yes", "y", "on")
+
+# Fields of an event / nested market that `build_poly_data` reads; everything else
+# is dropped as soon as a page arrives.
+_EVENT_FIELDS = ("id", "slug", "title", "description", "endDate", "volume", "volumeNum", "closed", "archived")
+_MARKET_FIELDS = ("id", "slug", "question", "endDate", "volume", "volumeNum", "closed", "outcomes")
+_TAG_FIELDS = ("id", "slug")
 
 MODEL_NAME = getattr(opinion_build, "MODEL_NAME", "GLM-4.6")
 
@@ -133,8 +153,47 @@ def _extract_best_outcomes(event: Dict[str, Any], now_epoch_seconds: int) -> Opt
     return None
 
 
-def fetch_events_page(limit: int, offset: int) -> List[Dict[str, Any]]:
-    """Fetch one page of active Polymarket events from Gamma API."""
+def _filter_thresholds() -> Tuple[float, int]:
+    min_volume = float(os.environ.get("POLY_MIN_VOLUME_NUM", "10000"))
+    min_minutes_to_expiry = int(os.environ.get("POLY_MIN_MINUTES_TO_EXPIRY", "60"))
+    return min_volume, min_minutes_to_expiry
+
+
+def _server_filter_params() -> Dict[str, str]:
+    """Gamma query parameters mirroring the `build_poly_data` volume filter.
+
+    The server only pre-filters (a superset of what survives locally); the
+    client-side checks in `build_poly_data` remain authoritative. The expiry bound
+    is not sent as `end_date_min`: events without an endDate would be dropped by
+    the server, while the local check lets them through.
+    """
+    if not SERVER_FILTERS:
+        return {}
+    min_volume, _ = _filter_thresholds()
+    params: Dict[str, str] = {}
+    if min_volume > 0:
+        params["volume_min"] = f"{min_volume:g}"
+    return params
+
+
+def _project_event(event: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep only the event fields `build_poly_data` reads (closed markets are dropped)."""
+    out = {k: event[k] for k in _EVENT_FIELDS if k in event}
+    tags = event.get("tags")
+    if isinstance(tags, list):
+        out["tags"] = [{k: t[k] for k in _TAG_FIELDS if k in t} for t in tags if isinstance(t, dict)]
+    markets = event.get("markets")
+    if isinstance(markets, list):
+        out["markets"] = [
+            {k: m[k] for k in _MARKET_FIELDS if k in m}
+            for m in markets
+            if isinstance(m, dict) and m.get("closed") is not True
+        ]
+    return out
+
+
+def fetch_events_page(limit: int, offset: int, filters: Optional[Dict[str, str]] = None) -> List[Dict[str, Any]]:
+    """Fetch one page of active Polymarket events from Gamma API (projected to needed fields)."""
     params = {
         "closed": "false",
         "order": "id",
@@ -142,33 +201,132 @@ def fetch_events_page(limit: int, offset: int) -> List[Dict[str, Any]]:
         "limit": str(limit),
         "offset": str(offset),
     }
+    if filters:
+        params.update(filters)
     url = f"{GAMMA_API_BASE.rstrip('/')}/events"
-    resp = requests.get(url, params=params, timeout=30)
+    resp = http_client.get(url, endpoint="gamma.events", params=params, timeout=30)
     resp.raise_for_status()
     payload = resp.json()
-    return payload if isinstance(payload, list) else []
+    if not isinstance(payload, list):
+        return []
+    return [_project_event(item) if isinstance(item, dict) else item for item in payload]
 
 
-def fetch_all_events(limit: int, max_events: Optional[int] = None) -> List[Dict[str, Any]]:
-    offset = 0
-    out: List[Dict[str, Any]] = []
+def iter_event_pages(limit: int, max_events: Optional[int] = None, concurrency: Optional[int] = None) -> Iterator[List[Dict[str, Any]]]:
+    """Yield Gamma event pages in offset order while keeping several offsets in flight.
+
+    Up to `concurrency` pages are requested ahead of the consumer; pages are still
+    yielded strictly in offset order, and the crawl stops at the first empty page
+    (requests already issued beyond it are discarded).
+    """
+    workers = max(1, concurrency if concurrency is not None else FETCH_CONCURRENCY)
+    offset_cap = None
+    if max_events is not None:
+        # Never request offsets that cannot contribute to the first `max_events` items.
+        offset_cap = max(max_events, 1)
+
+    filters = _server_filter_params()
+    if filters:
+        print(f"[info] gamma server-side filters: {filters}", flush=True)
+
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gamma-fetch")
+    in_flight = deque()
+    next_offset = 0
     pages = 0
-    while True:
+
+    def submit() -> None:
+        nonlocal next_offset, pages
+        if offset_cap is not None and next_offset >= offset_cap:
+            return
         pages += 1
         if FETCH_LOG_EVERY_PAGES > 0 and pages % FETCH_LOG_EVERY_PAGES == 1:
-            print(f"[info] fetching gamma events page offset={offset} limit={limit}", flush=True)
-        page = fetch_events_page(limit=limit, offset=offset)
-        if not page:
-            break
+            print(f"[info] fetching gamma events page offset={next_offset} limit={limit}", flush=True)
+        in_flight.append(pool.submit(fetch_events_page, limit=limit, offset=next_offset, filters=filters))
+        next_offset += limit
+
+    try:
+        for _ in range(workers):
+            submit()
+        while in_flight:
+            page = in_flight.popleft().result()
+            if not page:
+                break
+            yield page
+            submit()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def fetch_all_events(limit: int, max_events: Optional[int] = None) -> List[Dict[str, Any]]:
+    out: List[Dict[str, Any]] = []
+    for page in iter_event_pages(limit=limit, max_events=max_events):
         for item in page:
             if isinstance(item, dict):
                 out.append(item)
                 if max_events is not None and len(out) >= max_events:
                     return out
-        offset += limit
     return out
 
 
+class _ProducerFailed:
+    def __init__(self, exc: BaseException):
+        self.exc = exc
+
+
+_PRODUCER_DONE = object()
+
+
+def iter_events_pipelined(limit: int, max_events: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """Stream events in crawl order while later pages download in the background.
+
+    Yields exactly the events `fetch_all_events` would return, in the same order;
+    a crawl error is re-raised in the consumer.
+    """
+    buffer: "queue.Queue[Any]" = queue.Queue(maxsize=PIPELINE_QUEUE_PAGES)
+    stop = threading.Event()
+
+    def put(item: Any) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        pages = iter_event_pages(limit=limit, max_events=max_events)
+        try:
+            for page in pages:
+                if not put(page):
+                    return
+        except BaseException as exc:
+            put(_ProducerFailed(exc))
+        finally:
+            pages.close()
+            put(_PRODUCER_DONE)
+
+    producer = threading.Thread(target=produce, name="gamma-producer", daemon=True)
+    producer.start()
+    emitted = 0
+    try:
+        while True:
+            item = buffer.get()
+            if item is _PRODUCER_DONE:
+                return
+            if isinstance(item, _ProducerFailed):
+                raise item.exc
+            for event in item:
+                if not isinstance(event, dict):
+                    continue
+                yield event
+                emitted += 1
+                if max_events is not None and emitted >= max_events:
+                    return
+    finally:
+        stop.set()
+
+
 def _build_event_rules_text(title: str, description: str, option_titles: List[str]) -> str:
     rules = (description or "").strip()
     if option_titles:
@@ -194,17 +352,58 @@ def _normalize_keywords(raw_keywords: Any) -> List[str]:
     return normalized
 
 
-def _build_keywords_and_entities(
-    api_key: Optional[str],
-    event_id: str,
+class _OverBudget(Exception):
+    """Raised instead of calling the LLM once the build's `llm_pool.CallBudget` is spent."""
+
+
+def _fallback_keywords_and_entities(
     title: str,
     rules_text: str,
     option_titles: List[str],
-    previous: Optional[Dict[str, Any]],
+    title_features: Optional[opinion_build.TitleFeatures] = None,
+) -> Tuple[List[str], List[str], List[List[str]], bool]:
+    keywords = opinion_build._fallback_keywords(title, option_titles, rules_text, max_keywords=25)
+    entity_groups = opinion_build._fallback_entity_groups_from_title(title_features or title)
+    entities = [g[0] for g in entity_groups if g]
+    return keywords[:18], entities[:3], entity_groups, False
+
+
+def _migrate_previous_signatures(
+    prev: Optional[Dict[str, Any]],
+    title: str,
+    market_ids: List[str],
+    option_titles: List[str],
+    rules_text: str,
     sig_core: str,
     sig_full: str,
-) -> Tuple[List[str], List[str], List[List[str]], bool]:
+) -> Optional[Dict[str, Any]]:
+    """`prev` with pre-v2 signatures replaced by the current ones when they hash the same event."""
+    if not isinstance(prev, dict):
+        return prev
+    stored_full = prev.get("sigFull") or prev.get("sig")
+    if not (opinion_build._is_legacy_signature(prev.get("sigCore")) or opinion_build._is_legacy_signature(stored_full)):
+        return prev
+    migrated = dict(prev)
+    if opinion_build._signature_matches(
+        prev.get("sigCore"), sig_core, lambda: opinion_build._legacy_event_signature_core(title, rules_text)
+    ):
+        migrated["sigCore"] = sig_core
+    if opinion_build._signature_matches(
+        stored_full,
+        sig_full,
+        lambda: opinion_build._legacy_event_signature_full(title, market_ids, option_titles, rules_text),
+    ):
+        migrated["sigFull"] = sig_full
+    return migrated
+
+
+def _reuse_previous_keywords(
+    previous: Optional[Dict[str, Any]], sig_core: str, sig_full: str
+) -> Optional[Tuple[List[str], List[str], List[List[str]], bool]]:
     prev = previous or {}
+    if prev.get("needsAi"):
+        # Fallback output from a run that ran out of LLM budget; regenerate it.
+        return None
     prev_sig_core = str(prev.get("sigCore") or "").strip()
     prev_sig_full = str(prev.get("sigFull") or prev.get("sig") or "").strip()
     if (prev_sig_core and prev_sig_core == sig_core) or (prev_sig_full and prev_sig_full == sig_full):
@@ -219,12 +418,32 @@ def _build_keywords_and_entities(
         groups = prev.get("entityGroups") if isinstance(prev.get("entityGroups"), list) else []
         if kws and groups:
             return list(kws), list(entities), list(groups), True
+    return None
 
+
+def _build_keywords_and_entities(
+    api_key: Optional[str],
+    event_id: str,
+    title: str,
+    rules_text: str,
+    option_titles: List[str],
+    previous: Optional[Dict[str, Any]],
+    sig_core: str,
+    sig_full: str,
+    start_tier: int = 0,
+    budget: Optional[llm_pool.CallBudget] = None,
+    title_features: Optional[opinion_build.TitleFeatures] = None,
+) -> Tuple[List[str], List[str], List[List[str]], bool]:
+    reused = _reuse_previous_keywords(previous, sig_core, sig_full)
+    if reused is not None:
+        return reused
+
+    features = title_features or opinion_build.TitleFeatures(title)
     if SKIP_AI:
-        keywords = opinion_build._fallback_keywords(title, option_titles, rules_text, max_keywords=25)
-        entity_groups = opinion_build._fallback_entity_groups_from_title(title)
-        entities = [g[0] for g in entity_groups if g]
-        return keywords[:18], entities[:3], entity_groups, False
+        return _fallback_keywords_and_entities(title, rules_text, option_titles, features)
+
+    if budget is not None and budget.exhausted():
+        raise _OverBudget()
 
     if not api_key:
         raise ValueError("Missing ZHIPU_KEY environment variable (required unless SKIP_AI/INCREMENTAL_ONLY).")
@@ -235,23 +454,86 @@ def _build_keywords_and_entities(
     if len(safe_title) > 160:
         safe_title = safe_title[:160].rstrip() + "..."
     print(f"[info] llm: generate_keywords start event={event_id} title={safe_title!r}", flush=True)
-    result = opinion_build.generate_keywords(api_key, title, rules_text, context=context)
+    result = opinion_build.generate_keywords_cascade(
+        api_key, title, rules_text, context=context, start_tier=start_tier, title_features=features
+    )
     elapsed_ms = int((time.time() - started) * 1000)
     print(f"[info] llm: generate_keywords done event={event_id} elapsedMs={elapsed_ms}", flush=True)
     keywords = _normalize_keywords(result.get("keywords"))
-    allow_terms = opinion_build._allowed_entity_alias_terms_from_title(title)
-    entity_groups = opinion_build._normalize_entity_groups(result.get("entityGroups"), title, allow_terms)
+    entity_groups = opinion_build._normalize_entity_groups(result.get("entityGroups"), features, features.allow_terms)
     if not entity_groups:
-        entity_groups = opinion_build._fallback_entity_groups_from_title(title)
+        entity_groups = opinion_build._fallback_entity_groups_from_title(features)
     entities = [g[0] for g in entity_groups if g]
     return keywords[:18], entities[:3], entity_groups, False
 
 
-def build_poly_data(events: Iterable[Dict[str, Any]], api_key: Optional[str], previous_data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+def _local_keywords(
+    title: opinion_build.TitleFeatures, option_titles: List[str]
+) -> Optional[Tuple[List[str], List[str], List[List[str]], bool]]:
+    """Dictionary-first tier: the local extraction when it is confident enough, else None."""
+    local = opinion_build._local_keywords_and_entities(title, option_titles)
+    if local["confidence"] < opinion_build.LOCAL_TIER_MIN_CONFIDENCE:
+        return None
+    keywords = _normalize_keywords(local["keywords"])
+    entity_groups = local["entityGroups"]
+    entities = [g[0] for g in entity_groups if g]
+    return keywords[:18], entities[:3], entity_groups, False
+
+
+def _build_keywords_batch(jobs: List[Dict[str, Any]]) -> List[Tuple[List[str], List[str], List[List[str]], bool]]:
+    """Batched counterpart of `_build_keywords_and_entities` for events that need the LLM.
+
+    `jobs` are `_build_keywords_and_entities` keyword arguments. The batch asks the
+    first model of the cascade; entries it answers with valid entityGroups are used
+    directly, the rest fall back to a single-event call on the next tier.
+    """
+    api_key = jobs[0]["api_key"]
+    budget = jobs[0].get("budget")
+    if budget is not None and budget.exhausted():
+        raise _OverBudget()
+    model = opinion_build.MODEL_CASCADE[0]
+    cascading = len(opinion_build.MODEL_CASCADE) > 1
+    print(f"[info] llm: generate_keywords batch of {len(jobs)} events", flush=True)
+    results = opinion_build.generate_keywords_batch(
+        api_key, [(job["event_id"], job["title"], job["rules_text"]) for job in jobs], model=model
+    )
+    out = []
+    for job in jobs:
+        features = job.get("title_features") or opinion_build.TitleFeatures(job["title"])
+        result = results.get(job["event_id"])
+        entity_groups: List[List[str]] = []
+        if result and (not cascading or opinion_build._cascade_accepts(result, features)):
+            entity_groups = opinion_build._normalize_entity_groups(result.get("entityGroups"), features, features.allow_terms)
+        if cascading or entity_groups:
+            llm_pool.record_tier_result(model, escalated=not entity_groups)
+        if not entity_groups:
+            # The batch was admitted under the budget; finish its leftovers too.
+            out.append(_build_keywords_and_entities(**{**job, "budget": None}, start_tier=1))
+            continue
+        keywords = _normalize_keywords(result.get("keywords"))
+        entities = [g[0] for g in entity_groups if g]
+        out.append((keywords[:18], entities[:3], entity_groups, False))
+    return out
+
+
+def _journal_result(checkpoint: llm_checkpoint.Journal, event_id: str, sig_core: str, done: Future) -> None:
+    """Append a finished LLM result to the checkpoint journal (runs on the worker thread)."""
+    if done.cancelled() or done.exception() is not None:
+        return
+    keywords, entities, entity_groups, reused = done.result()
+    if entity_groups and not reused:
+        checkpoint.record(event_id, sig_core, keywords, entities, entity_groups)
+
+
+def build_poly_data(
+    events: Iterable[Dict[str, Any]],
+    api_key: Optional[str],
+    previous_data: Optional[Dict[str, Any]],
+    checkpoint: Optional[llm_checkpoint.Journal] = None,
+) -> Dict[str, Any]:
     now = _now_epoch_seconds()
 
-    min_volume = float(os.environ.get("POLY_MIN_VOLUME_NUM", "10000"))
-    min_minutes_to_expiry = int(os.environ.get("POLY_MIN_MINUTES_TO_EXPIRY", "60"))
+    min_volume, min_minutes_to_expiry = _filter_thresholds()
     min_expiry_epoch = now + (min_minutes_to_expiry * 60)
 
     events_out: Dict[str, Any] = {}
@@ -273,143 +555,255 @@ def build_poly_data(events: Iterable[Dict[str, Any]], api_key: Optional[str], pr
 
     seen = 0
     kept = 0
+    pending: List[Dict[str, Any]] = []
+    tier_counts = {"local_tier": 0, "escalated": 0, "over_budget": 0, "resumed": 0}
+    budget = llm_pool.CallBudget()
+    # With a budget, LLM work waits for the end of the crawl so it can start in the
+    # same priority order as build_index (previous `needsAi` first, then by volume)
+    # and the budget cuts the least important events rather than the tail of
+    # Gamma's order. Without one, it overlaps the crawl.
+    deferred: List[Tuple[Dict[str, Any], Dict[str, Any]]] = []
+    llm_cache_before = llm_cache.stats_snapshot()
+
+    with llm_pool.OrderedPool() as pool:
+        batcher = None
+        if llm_pool.LLM_BATCH_SIZE > 1 and api_key and not SKIP_AI:
+            batcher = llm_pool.Batcher(pool, _build_keywords_batch, llm_pool.LLM_BATCH_SIZE)
+
+        def submit_llm(job: Dict[str, Any]) -> Future:
+            if batcher is not None:
+                future = batcher.submit(job)
+            else:
+                future = pool.submit(_build_keywords_and_entities, **job)
+            if checkpoint is not None:
+                event_id, sig_core = job["event_id"], job["sig_core"]
+                future.add_done_callback(
+                    lambda done, event_id=event_id, sig_core=sig_core: _journal_result(checkpoint, event_id, sig_core, done)
+                )
+            return future
+
+        for event in events:
+            if not isinstance(event, dict):
+                continue
+            seen += 1
+            if SCAN_LOG_EVERY > 0 and seen % SCAN_LOG_EVERY == 0:
+                print(f"[info] scanned {seen} events (kept {kept})", flush=True)
 
-    for event in events:
-        if not isinstance(event, dict):
-            continue
-        seen += 1
-        if SCAN_LOG_EVERY > 0 and seen % SCAN_LOG_EVERY == 0:
-            print(f"[info] scanned {seen} events (kept {kept})", flush=True)
-
-        if event.get("closed") is True:
-            skipped["closed"] += 1
-            continue
-        if event.get("archived") is True:
-            skipped["archived"] += 1
-            continue
-
-        event_id = _safe_str(event.get("slug") or event.get("id"))
-        if not event_id:
-            skipped["missing_id"] += 1
-            continue
-
-        title = _safe_str(event.get("title"))
-        if not title:
-            skipped["missing_title"] += 1
-            continue
-
-        end_epoch = _parse_iso_epoch_seconds(event.get("endDate"))
-        if end_epoch is not None and end_epoch <= now:
-            skipped["event_ended"] += 1
-            continue
-        if end_epoch is not None and end_epoch <= min_expiry_epoch:
-            skipped["expired_or_too_soon"] += 1
-            continue
-
-        volume = _parse_float(event.get("volume") or event.get("volumeNum"))
-        if volume < min_volume:
-            skipped["low_volume"] += 1
-            continue
-
-        option_titles = _extract_option_titles(event, now_epoch_seconds=now)
-        rules_text = _build_event_rules_text(title, _safe_str(event.get("description")), option_titles)
+            if event.get("closed") is True:
+                skipped["closed"] += 1
+                continue
+            if event.get("archived") is True:
+                skipped["archived"] += 1
+                continue
 
-        market_ids = []
-        active_market_count = 0
-        markets = event.get("markets")
-        if isinstance(markets, list):
-            for m in markets:
-                if not isinstance(m, dict):
-                    continue
-                if m.get("closed") is True:
-                    continue
-                m_end_epoch = _parse_iso_epoch_seconds(m.get("endDate"))
-                if m_end_epoch is not None and m_end_epoch <= now:
-                    continue
-                active_market_count += 1
-                mid = _safe_str(m.get("id") or m.get("slug"))
-                if mid:
-                    market_ids.append(mid)
-                if len(market_ids) >= 200:
-                    break
-        if active_market_count <= 0:
-            skipped["no_active_markets"] += 1
-            continue
+            event_id = _safe_str(event.get("slug") or event.get("id"))
+            if not event_id:
+                skipped["missing_id"] += 1
+                continue
 
-        sig_core = opinion_build._event_signature_core(title, rules_text)
-        sig_full = opinion_build._event_signature_full(title, market_ids, option_titles, rules_text)
-
-        prev = prev_events.get(event_id) if isinstance(prev_events, dict) else None
-        keywords, entities, entity_groups, reused = _build_keywords_and_entities(
-            api_key=api_key,
-            event_id=event_id,
-            title=title,
-            rules_text=rules_text,
-            option_titles=option_titles,
-            previous=prev if isinstance(prev, dict) else None,
-            sig_core=sig_core,
-            sig_full=sig_full,
-        )
-        if DEBUG:
-            print(
-                f"[debug] event={event_id} reused={reused} keywords={len(keywords)} entityGroups={len(entity_groups)}",
-                flush=True,
-            )
+            title = _safe_str(event.get("title"))
+            if not title:
+                skipped["missing_title"] += 1
+                continue
 
-        outcomes = _extract_best_outcomes(event, now_epoch_seconds=now)
-        best_labels = {"outcomes": outcomes} if outcomes else None
-        is_sports = _event_is_sports(event)
-        tags = event.get("tags") if isinstance(event.get("tags"), list) else []
-        tag_slugs = [
-            str(t.get("slug")).strip()
-            for t in tags
-            if isinstance(t, dict) and str(t.get("slug") or "").strip()
-        ]
+            end_epoch = _parse_iso_epoch_seconds(event.get("endDate"))
+            if end_epoch is not None and end_epoch <= now:
+                skipped["event_ended"] += 1
+                continue
+            if end_epoch is not None and end_epoch <= min_expiry_epoch:
+                skipped["expired_or_too_soon"] += 1
+                continue
 
-        events_out[event_id] = {
-            "title": title,
-            "marketIds": [event_id],
-            "bestMarketId": event_id,
-            "bestLabels": best_labels,
-            "keywords": keywords,
-            "entities": entities,
-            "entityGroups": entity_groups,
-            "sig": sig_full,
-            "sigFull": sig_full,
-            "sigCore": sig_core,
-            "reused": reused,
-            "provider": "polymarket",
-        }
-
-        markets_out[event_id] = {
-            "title": title,
-            "url": _event_url(event_id),
-            "volume": volume,
-            "labels": best_labels,
-            "keywords": keywords,
-            "entities": entities,
-            "entityGroups": entity_groups,
-            "endDate": _safe_str(event.get("endDate")),
-            "isSports": is_sports,
-            "tags": tag_slugs,
-            "provider": "polymarket",
-        }
+            volume = _parse_float(event.get("volume") or event.get("volumeNum"))
+            if volume < min_volume:
+                skipped["low_volume"] += 1
+                continue
 
-        for term in keywords:
-            inverted.setdefault(term, set()).add(event_id)
-        for group in entity_groups or []:
-            if not isinstance(group, list):
+            option_titles = _extract_option_titles(event, now_epoch_seconds=now)
+            rules_text = _build_event_rules_text(title, _safe_str(event.get("description")), option_titles)
+
+            market_ids = []
+            active_market_count = 0
+            markets = event.get("markets")
+            if isinstance(markets, list):
+                for m in markets:
+                    if not isinstance(m, dict):
+                        continue
+                    if m.get("closed") is True:
+                        continue
+                    m_end_epoch = _parse_iso_epoch_seconds(m.get("endDate"))
+                    if m_end_epoch is not None and m_end_epoch <= now:
+                        continue
+                    active_market_count += 1
+                    mid = _safe_str(m.get("id") or m.get("slug"))
+                    if mid:
+                        market_ids.append(mid)
+                    if len(market_ids) >= 200:
+                        break
+            if active_market_count <= 0:
+                skipped["no_active_markets"] += 1
                 continue
-            for term in group:
-                nterm = opinion_build._normalize_keyword(term)
-                if nterm:
-                    inverted.setdefault(nterm, set()).add(event_id)
 
-        kept += 1
-        if DEBUG and kept % 50 == 0:
-            print(f"[debug] kept {kept} events (scanned {seen})", flush=True)
+            sig_core = opinion_build._event_signature_core(title, rules_text)
+            sig_full = opinion_build._event_signature_full(title, market_ids, option_titles, rules_text)
+
+            prev = prev_events.get(event_id) if isinstance(prev_events, dict) else None
+            prev = _migrate_previous_signatures(prev, title, market_ids, option_titles, rules_text, sig_core, sig_full)
+            # Keyword generation runs on the LLM pool while the crawl continues; outputs
+            # are assembled below in event order.
+            job = {
+                "api_key": api_key,
+                "event_id": event_id,
+                "title": title,
+                "rules_text": rules_text,
+                "option_titles": option_titles,
+                "previous": prev if isinstance(prev, dict) else None,
+                "sig_core": sig_core,
+                "sig_full": sig_full,
+                "budget": budget,
+                # Shared by the local tier, the LLM validation and the fallback.
+                "title_features": opinion_build.TitleFeatures(title),
+            }
+            needs_ai = not SKIP_AI and _reuse_previous_keywords(job["previous"], sig_core, sig_full) is None
+            ready = None
+            if needs_ai and checkpoint is not None:
+                resumed = checkpoint.lookup(
+                    event_id,
+                    sig_core,
+                    legacy_sig_core=lambda: opinion_build._legacy_event_signature_core(title, rules_text),
+                )
+                if resumed is not None:
+                    tier_counts["resumed"] += 1
+                    ready = (resumed.get("keywords") or [], resumed.get("entities") or [], resumed.get("entityGroups") or [], False)
+            if ready is None and needs_ai and opinion_build.LOCAL_TIER:
+                ready = _local_keywords(job["title_features"], option_titles)
+                tier_counts["escalated" if ready is None else "local_tier"] += 1
+            future = None
+            if ready is not None:
+                future = Future()
+                future.set_result(ready)
+            elif not needs_ai:
+                future = pool.submit(_build_keywords_and_entities, **job)
+            elif not budget.limited():
+                future = submit_llm(job)
+
+            outcomes = _extract_best_outcomes(event, now_epoch_seconds=now)
+            best_labels = {"outcomes": outcomes} if outcomes else None
+            is_sports = _event_is_sports(event)
+            tags = event.get("tags") if isinstance(event.get("tags"), list) else []
+            tag_slugs = [
+                str(t.get("slug")).strip()
+                for t in tags
+                if isinstance(t, dict) and str(t.get("slug") or "").strip()
+            ]
+            pending.append(
+                {
+                    "eventId": event_id,
+                    "title": title,
+                    "volume": volume,
+                    "bestLabels": best_labels,
+                    "endDate": _safe_str(event.get("endDate")),
+                    "isSports": is_sports,
+                    "tags": tag_slugs,
+                    "sigCore": sig_core,
+                    "sigFull": sig_full,
+                    "rulesText": rules_text,
+                    "optionTitles": option_titles,
+                    "titleFeatures": job["title_features"],
+                    "future": future,
+                }
+            )
+            if future is None:
+                deferred.append((pending[-1], job))
+
+            kept += 1
+            if DEBUG and kept % 50 == 0:
+                print(f"[debug] kept {kept} events (scanned {seen})", flush=True)
+
+        deferred.sort(key=lambda entry: (not (entry[1]["previous"] or {}).get("needsAi"), -entry[0]["volume"]))
+        if deferred:
+            # The deferred LLM stage starts now; its time budget counts from here.
+            budget = llm_pool.CallBudget()
+        for item, job in deferred:
+            item["future"] = submit_llm({**job, "budget": budget})
+        if batcher is not None:
+            batcher.flush()
+
+        for item in pending:
+            event_id = item["eventId"]
+            title = item["title"]
+            sig_core = item["sigCore"]
+            sig_full = item["sigFull"]
+            best_labels = item["bestLabels"]
+            needs_ai = False
+            try:
+                keywords, entities, entity_groups, reused = item["future"].result()
+            except _OverBudget:
+                # The budget cut this event (lowest priority); `needsAi` keeps the next
+                # run from reusing this fallback output and puts it first in line.
+                tier_counts["over_budget"] += 1
+                needs_ai = True
+                keywords, entities, entity_groups, reused = _fallback_keywords_and_entities(
+                    title, item["rulesText"], item["optionTitles"], item["titleFeatures"]
+                )
+            if DEBUG:
+                print(
+                    f"[debug] event={event_id} reused={reused} keywords={len(keywords)} entityGroups={len(entity_groups)}",
+                    flush=True,
+                )
+
+            events_out[event_id] = {
+                "title": title,
+                "marketIds": [event_id],
+                "bestMarketId": event_id,
+                "bestLabels": best_labels,
+                "keywords": keywords,
+                "entities": entities,
+                "entityGroups": entity_groups,
+                "sig": sig_full,
+                "sigFull": sig_full,
+                "sigCore": sig_core,
+                "reused": reused,
+                "provider": "polymarket",
+            }
+            if needs_ai:
+                events_out[event_id]["needsAi"] = True
+
+            markets_out[event_id] = {
+                "title": title,
+                "url": _event_url(event_id),
+                "volume": item["volume"],
+                "labels": best_labels,
+                "keywords": keywords,
+                "entities": entities,
+                "entityGroups": entity_groups,
+                "endDate": item["endDate"],
+                "isSports": item["isSports"],
+                "tags": item["tags"],
+                "provider": "polymarket",
+            }
+
+            for term in keywords:
+                inverted.setdefault(term, set()).add(event_id)
+            for group in entity_groups or []:
+                if not isinstance(group, list):
+                    continue
+                for term in group:
+                    nterm = opinion_build._normalize_keyword(term)
+                    if nterm:
+                        inverted.setdefault(nterm, set()).add(event_id)
 
     index_out = {kw: sorted(list(ids)) for kw, ids in sorted(inverted.items(), key=lambda kv: kv[0])}
+    llm_cache_after = llm_cache.stats_snapshot()
+    ai_stats = {
+        "cache_hits": llm_cache_after["hits"] - llm_cache_before["hits"],
+        "cache_misses": llm_cache_after["misses"] - llm_cache_before["misses"],
+        "local_tier": tier_counts["local_tier"],
+        "escalated": tier_counts["escalated"],
+        "over_budget": tier_counts["over_budget"],
+        "resumed": tier_counts["resumed"],
+        "client": llm_pool.stats_snapshot(),
+    }
 
     return {
         "meta": {
@@ -421,6 +815,7 @@ def build_poly_data(events: Iterable[Dict[str, Any]], api_key: Optional[str], pr
             "filters": {
                 "minVolumeNum": min_volume,
                 "minMinutesToExpiry": min_minutes_to_expiry,
+                "serverSide": SERVER_FILTERS,
             },
             "debug": DEBUG,
             "counts": {
@@ -430,6 +825,7 @@ def build_poly_data(events: Iterable[Dict[str, Any]], api_key: Optional[str], pr
                 "markets": len(markets_out),
                 "keywords": len(index_out),
                 "skipped": skipped,
+                "ai": ai_stats,
             },
         },
         "events": events_out,
@@ -462,10 +858,16 @@ def main() -> None:
         flush=True,
     )
 
-    events = fetch_all_events(limit=page_limit, max_events=max_events)
-    print(f"[info] fetched {len(events)} events", flush=True)
+    if PIPELINE:
+        print(f"[info] pipelined crawl: up to {PIPELINE_QUEUE_PAGES} pages buffered ahead of processing", flush=True)
+        events: Iterable[Dict[str, Any]] = iter_events_pipelined(limit=page_limit, max_events=max_events)
+    else:
+        events = fetch_all_events(limit=page_limit, max_events=max_events)
+        print(f"[info] fetched {len(events)} events", flush=True)
 
-    data = build_poly_data(events=events, api_key=api_key, previous_data=previous)
+    checkpoint = llm_checkpoint.Journal("build_poly_gamma")
+    checkpoint.load()
+    data = build_poly_data(events=events, api_key=api_key, previous_data=previous, checkpoint=checkpoint)
 
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
     with open(output_path, "w", encoding="utf-8") as f:
@@ -473,6 +875,9 @@ def main() -> None:
         f.write("\n")
 
     print(f"[info] wrote {output_path} events={len(data.get('events') or {})} keywords={len(data.get('index') or {})}", flush=True)
+    checkpoint.clear()
+    http_client.log_stats()
+    llm_pool.log_stats()
 
 
 if __name__ == "__main__":
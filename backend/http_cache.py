@@ -0,0 +1,153 @@
+"""On-disk conditional-GET cache for upstream JSON payloads.
+
+Each URL's last 200 body is stored on disk together with its validators
+(`ETag` / `Last-Modified`) and a content hash. The next fetch sends
+`If-None-Match` / `If-Modified-Since`; on 304 the cached body is served, and on
+200 the new body is streamed to disk (never held in memory as a whole). A fetch
+is reported as *unchanged* when the server answers 304 or when the new body
+hashes identically to the cached one (for upstreams without validators).
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional
+
+import http_client
+import replay
+
+
+DEBUG = os.environ.get("DEBUG", "").strip().lower() in ("1", "true", "yes", "y", "on")
+# Record/replay runs must see full bodies and never short-circuit on "unchanged".
+HTTP_CACHE_ENABLED = os.environ.get("HTTP_CACHE", "1").strip().lower() in ("1", "true", "yes", "y", "on") and not replay.active()
+HTTP_CACHE_DIR = os.environ.get("HTTP_CACHE_DIR", "").strip() or os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "http")
+
+_outcomes: Dict[str, bool] = {}
+_digests: Dict[str, Optional[str]] = {}
+_outcomes_lock = threading.Lock()
+
+
+class CachedBody:
+    """A response body stored on disk, plus whether it changed since the previous fetch.
+
+    `unchanged` compares against the previous *fetch*, which may belong to a build
+    that later failed; `sha256` identifies the body itself, so callers can compare
+    it against what their last successful run consumed.
+    """
+
+    def __init__(self, url: str, path: str, not_modified: bool, unchanged: bool, sha256: Optional[str] = None):
+        self.url = url
+        self.path = path
+        self.not_modified = not_modified
+        self.unchanged = unchanged
+        self.sha256 = sha256
+
+    def iter_bytes(self, chunk_size: int = 65536) -> Iterator[bytes]:
+        with open(self.path, "rb") as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+
+    def json(self) -> Any:
+        with open(self.path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+
+def _cache_key(url: str, params: Optional[Dict[str, Any]]) -> str:
+    parts = [url]
+    for key in sorted(params or {}):
+        parts.append(f"{key}={params[key]}")
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()[:32]
+
+
+def _read_meta(meta_path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        return meta if isinstance(meta, dict) else None
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json_atomic(path: str, payload: Dict[str, Any]) -> None:
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(payload, f)
+    os.replace(tmp_path, path)
+
+
+def was_unchanged(url: str) -> bool:
+    """Whether the most recent `fetch(url)` in this process found the body unchanged."""
+    with _outcomes_lock:
+        return bool(_outcomes.get(url))
+
+
+def body_sha256(url: str) -> Optional[str]:
+    """sha256 of the body served by the most recent `fetch(url)` in this process."""
+    with _outcomes_lock:
+        return _digests.get(url)
+
+
+def fetch(url: str, endpoint: str, params: Optional[Dict[str, Any]] = None, timeout: float = 30) -> CachedBody:
+    """Conditionally GET `url`, returning its (possibly cached) body on disk.
+
+    Non-2xx responses other than 304 raise `requests.HTTPError`.
+    """
+    os.makedirs(HTTP_CACHE_DIR, exist_ok=True)
+    key = _cache_key(url, params)
+    body_path = os.path.join(HTTP_CACHE_DIR, f"{key}.body")
+    meta_path = os.path.join(HTTP_CACHE_DIR, f"{key}.meta.json")
+
+    meta = _read_meta(meta_path) if os.path.exists(body_path) else None
+    headers = {}
+    if HTTP_CACHE_ENABLED and meta:
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("lastModified"):
+            headers["If-Modified-Since"] = meta["lastModified"]
+
+    response = http_client.get(url, endpoint=endpoint, params=params, headers=headers or None, timeout=timeout, stream=True)
+    try:
+        if response.status_code == 304 and meta:
+            if DEBUG:
+                print(f"[debug] http-cache: {endpoint} not modified; serving cached body", flush=True)
+            result = CachedBody(url, body_path, not_modified=True, unchanged=True, sha256=meta.get("sha256"))
+        else:
+            response.raise_for_status()
+            digest = hashlib.sha256()
+            fd, tmp_path = tempfile.mkstemp(dir=HTTP_CACHE_DIR, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    for chunk in http_client.iter_content(response, endpoint):
+                        digest.update(chunk)
+                        f.write(chunk)
+                os.replace(tmp_path, body_path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            sha256 = digest.hexdigest()
+            unchanged = bool(HTTP_CACHE_ENABLED and meta and meta.get("sha256") == sha256)
+            _write_json_atomic(
+                meta_path,
+                {
+                    "url": url,
+                    "etag": response.headers.get("ETag"),
+                    "lastModified": response.headers.get("Last-Modified"),
+                    "sha256": sha256,
+                    "fetchedAt": int(time.time()),
+                },
+            )
+            result = CachedBody(url, body_path, not_modified=False, unchanged=unchanged, sha256=sha256)
+    finally:
+        response.close()
+
+    with _outcomes_lock:
+        _outcomes[url] = result.unchanged
+        _digests[url] = result.sha256
+    return result
+
@@ -0,0 +1,252 @@
+"""Shared HTTP client for the backend builders.
+
+All upstream fetches (Opinion markets / wrap-events, previous data.json, Gamma
+events) go through one keep-alive `requests.Session` so TCP+TLS connections are
+reused across calls and threads. Transient failures (connection errors, timeouts,
+429 and 5xx) are retried with jittered exponential backoff, and every call is
+accounted per endpoint (calls, retries, errors, bytes, latency).
+"""
+import base64
+import email.utils
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+import replay
+
+
+DEBUG = os.environ.get("DEBUG", "").strip().lower() in ("1", "true", "yes", "y", "on")
+HTTP_MAX_RETRIES = max(0, int(os.environ.get("HTTP_MAX_RETRIES", "3")))
+HTTP_BACKOFF_BASE_SECONDS = float(os.environ.get("HTTP_BACKOFF_BASE_SECONDS", "0.5"))
+HTTP_BACKOFF_MAX_SECONDS = float(os.environ.get("HTTP_BACKOFF_MAX_SECONDS", "20"))
+HTTP_POOL_SIZE = max(1, int(os.environ.get("HTTP_POOL_SIZE", "16")))
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+_stats: Dict[str, Dict[str, Any]] = {}
+_stats_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Return the process-wide pooled session (created on first use)."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE, max_retries=0)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
+
+
+def _endpoint_stats(endpoint: str) -> Dict[str, Any]:
+    entry = _stats.get(endpoint)
+    if entry is None:
+        entry = {"calls": 0, "retries": 0, "errors": 0, "bytes": 0, "totalMs": 0.0, "maxMs": 0.0}
+        _stats[endpoint] = entry
+    return entry
+
+
+def _record_call(endpoint: str, elapsed_seconds: float, error: bool = False) -> None:
+    elapsed_ms = elapsed_seconds * 1000.0
+    with _stats_lock:
+        entry = _endpoint_stats(endpoint)
+        entry["calls"] += 1
+        entry["totalMs"] += elapsed_ms
+        entry["maxMs"] = max(entry["maxMs"], elapsed_ms)
+        if error:
+            entry["errors"] += 1
+
+
+def _record_retry(endpoint: str) -> None:
+    with _stats_lock:
+        _endpoint_stats(endpoint)["retries"] += 1
+
+
+def record_bytes(endpoint: str, nbytes: int) -> None:
+    with _stats_lock:
+        _endpoint_stats(endpoint)["bytes"] += int(nbytes)
+
+
+def retry_after_seconds(response: Any) -> Optional[float]:
+    """Seconds requested by a `Retry-After` header (delta or HTTP date) on any response with `.headers`."""
+    headers = getattr(response, "headers", None) or {}
+    raw = str(headers.get("Retry-After") or "").strip()
+    if not raw:
+        return None
+    try:
+        return max(0.0, float(raw))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(raw)
+    except (TypeError, ValueError):
+        return None
+    if when is None:
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+def backoff_seconds(
+    attempt: int,
+    retry_after: Optional[float] = None,
+    base: Optional[float] = None,
+    cap: Optional[float] = None,
+) -> float:
+    """Full-jitter exponential backoff, never shorter than a server `Retry-After` hint.
+
+    `base`/`cap` default to HTTP_BACKOFF_BASE_SECONDS / HTTP_BACKOFF_MAX_SECONDS.
+    """
+    base = HTTP_BACKOFF_BASE_SECONDS if base is None else base
+    cap = HTTP_BACKOFF_MAX_SECONDS if cap is None else cap
+    ceiling = min(cap, base * (2 ** attempt))
+    delay = random.uniform(0.0, ceiling)
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, cap))
+    return delay
+
+
+def get(
+    url: str,
+    endpoint: Optional[str] = None,
+    params: Optional[Dict[str, Any]] = None,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: float = 30,
+    stream: bool = False,
+    max_retries: Optional[int] = None,
+) -> requests.Response:
+    """GET `url` through the pooled session, retrying transient failures.
+
+    Returns the final response (callers still decide how to treat non-2xx codes);
+    raises the last connection/timeout error once retries are exhausted. With
+    `stream=True` the body is not read here; use `iter_content` so its bytes are
+    accounted to `endpoint`. Under RECORD_DIR/REPLAY_DIR the final response is
+    snapshotted/served by `replay` (request headers are not part of the key).
+    """
+    if not replay.active():
+        return _get_live(url, endpoint, params, headers, timeout, stream, max_retries)
+
+    label = endpoint or url
+    request = {"method": "GET", "url": url, "params": params or {}}
+
+    def live() -> requests.Response:
+        response = _get_live(url, endpoint, params, headers, timeout, stream, max_retries)
+        response.content  # snapshots need the full body
+        return response
+
+    started = time.perf_counter()
+    response = replay.call("http", request, live, encode=_encode_response, decode=_decode_response)
+    if replay.REPLAY_DIR:
+        if not stream:
+            record_bytes(label, len(response.content))
+        _record_call(label, time.perf_counter() - started, error=response.status_code >= 400)
+    return response
+
+
+_SNAPSHOT_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Retry-After")
+
+
+def _encode_response(response: requests.Response) -> Dict[str, Any]:
+    return {
+        "status": response.status_code,
+        "url": response.url,
+        "headers": {k: response.headers[k] for k in _SNAPSHOT_HEADERS if k in response.headers},
+        "body": base64.b64encode(response.content).decode("ascii"),
+    }
+
+
+def _decode_response(value: Dict[str, Any]) -> requests.Response:
+    response = requests.Response()
+    response.status_code = int(value.get("status") or 0)
+    response.url = value.get("url") or ""
+    response.headers = CaseInsensitiveDict(value.get("headers") or {})
+    response._content = base64.b64decode(value.get("body") or "")
+    response._content_consumed = True
+    response.encoding = "utf-8"
+    return response
+
+
+def _get_live(
+    url: str,
+    endpoint: Optional[str],
+    params: Optional[Dict[str, Any]],
+    headers: Optional[Dict[str, str]],
+    timeout: float,
+    stream: bool,
+    max_retries: Optional[int],
+) -> requests.Response:
+    label = endpoint or url
+    retries = HTTP_MAX_RETRIES if max_retries is None else max(0, max_retries)
+    session = get_session()
+    attempt = 0
+    while True:
+        started = time.perf_counter()
+        try:
+            response = session.get(url, params=params, headers=headers, timeout=timeout, stream=stream)
+        except (requests.ConnectionError, requests.Timeout) as exc:
+            _record_call(label, time.perf_counter() - started, error=True)
+            if attempt >= retries:
+                raise
+            delay = backoff_seconds(attempt)
+            print(f"[warn] http: {label} failed ({exc.__class__.__name__}); retry {attempt + 1}/{retries} in {delay:.1f}s", flush=True)
+        else:
+            if response.status_code in RETRY_STATUSES and attempt < retries:
+                _record_call(label, time.perf_counter() - started, error=True)
+                delay = backoff_seconds(attempt, retry_after_seconds(response))
+                print(
+                    f"[warn] http: {label} HTTP {response.status_code}; retry {attempt + 1}/{retries} in {delay:.1f}s",
+                    flush=True,
+                )
+                response.close()
+            else:
+                if not stream:
+                    record_bytes(label, len(response.content))
+                _record_call(label, time.perf_counter() - started, error=response.status_code >= 400)
+                return response
+
+        _record_retry(label)
+        attempt += 1
+        time.sleep(delay)
+
+
+def iter_content(response: requests.Response, endpoint: str, chunk_size: int = 65536) -> Iterator[bytes]:
+    """Iterate a streamed response body, accounting its bytes to `endpoint`."""
+    for chunk in response.iter_content(chunk_size=chunk_size):
+        if chunk:
+            record_bytes(endpoint, len(chunk))
+            yield chunk
+
+
+def stats_snapshot() -> Dict[str, Dict[str, Any]]:
+    with _stats_lock:
+        out = {}
+        for endpoint, entry in _stats.items():
+            calls = entry["calls"] or 1
+            out[endpoint] = {
+                "calls": entry["calls"],
+                "retries": entry["retries"],
+                "errors": entry["errors"],
+                "bytes": entry["bytes"],
+                "avgMs": int(entry["totalMs"] / calls),
+                "maxMs": int(entry["maxMs"]),
+            }
+        return out
+
+
+def log_stats() -> None:
+    for endpoint, entry in sorted(stats_snapshot().items()):
+        print(
+            f"[info] http: endpoint={endpoint} calls={entry['calls']} retries={entry['retries']} "
+            f"errors={entry['errors']} bytes={entry['bytes']} avgMs={entry['avgMs']} maxMs={entry['maxMs']}",
+            flush=True,
+        )
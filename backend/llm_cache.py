@@ -0,0 +1,133 @@
+"""Persistent content-addressed cache for LLM chat completions.
+
+Responses are stored in a SQLite file keyed by sha256 of the model name plus the
+exact chat messages, so identical prompts are answered from disk across runs and
+across both builders (full refreshes, lost previous data, renamed event ids).
+Entries expire after `LLM_CACHE_TTL_SECONDS`; once the stored content exceeds
+`LLM_CACHE_MAX_MB`, least-recently-used entries are evicted.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import replay
+
+
+DEBUG = os.environ.get("DEBUG", "").strip().lower() in ("1", "true", "yes", "y", "on")
+# Record/replay runs must exercise the LLM call path, so the cache stays out of the way.
+LLM_CACHE_ENABLED = os.environ.get("LLM_CACHE", "1").strip().lower() in ("1", "true", "yes", "y", "on") and not replay.active()
+LLM_CACHE_PATH = os.environ.get("LLM_CACHE_PATH", "").strip() or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), ".cache", "llm.sqlite3"
+)
+LLM_CACHE_TTL_SECONDS = int(os.environ.get("LLM_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+LLM_CACHE_MAX_BYTES = int(float(os.environ.get("LLM_CACHE_MAX_MB", "64")) * 1024 * 1024)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    content TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at INTEGER NOT NULL,
+    last_used_at INTEGER NOT NULL
+)
+"""
+
+_conn: Optional[sqlite3.Connection] = None
+_total_bytes = 0
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+
+def cache_key(model: str, messages: List[Dict[str, Any]]) -> str:
+    canonical = json.dumps({"model": model, "messages": messages}, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _connection() -> Optional[sqlite3.Connection]:
+    """Open (once) the cache database; caller holds `_lock`."""
+    global _conn, _total_bytes
+    if _conn is not None:
+        return _conn
+    os.makedirs(os.path.dirname(LLM_CACHE_PATH), exist_ok=True)
+    conn = sqlite3.connect(LLM_CACHE_PATH, timeout=30, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(_SCHEMA)
+    conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used_at)")
+    if LLM_CACHE_TTL_SECONDS > 0:
+        conn.execute("DELETE FROM responses WHERE created_at < ?", (int(time.time()) - LLM_CACHE_TTL_SECONDS,))
+    _total_bytes = int(conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0])
+    _conn = conn
+    return _conn
+
+
+def get(key: str) -> Optional[str]:
+    """Return the cached response for `key`, or None (counted as a miss)."""
+    if not LLM_CACHE_ENABLED:
+        return None
+    global _total_bytes
+    now = int(time.time())
+    try:
+        with _lock:
+            conn = _connection()
+            row = conn.execute("SELECT content, size, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row and LLM_CACHE_TTL_SECONDS > 0 and row[2] < now - LLM_CACHE_TTL_SECONDS:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                _total_bytes -= int(row[1])
+                row = None
+            if row is None:
+                _stats["misses"] += 1
+                return None
+            conn.execute("UPDATE responses SET last_used_at = ? WHERE key = ?", (now, key))
+            _stats["hits"] += 1
+            return row[0]
+    except sqlite3.Error as exc:
+        print(f"[warn] llm-cache: lookup failed: {exc}", flush=True)
+        return None
+
+
+def put(key: str, model: str, content: str) -> None:
+    if not LLM_CACHE_ENABLED or not isinstance(content, str):
+        return
+    global _total_bytes
+    now = int(time.time())
+    size = len(content.encode("utf-8"))
+    try:
+        with _lock:
+            conn = _connection()
+            old = conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, content, size, created_at, last_used_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, content, size, now, now),
+            )
+            _total_bytes += size - (int(old[0]) if old else 0)
+            _stats["stores"] += 1
+            if _total_bytes > LLM_CACHE_MAX_BYTES:
+                _evict(conn)
+    except sqlite3.Error as exc:
+        print(f"[warn] llm-cache: store failed: {exc}", flush=True)
+
+
+def _evict(conn: sqlite3.Connection) -> None:
+    """Drop least-recently-used entries until the cache is back under 90% of its limit."""
+    global _total_bytes
+    target = int(LLM_CACHE_MAX_BYTES * 0.9)
+    evicted = 0
+    for key, size in conn.execute("SELECT key, size FROM responses ORDER BY last_used_at ASC, created_at ASC").fetchall():
+        if _total_bytes <= target:
+            break
+        conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+        _total_bytes -= int(size)
+        evicted += 1
+    _stats["evictions"] += evicted
+    if DEBUG:
+        print(f"[debug] llm-cache: evicted {evicted} entries; {_total_bytes} bytes remain", flush=True)
+
+
+def stats_snapshot() -> Dict[str, int]:
+    with _lock:
+        return dict(_stats)
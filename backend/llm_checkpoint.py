@@ -0,0 +1,113 @@
+"""Append-only journal of finished LLM results, so an interrupted build can resume.
+
+As each event's keywords/entityGroups come back from the LLM they are appended as one
+JSON line (flushed immediately) to `<LLM_CHECKPOINT_DIR>/<name>-llm-checkpoint.jsonl`.
+A restarted run loads the journal and reuses every entry whose sigCore still matches
+instead of paying for the call again; the builder clears the journal once its output
+file has been written.
+"""
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+import replay
+
+
+# Record/replay runs must exercise the LLM call path, so the journal stays out of the way.
+LLM_CHECKPOINT_ENABLED = os.environ.get("LLM_CHECKPOINT", "1").strip().lower() in ("1", "true", "yes", "y", "on") and not replay.active()
+LLM_CHECKPOINT_DIR = os.environ.get("LLM_CHECKPOINT_DIR", "").strip() or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), ".cache"
+)
+
+
+def _ends_with_newline(path: str) -> bool:
+    """True for an empty file or one whose last byte is a newline."""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell() == 0:
+            return True
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+class Journal:
+    """Checkpoint journal of one builder (`name` keeps the two builders apart)."""
+
+    def __init__(self, name: str, path: Optional[str] = None, enabled: Optional[bool] = None):
+        self.path = path or os.path.join(LLM_CHECKPOINT_DIR, f"{name}-llm-checkpoint.jsonl")
+        self.enabled = LLM_CHECKPOINT_ENABLED if enabled is None else enabled
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._file = None
+        self._lock = threading.Lock()
+
+    def load(self) -> int:
+        """Read entries left by an interrupted run; returns how many were loaded."""
+        if not self.enabled or not os.path.exists(self.path):
+            return 0
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A run killed mid-write leaves a truncated last line.
+                    continue
+                if isinstance(entry, dict) and entry.get("eventId"):
+                    self._entries[str(entry["eventId"])] = entry
+        if self._entries:
+            print(f"[info] llm-checkpoint: resuming {len(self._entries)} events from {self.path}", flush=True)
+        return len(self._entries)
+
+    def lookup(
+        self, event_id: str, sig_core: str, legacy_sig_core: Optional[Callable[[], str]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """The journaled result for `event_id`, if its title/rules signature is unchanged.
+
+        `legacy_sig_core` returns the pre-v2 signature of the same event; it is only
+        called for an entry journaled by a build that still wrote those.
+        """
+        entry = self._entries.get(str(event_id))
+        if entry is None or not sig_core:
+            return None
+        stored = entry.get("sigCore") or ""
+        if stored == sig_core:
+            return entry
+        if legacy_sig_core is not None and stored and not stored.startswith("v2:") and stored == legacy_sig_core():
+            return entry
+        return None
+
+    def record(self, event_id: str, sig_core: str, keywords: List[str], entities: List[str], entity_groups: List[List[str]]) -> None:
+        if not self.enabled:
+            return
+        line = json.dumps(
+            {
+                "eventId": str(event_id),
+                "sigCore": sig_core,
+                "keywords": list(keywords or []),
+                "entities": list(entities or []),
+                "entityGroups": [list(g) for g in entity_groups or []],
+            },
+            ensure_ascii=False,
+        )
+        with self._lock:
+            try:
+                if self._file is None:
+                    os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                    self._file = open(self.path, "a", encoding="utf-8")
+                    if not _ends_with_newline(self.path):
+                        # Terminate a truncated line left by a killed run.
+                        self._file.write("\n")
+                self._file.write(line + "\n")
+                self._file.flush()
+            except OSError as exc:
+                print(f"[warn] llm-checkpoint: append failed: {exc}", flush=True)
+
+    def clear(self) -> None:
+        """Drop the journal after the build's output has been written."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self._entries.clear()
+            if self.enabled and os.path.exists(self.path):
+                os.remove(self.path)
@@ -0,0 +1,522 @@
+"""Concurrency and rate limiting for LLM keyword generation.
+
+Both builders run their per-event LLM work on a bounded worker pool and collect
+results back in event order. Every chat-completion call, from any worker, first
+acquires the shared `RateLimiter`: a token bucket (requests per second, with a
+small burst) combined with a cap on concurrently running requests. The cap adapts
+AIMD-style: it halves when the provider rate-limits us and grows back by one after
+a cap's worth of successful calls. Per-attempt latency and retries are recorded
+here as well, broken down per model of the cascade together with token usage and
+escalations (`stats_snapshot` / `log_stats`). Optional hedging (`call_hedged`) races
+a duplicate request when a call outlives the observed latency percentile.
+"""
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+
+def _default_rps() -> float:
+    # Historically the builders slept SLEEP_SECONDS after every event; keep that
+    # pacing as the default request rate unless LLM_RPS is set explicitly.
+    explicit = os.environ.get("LLM_RPS", "").strip()
+    if explicit:
+        return float(explicit)
+    sleep_seconds = float(os.environ.get("SLEEP_SECONDS", "0.2"))
+    return (1.0 / sleep_seconds) if sleep_seconds > 0 else 0.0
+
+
+LLM_CONCURRENCY = max(1, int(os.environ.get("LLM_CONCURRENCY", "4")))
+LLM_RPS = _default_rps()
+LLM_BURST = max(1.0, float(os.environ.get("LLM_BURST", "1")))
+# Events packed into one keyword-generation prompt (1 = one request per event).
+LLM_BATCH_SIZE = max(1, int(os.environ.get("LLM_BATCH_SIZE", "1")))
+# Per-build allowance for LLM work (0 = unlimited): wall-clock seconds from the start of
+# the LLM stage, and chat-completion attempts (retries included, cache hits excluded).
+LLM_TIME_BUDGET_SECONDS = float(os.environ.get("LLM_TIME_BUDGET_SECONDS", "0"))
+LLM_MAX_CALLS = int(os.environ.get("LLM_MAX_CALLS", "0"))
+# Hedged requests: once a call has run longer than the LLM_HEDGE_PERCENTILE of observed
+# latencies (per model, after LLM_HEDGE_MIN_SAMPLES attempts), race a duplicate and take
+# whichever answers first. At most LLM_HEDGE_MAX_RATE of calls may fire a hedge.
+LLM_HEDGE = os.environ.get("LLM_HEDGE", "0").strip().lower() in ("1", "true", "yes", "y", "on")
+LLM_HEDGE_PERCENTILE = float(os.environ.get("LLM_HEDGE_PERCENTILE", "0.9"))
+LLM_HEDGE_MAX_RATE = float(os.environ.get("LLM_HEDGE_MAX_RATE", "0.1"))
+LLM_HEDGE_MIN_SAMPLES = int(os.environ.get("LLM_HEDGE_MIN_SAMPLES", "20"))
+
+
+# Minimum spacing between two multiplicative decreases, so one burst of 429s
+# from in-flight requests only halves the cap once.
+AIMD_DECREASE_COOLDOWN_SECONDS = 1.0
+
+
+class RateLimiter:
+    """Token bucket (`rate` requests/second, up to `burst` saved) plus a concurrency cap.
+
+    A non-positive `rate` disables the bucket and only the concurrency cap applies.
+    The cap starts at (and never exceeds) `max_concurrency`; see `on_rate_limited`
+    and `on_success`.
+    """
+
+    def __init__(self, rate: float, burst: float, max_concurrency: int):
+        self.rate = rate
+        self.burst = burst
+        self.ceiling = max(1, max_concurrency)
+        self.max_concurrency = self.ceiling
+        self._successes = 0
+        self._last_decrease = float("-inf")
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._active = 0
+        self._cond = threading.Condition()
+
+    def _refill(self, now: float) -> None:
+        if self.rate > 0:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self) -> None:
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if self._active < self.max_concurrency:
+                    if self.rate <= 0:
+                        break
+                    if self._tokens >= 1.0:
+                        self._tokens -= 1.0
+                        break
+                    self._cond.wait(timeout=(1.0 - self._tokens) / self.rate)
+                else:
+                    self._cond.wait()
+            self._active += 1
+
+    def try_acquire(self) -> bool:
+        """Take a slot only if one (and a token) is free right now; never waits."""
+        with self._cond:
+            self._refill(time.monotonic())
+            if self._active >= self.max_concurrency:
+                return False
+            if self.rate > 0:
+                if self._tokens < 1.0:
+                    return False
+                self._tokens -= 1.0
+            self._active += 1
+            return True
+
+    def release(self) -> None:
+        with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+
+    def on_rate_limited(self) -> None:
+        """Multiplicative decrease of the concurrency cap after a 429."""
+        with self._cond:
+            now = time.monotonic()
+            if now - self._last_decrease < AIMD_DECREASE_COOLDOWN_SECONDS:
+                return
+            self._last_decrease = now
+            self._successes = 0
+            shrunk = max(1, self.max_concurrency // 2)
+            if shrunk != self.max_concurrency:
+                print(f"[warn] llm: rate limited; concurrency {self.max_concurrency} -> {shrunk}", flush=True)
+            self.max_concurrency = shrunk
+
+    def on_success(self) -> None:
+        """Additive increase: +1 after `max_concurrency` consecutive successes."""
+        with self._cond:
+            if self.max_concurrency >= self.ceiling:
+                return
+            self._successes += 1
+            if self._successes >= self.max_concurrency:
+                self._successes = 0
+                self.max_concurrency += 1
+                self._cond.notify_all()
+
+    def __enter__(self) -> "RateLimiter":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.release()
+
+
+_limiter: Optional[RateLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_limiter() -> RateLimiter:
+    """Process-wide limiter shared by every LLM call."""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = RateLimiter(rate=LLM_RPS, burst=LLM_BURST, max_concurrency=LLM_CONCURRENCY)
+    return _limiter
+
+
+_call_stats: Dict[str, Any] = {
+    "attempts": 0,
+    "retries": 0,
+    "failures": 0,
+    "errors": {},
+    "latenciesMs": [],
+    "tiers": {},
+    "hedges": {"eligible": 0, "fired": 0, "skipped": 0, "won": 0},
+}
+_call_stats_lock = threading.Lock()
+
+
+def _tier(model: str) -> Dict[str, Any]:
+    """Per-model counters of the LLM_MODEL_CASCADE; caller holds `_call_stats_lock`."""
+    return _call_stats["tiers"].setdefault(
+        model,
+        {"requests": 0, "escalated": 0, "attempts": 0, "latenciesMs": [], "promptTokens": 0, "completionTokens": 0},
+    )
+
+
+def record_attempt(elapsed_seconds: float, error_kind: Optional[str] = None, model: Optional[str] = None) -> None:
+    """Account one chat-completion attempt (`error_kind` None on success)."""
+    with _call_stats_lock:
+        _call_stats["attempts"] += 1
+        _call_stats["latenciesMs"].append(elapsed_seconds * 1000.0)
+        if error_kind:
+            _call_stats["errors"][error_kind] = _call_stats["errors"].get(error_kind, 0) + 1
+        if model:
+            tier = _tier(model)
+            tier["attempts"] += 1
+            tier["latenciesMs"].append(elapsed_seconds * 1000.0)
+
+
+def record_usage(model: str, prompt_tokens: int, completion_tokens: int) -> None:
+    """Token usage reported by the provider for one response."""
+    with _call_stats_lock:
+        tier = _tier(model)
+        tier["promptTokens"] += int(prompt_tokens or 0)
+        tier["completionTokens"] += int(completion_tokens or 0)
+
+
+def record_tier_result(model: str, escalated: bool) -> None:
+    """One keyword request answered by cascade tier `model`, or passed on to the next tier."""
+    with _call_stats_lock:
+        tier = _tier(model)
+        tier["requests"] += 1
+        if escalated:
+            tier["escalated"] += 1
+
+
+def record_retry() -> None:
+    with _call_stats_lock:
+        _call_stats["retries"] += 1
+
+
+def record_failure() -> None:
+    """A call that gave up after its last attempt."""
+    with _call_stats_lock:
+        _call_stats["failures"] += 1
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def stats_snapshot() -> Dict[str, Any]:
+    with _call_stats_lock:
+        latencies = sorted(_call_stats["latenciesMs"])
+        out = {
+            "attempts": _call_stats["attempts"],
+            "retries": _call_stats["retries"],
+            "failures": _call_stats["failures"],
+            "errors": dict(_call_stats["errors"]),
+            "avgMs": int(sum(latencies) / len(latencies)) if latencies else 0,
+            "p50Ms": int(_percentile(latencies, 0.5)),
+            "p90Ms": int(_percentile(latencies, 0.9)),
+            "maxMs": int(latencies[-1]) if latencies else 0,
+            "tiers": {},
+            "hedges": dict(_call_stats["hedges"]),
+        }
+        for model, tier in _call_stats["tiers"].items():
+            tier_latencies = sorted(tier["latenciesMs"])
+            out["tiers"][model] = {
+                "requests": tier["requests"],
+                "escalated": tier["escalated"],
+                "escalationRate": round(tier["escalated"] / tier["requests"], 3) if tier["requests"] else 0.0,
+                "attempts": tier["attempts"],
+                "p50Ms": int(_percentile(tier_latencies, 0.5)),
+                "p90Ms": int(_percentile(tier_latencies, 0.9)),
+                "promptTokens": tier["promptTokens"],
+                "completionTokens": tier["completionTokens"],
+            }
+    out["concurrency"] = get_limiter().max_concurrency
+    return out
+
+
+def hedge_delay_seconds(model: str) -> Optional[float]:
+    """Adaptive hedge threshold: the LLM_HEDGE_PERCENTILE of `model`'s attempt latencies."""
+    with _call_stats_lock:
+        tier = _call_stats["tiers"].get(model)
+        latencies = sorted(tier["latenciesMs"]) if tier else []
+    if len(latencies) < max(1, LLM_HEDGE_MIN_SAMPLES):
+        return None
+    return _percentile(latencies, LLM_HEDGE_PERCENTILE) / 1000.0
+
+
+_hedge_executor: Optional[ThreadPoolExecutor] = None
+_hedge_executor_lock = threading.Lock()
+
+
+def _hedge_pool() -> ThreadPoolExecutor:
+    global _hedge_executor
+    if _hedge_executor is None:
+        with _hedge_executor_lock:
+            if _hedge_executor is None:
+                # Each caller occupies at most two threads (primary + hedge).
+                _hedge_executor = ThreadPoolExecutor(max_workers=2 * LLM_CONCURRENCY + 2, thread_name_prefix="llm-hedge")
+    return _hedge_executor
+
+
+def timed_attempt(
+    fn: Callable[[], Any], model: Optional[str] = None, classify: Optional[Callable[[BaseException], Optional[str]]] = None
+) -> Any:
+    """Run one provider call `fn()` and record it as an attempt with its own latency.
+
+    Call this after acquiring the limiter, so queueing for a slot is not counted as
+    provider latency. `classify` maps an exception to its error kind ("other" if None).
+    """
+    started = time.perf_counter()
+    try:
+        result = fn()
+    except Exception as exc:
+        kind = classify(exc) if classify is not None else None
+        record_attempt(time.perf_counter() - started, kind or "other", model=model)
+        raise
+    record_attempt(time.perf_counter() - started, model=model)
+    return result
+
+
+def call_hedged(
+    fn: Callable[[], Any],
+    model: str,
+    limiter: Optional[RateLimiter] = None,
+    classify: Optional[Callable[[BaseException], Optional[str]]] = None,
+) -> Any:
+    """`timed_attempt(fn)` on a `limiter` slot, racing a duplicate if it outlives the hedge threshold.
+
+    The hedge timer starts once the primary holds its slot. The backup only takes a
+    slot that is free at that moment; with none free, or once the primary has
+    finished, it is skipped (counted before this returns). Each request
+    that is actually sent is one attempt (so `CallBudget` sees it) with its own latency;
+    a losing request is not cancelled, it finishes in the background and keeps its
+    slot until then. Until enough latencies are known, or once LLM_HEDGE_MAX_RATE of
+    calls have hedged, this is a plain call.
+    """
+    limiter = limiter or get_limiter()
+    delay = hedge_delay_seconds(model)
+    with _call_stats_lock:
+        _call_stats["hedges"]["eligible"] += 1
+    if delay is None:
+        with limiter:
+            return timed_attempt(fn, model, classify)
+
+    def run_primary() -> Any:
+        try:
+            return timed_attempt(fn, model, classify)
+        finally:
+            limiter.release()
+
+    def run_backup() -> Any:
+        try:
+            return timed_attempt(fn, model, classify)
+        finally:
+            limiter.release()
+
+    limiter.acquire()
+    try:
+        primary = _hedge_pool().submit(run_primary)
+    except BaseException:
+        limiter.release()
+        raise
+    try:
+        return primary.result(timeout=delay)
+    except FutureTimeoutError:
+        pass
+    with _call_stats_lock:
+        hedges = _call_stats["hedges"]
+        allowed = hedges["fired"] + 1 <= LLM_HEDGE_MAX_RATE * hedges["eligible"]
+        if allowed:
+            hedges["fired"] += 1
+    if not allowed:
+        return primary.result()
+    # Waiting for a slot would only delay the backup behind the primary it is meant
+    # to overtake, so without a free one (or with the primary already done) skip it.
+    has_slot = limiter.try_acquire()
+    if not has_slot or primary.done():
+        if has_slot:
+            limiter.release()
+        with _call_stats_lock:
+            _call_stats["hedges"]["fired"] -= 1
+            _call_stats["hedges"]["skipped"] += 1
+        return primary.result()
+    print(f"[info] llm: {model} call still running after {delay:.1f}s; hedging", flush=True)
+    try:
+        backup = _hedge_pool().submit(run_backup)
+    except BaseException:
+        limiter.release()
+        raise
+    pending = {primary, backup}
+    error: Optional[BaseException] = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is not None:
+                error = future.exception()
+                continue
+            result = future.result()
+            if future is backup:
+                with _call_stats_lock:
+                    _call_stats["hedges"]["won"] += 1
+            return result
+    raise error
+
+
+class CallBudget:
+    """Deadline plus call allowance for one build's LLM stage.
+
+    Builders check `exhausted()` before starting an event's LLM work; work already
+    in flight is allowed to finish, so a run overshoots by at most one event per worker.
+    """
+
+    def __init__(self, seconds: Optional[float] = None, max_calls: Optional[int] = None):
+        seconds = LLM_TIME_BUDGET_SECONDS if seconds is None else seconds
+        self.max_calls = LLM_MAX_CALLS if max_calls is None else max_calls
+        self.deadline = (time.monotonic() + seconds) if seconds > 0 else None
+        with _call_stats_lock:
+            self._attempts_at_start = _call_stats["attempts"]
+
+    def limited(self) -> bool:
+        """Whether a deadline or call allowance is set at all."""
+        return self.deadline is not None or self.max_calls > 0
+
+    def calls_used(self) -> int:
+        with _call_stats_lock:
+            return _call_stats["attempts"] - self._attempts_at_start
+
+    def exhausted(self) -> bool:
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            return True
+        return self.max_calls > 0 and self.calls_used() >= self.max_calls
+
+
+def log_stats() -> None:
+    snap = stats_snapshot()
+    if not snap["attempts"]:
+        return
+    errors = " ".join(f"{k}={v}" for k, v in sorted(snap["errors"].items())) or "none"
+    print(
+        f"[info] llm: attempts={snap['attempts']} retries={snap['retries']} failures={snap['failures']} "
+        f"errors[{errors}] avgMs={snap['avgMs']} p50Ms={snap['p50Ms']} p90Ms={snap['p90Ms']} "
+        f"maxMs={snap['maxMs']} concurrency={snap['concurrency']}",
+        flush=True,
+    )
+    hedges = snap["hedges"]
+    if hedges["fired"]:
+        print(
+            f"[info] llm hedges: fired={hedges['fired']}/{hedges['eligible']} calls "
+            f"skipped={hedges['skipped']} won={hedges['won']}",
+            flush=True,
+        )
+    for model, tier in snap["tiers"].items():
+        print(
+            f"[info] llm tier {model}: requests={tier['requests']} escalated={tier['escalated']} "
+            f"({tier['escalationRate']:.0%}) p50Ms={tier['p50Ms']} p90Ms={tier['p90Ms']} "
+            f"tokens={tier['promptTokens']}+{tier['completionTokens']}",
+            flush=True,
+        )
+
+
+class OrderedPool:
+    """Bounded worker pool whose results are consumed in submission order."""
+
+    def __init__(self, workers: Optional[int] = None, name: str = "llm"):
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers or LLM_CONCURRENCY), thread_name_prefix=name)
+
+    def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        return self._executor.submit(fn, *args, **kwargs)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self) -> "OrderedPool":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.shutdown()
+
+
+class Batcher:
+    """Group submitted items into lists of `size` and run `fn(items) -> results` on `pool`.
+
+    `submit` returns a per-item future resolved from the batch result at the same
+    position. Call `flush()` once no more items follow so a partial batch runs.
+    """
+
+    def __init__(self, pool: OrderedPool, fn: Callable[[List[Any]], List[Any]], size: int):
+        self._pool = pool
+        self._fn = fn
+        self._size = max(1, size)
+        self._items: List[Any] = []
+        self._futures: List[Future] = []
+
+    def submit(self, item: Any) -> Future:
+        future: Future = Future()
+        self._items.append(item)
+        self._futures.append(future)
+        if len(self._items) >= self._size:
+            self.flush()
+        return future
+
+    def flush(self) -> None:
+        if not self._items:
+            return
+        items, futures = self._items, self._futures
+        self._items, self._futures = [], []
+
+        def resolve(done: Future) -> None:
+            try:
+                results = done.result()
+            except BaseException as exc:
+                for future in futures:
+                    future.set_exception(exc)
+                return
+            for future, result in zip(futures, results):
+                future.set_result(result)
+
+        self._pool.submit(self._fn, items).add_done_callback(resolve)
+
+
+def map_ordered(fn: Callable[[Any], Any], items: Iterable[Any], workers: Optional[int] = None, label: str = "llm") -> List[Any]:
+    """Apply `fn` to every item concurrently; return results in input order."""
+    items = list(items)
+    if not items:
+        return []
+    total = len(items)
+    done = [0]
+    done_lock = threading.Lock()
+
+    def run(item: Any) -> Any:
+        try:
+            return fn(item)
+        finally:
+            with done_lock:
+                done[0] += 1
+                finished = done[0]
+            if finished % 10 == 0 or finished == total:
+                print(f"[info] {label}: completed {finished}/{total}", flush=True)
+
+    with OrderedPool(workers=workers, name=label) as pool:
+        futures = [pool.submit(run, item) for item in items]
+        return [f.result() for f in futures]
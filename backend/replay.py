@@ -0,0 +1,113 @@
+"""Record/replay of upstream HTTP and LLM responses for offline benchmarking.
+
+- `RECORD_DIR=<dir>`: perform live calls and snapshot every response to
+  `<dir>/<kind>/<sha256(request)>.json.gz`.
+- `REPLAY_DIR=<dir>`: serve responses from such snapshots without touching the
+  network. A request with no snapshot raises `ReplayMiss`.
+- `REPLAY_LATENCY_MS`: latency injected per replayed call; a number of
+  milliseconds, or `recorded` to sleep for the wall time observed while recording
+  (scaled by `REPLAY_LATENCY_SCALE`, default `1`).
+
+Requests are keyed by their canonical JSON encoding, so the same request always
+maps to the same snapshot regardless of dict ordering.
+"""
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import time
+from typing import Any, Callable, Dict, Optional
+
+
+RECORD_DIR = os.environ.get("RECORD_DIR", "").strip()
+REPLAY_DIR = os.environ.get("REPLAY_DIR", "").strip()
+REPLAY_LATENCY_MS = os.environ.get("REPLAY_LATENCY_MS", "0").strip().lower() or "0"
+REPLAY_LATENCY_SCALE = float(os.environ.get("REPLAY_LATENCY_SCALE", "1"))
+
+if RECORD_DIR and REPLAY_DIR:
+    raise ValueError("RECORD_DIR and REPLAY_DIR are mutually exclusive")
+
+
+class ReplayMiss(LookupError):
+    """No snapshot exists for a request while replaying."""
+
+
+class ReplayedError(RuntimeError):
+    """A call that failed while recording, re-raised deterministically on replay."""
+
+
+def active() -> bool:
+    return bool(RECORD_DIR or REPLAY_DIR)
+
+
+def request_key(request: Dict[str, Any]) -> str:
+    canonical = json.dumps(request, ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _snapshot_path(root: str, kind: str, request: Dict[str, Any]) -> str:
+    return os.path.join(root, kind, f"{request_key(request)}.json.gz")
+
+
+def _write_snapshot(path: str, snapshot: Dict[str, Any]) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as f:
+        f.write(json.dumps(snapshot, ensure_ascii=False, default=str).encode("utf-8"))
+    os.replace(tmp_path, path)
+
+
+def _injected_latency_seconds(snapshot: Dict[str, Any]) -> float:
+    if REPLAY_LATENCY_MS == "recorded":
+        return max(0.0, float(snapshot.get("elapsedMs") or 0)) * REPLAY_LATENCY_SCALE / 1000.0
+    try:
+        return max(0.0, float(REPLAY_LATENCY_MS)) / 1000.0
+    except ValueError:
+        return 0.0
+
+
+def call(
+    kind: str,
+    request: Dict[str, Any],
+    live: Callable[[], Any],
+    encode: Optional[Callable[[Any], Any]] = None,
+    decode: Optional[Callable[[Any], Any]] = None,
+) -> Any:
+    """Run `live()` through the active record/replay mode.
+
+    `encode`/`decode` convert the live result to and from a JSON-serializable
+    snapshot value (identity by default). Exceptions raised while recording are
+    snapshotted too and re-raised as `ReplayedError` on replay.
+    """
+    if REPLAY_DIR:
+        path = _snapshot_path(REPLAY_DIR, kind, request)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                snapshot = json.load(f)
+        except FileNotFoundError:
+            raise ReplayMiss(f"no {kind} snapshot for request {request_key(request)[:12]} in {REPLAY_DIR}") from None
+        delay = _injected_latency_seconds(snapshot)
+        if delay > 0:
+            time.sleep(delay)
+        if "error" in snapshot:
+            raise ReplayedError(snapshot["error"])
+        value = snapshot.get("value")
+        return decode(value) if decode else value
+
+    if not RECORD_DIR:
+        return live()
+
+    started = time.perf_counter()
+    snapshot: Dict[str, Any] = {"kind": kind, "request": request}
+    try:
+        result = live()
+    except Exception as exc:
+        snapshot["elapsedMs"] = int((time.perf_counter() - started) * 1000)
+        snapshot["error"] = f"{exc.__class__.__name__}: {exc}"
+        _write_snapshot(_snapshot_path(RECORD_DIR, kind, request), snapshot)
+        raise
+    snapshot["elapsedMs"] = int((time.perf_counter() - started) * 1000)
+    snapshot["value"] = encode(result) if encode else result
+    _write_snapshot(_snapshot_path(RECORD_DIR, kind, request), snapshot)
+    return result
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""Test that the precompiled alias engine matches the dictionary scan it replaced"""
+import random
+
+import build_index
+
+
+def _legacy_augment(entity_groups):
+    """The linear dictionary scan `augment_with_chinese` used before `_AliasEngine`."""
+    out = []
+    for group in entity_groups:
+        new_group = list(group)
+        seen = set(build_index._normalize_keyword(t) for t in new_group if t)
+
+        def add(values):
+            for value in values:
+                normalized = build_index._normalize_keyword(value)
+                if normalized and normalized not in seen:
+                    new_group.append(value)
+                    seen.add(normalized)
+
+        for term in list(group):
+            term_lower = build_index._normalize_keyword(term)
+            if not term_lower:
+                continue
+            for key, values in build_index.CN_EN_ENTITY_MAP.items():
+                if key.lower() == term_lower or (len(key) >= 3 and key.lower() in term_lower):
+                    add(values)
+            for key, values in build_index.CN_EN_KEYWORD_MAP.items():
+                if key.lower() == term_lower:
+                    add(values)
+            for key, values in build_index.ENTITY_ALIAS_MAP.items():
+                if key.lower() == term_lower:
+                    add(values)
+        if new_group:
+            out.append(new_group)
+    return out
+
+
+def _vocabulary():
+    terms = set()
+    for mapping in (build_index.CN_EN_ENTITY_MAP, build_index.CN_EN_KEYWORD_MAP, build_index.ENTITY_ALIAS_MAP):
+        for key, values in mapping.items():
+            terms.add(key)
+            terms.update(values)
+    return sorted(terms)
+
+
+def test_single_terms_match_legacy_scan():
+    for term in _vocabulary() + ["", "  ", "Will Putin meet Trump?", "bitcoin etf", "xyz"]:
+        _, groups = build_index.augment_with_chinese([], [], [[term]])
+        assert groups == (_legacy_augment([[term]]) or [[term]]), term
+
+
+def test_random_groups_match_legacy_scan():
+    rng = random.Random(21)
+    terms = _vocabulary()
+    for _ in range(500):
+        groups = [
+            [" ".join(rng.choices(terms, k=rng.randint(1, 2))) for _ in range(rng.randint(1, 4))]
+            for _ in range(rng.randint(1, 2))
+        ]
+        _, augmented = build_index.augment_with_chinese([], [], [list(g) for g in groups])
+        assert augmented == _legacy_augment(groups), groups
+
+
+def test_contained_keys_are_found_by_the_automaton():
+    engine = build_index._compile_alias_engine({"abc": ["1"], "bcd": ["2"], "cd": ["3"], "xbcdy": ["4"]}, {}, {})
+    assert [t for t, _ in engine.lookup("abcd")] == ["1", "2"]
+    assert [t for t, _ in engine.lookup("cd")] == ["3"]
+    assert [t for t, _ in engine.lookup("xbcdy")] == ["2", "4"]
+
+
+if __name__ == "__main__":
+    test_single_terms_match_legacy_scan()
+    print("✓ PASS: single terms")
+    test_random_groups_match_legacy_scan()
+    print("✓ PASS: random groups")
+    test_contained_keys_are_found_by_the_automaton()
+    print("✓ PASS: automaton")
+    print("All tests passed! ✓")
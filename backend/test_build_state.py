@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""Test that an unchanged rebuild is skipped only against the last successful build"""
+import json
+import os
+import tempfile
+
+import build_index
+import http_cache
+
+
+class _Body:
+    def __init__(self, payload, sha256):
+        self.raw = json.dumps(payload).encode("utf-8")
+        self.sha256 = sha256
+
+    def iter_bytes(self, chunk_size=65536):
+        yield self.raw
+
+
+def _setup(tmp, data):
+    output_path = os.path.join(tmp, "data.json")
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    build_index.BUILD_STATE_PATH = os.path.join(tmp, "state.json")
+    return output_path
+
+
+def test_skip_requires_matching_input_hashes_and_no_needs_ai():
+    original = (build_index.BUILD_STATE_PATH, http_cache.HTTP_CACHE_ENABLED, build_index.LOCAL_TIER)
+    wrap_url = build_index.OPINION_WRAP_EVENTS_URL
+    try:
+        http_cache.HTTP_CACHE_ENABLED = True
+        tmp = tempfile.mkdtemp()
+        markets = [{"marketId": 1, "cutoffAt": 0}]
+        data = {"events": {"1": {"title": "A"}}, "markets": {}}
+        output_path = _setup(tmp, data)
+        http_cache._digests[wrap_url] = "w1"
+        body = _Body(markets, "m1")
+        build_index._write_build_state(output_path, 100, "key", body, data)
+        assert build_index._unchanged_since_last_build(body, {}, output_path, "key", 200)
+
+        # A later fetch (e.g. by a run that was cancelled) does not move the baseline.
+        assert not build_index._unchanged_since_last_build(_Body(markets, "m2"), {}, output_path, "key", 200)
+        http_cache._digests[wrap_url] = "w2"
+        assert not build_index._unchanged_since_last_build(body, {}, output_path, "key", 200)
+        http_cache._digests[wrap_url] = None
+        assert not build_index._unchanged_since_last_build(body, {}, output_path, "key", 200)
+        http_cache._digests[wrap_url] = "w1"
+
+        # Configuration changes force a rebuild.
+        build_index.LOCAL_TIER = not build_index.LOCAL_TIER
+        assert not build_index._unchanged_since_last_build(body, {}, output_path, "key", 200)
+        build_index.LOCAL_TIER = original[2]
+
+        # Events left for a later backfill keep the next build from being skipped.
+        data = {"events": {"1": {"title": "A", "needsAi": True}}, "markets": {}}
+        output_path = _setup(tmp, data)
+        build_index._write_build_state(output_path, 100, "key", body, data)
+        assert not build_index._unchanged_since_last_build(body, {}, output_path, "key", 200)
+    finally:
+        build_index.BUILD_STATE_PATH, http_cache.HTTP_CACHE_ENABLED, build_index.LOCAL_TIER = original
+        http_cache._digests.pop(wrap_url, None)
+
+
+if __name__ == "__main__":
+    test_skip_requires_matching_input_hashes_and_no_needs_ai()
+    print("✓ PASS: build state")
+    print("All tests passed! ✓")
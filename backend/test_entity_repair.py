@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""Test the local entityGroups repair that runs before the LLM retry"""
+import build_index
+
+
+def _repair(title, entity_groups, entities=None, keywords=None):
+    allow_terms = {build_index._normalize_keyword(t) for t in build_index._allowed_entity_alias_terms_from_title(title)}
+    assert not build_index._normalize_entity_groups(entity_groups, title, allow_terms)
+    return build_index._repair_entity_groups(entity_groups, entities or [], keywords or [], title, allow_terms)
+
+
+def test_alias_is_swapped_for_the_title_form():
+    assert _repair("Will BOJ hike rates in 2026?", [["Bank of Japan"]]) == [["boj"]]
+    assert _repair("Will the ECB cut rates in June?", [["European Central Bank"]]) == [["ecb"]]
+
+
+def test_fallback_groups_need_corroboration():
+    assert _repair("US Fed Rate Decision in March?", [["Federal Reserve Bank"]], keywords=["Federal Reserve"]) == [
+        ["fed", "fomc", "federal reserve", "federalreserve"]
+    ]
+    assert _repair("Will Kraken IPO in 2025?", [["will"], ["yes"]], keywords=["Kraken"]) == [["kraken ipo"]]
+
+
+def test_empty_response_is_not_repaired():
+    assert _repair("Will Kraken IPO in 2025?", []) == []
+    assert _repair("Will Kraken IPO in 2025?", [["yes"]], keywords=["ipo"]) == []
+
+
+if __name__ == "__main__":
+    test_alias_is_swapped_for_the_title_form()
+    print("✓ PASS: aliases mapped to title terms")
+    test_fallback_groups_need_corroboration()
+    print("✓ PASS: corroborated fallback groups")
+    test_empty_response_is_not_repaired()
+    print("✓ PASS: nothing to salvage")
+    print("All tests passed! ✓")
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""Test that the single-pass entity-term validator matches the multi-pass rules it replaced"""
+import json
+import os
+import re
+
+import build_index
+
+
+def _legacy_is_valid_entity_term(normalized_term):
+    """The multi-pass `_is_valid_entity_term` before it was compiled and memoized."""
+    term = build_index._normalize_keyword(normalized_term)
+    if not term:
+        return False
+    if term in build_index._ENTITY_STOP_TERMS:
+        return False
+    if term.startswith("team") and len(term) <= 12:
+        return False
+    tokens = term.split()
+    if len(tokens) > 4:
+        return False
+    if any(tok in build_index._ENTITY_DISALLOWED_QUESTION_WORDS for tok in tokens):
+        return False
+    if any(tok in build_index._ENTITY_MONTHS for tok in tokens):
+        return False
+    if any(tok in build_index._ENTITY_TIME_WORDS for tok in tokens):
+        return False
+    if any(tok.isdigit() and len(tok) == 4 for tok in tokens):
+        return False
+    generic = build_index._GENERIC_ENTITY_TOKENS
+    if len(tokens) == 1 and tokens[0] in generic:
+        return False
+    if len(tokens) >= 2 and any((tok in generic) and (tok not in build_index._ENTITY_ALLOWED_CONNECTORS) for tok in tokens):
+        return False
+    if len(tokens) >= 2 and all((tok in generic) or tok.isdigit() for tok in tokens):
+        return False
+    if any(re.match(r"^\d{1,3}(?:bp|bps|basispoints?)$", tok) for tok in tokens):
+        return False
+    if term.isdigit() and len(term) == 4:
+        return False
+    if len(term) < 3 and term not in build_index._ENTITY_ALLOW_SHORT:
+        return False
+    if any(re.match(r"^(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)\d{1,2}(?:st|nd|rd|th)?$", tok) for tok in tokens):
+        return False
+    if re.search(r"\b(19|20)\d{2}[-/]\d{1,2}[-/]\d{1,2}\b", term):
+        return False
+    if re.search(r"\b\d{1,2}[-/]\d{1,2}[-/](19|20)\d{2}\b", term):
+        return False
+    return True
+
+
+def _data_json_vocabulary():
+    """Every term stored in data.json, plus 1-4 word windows of its titles and rules."""
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data.json")
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    terms = set(data.get("index") or {}) | set(data.get("eventIndex") or {})
+    for section in ("events", "markets"):
+        for item in (data.get(section) or {}).values():
+            terms.update(item.get("keywords") or [])
+            terms.update(item.get("entities") or [])
+            for group in item.get("entityGroups") or []:
+                terms.update(group)
+            for text in (item.get("title"), item.get("rules")):
+                words = str(text or "").lower().split()
+                for n in range(1, 5):
+                    terms.update(" ".join(words[i:i + n]) for i in range(len(words) - n + 1))
+    return terms
+
+
+EDGE_CASES = [
+    "", "   ", None, "cz", "CZ", "ai", "eth", "team", "teamhuman", "team liquid esports",
+    "25bp", "25 bps", "100basispoints", "1000bp", "dec31", "dec31st", "sept 9", "sept9th",
+    "2025-12-31", "12/31/2025", "x 2025/1/2 y", "2025", "a 2025", "12", "12 of", "of the",
+    "bank of japan", "will trump", "trump before", "\"fed\"", "a b c d e", "federal reserve",
+    "launch of starship", "the winner", "dec31,", "q4 2025", "２０２５", "¹²³⁴",
+]
+
+
+def test_matches_legacy_on_data_json_vocabulary():
+    terms = _data_json_vocabulary()
+    assert len(terms) > 1000
+    for term in sorted(terms) + EDGE_CASES:
+        assert build_index._is_valid_entity_term(term) == _legacy_is_valid_entity_term(term), term
+
+
+def test_matches_legacy_on_dictionary_terms():
+    for term in build_index._entity_equivalents():
+        assert build_index._is_valid_entity_term(term) == _legacy_is_valid_entity_term(term), term
+
+
+def test_results_are_memoized():
+    build_index._is_valid_entity_term.cache_clear()
+    for _ in range(3):
+        assert build_index._is_valid_entity_term("bank of japan")
+    info = build_index._is_valid_entity_term.cache_info()
+    assert (info.hits, info.misses) == (2, 1)
+
+
+if __name__ == "__main__":
+    test_matches_legacy_on_data_json_vocabulary()
+    print("✓ PASS: data.json vocabulary")
+    test_matches_legacy_on_dictionary_terms()
+    print("✓ PASS: dictionary terms")
+    test_results_are_memoized()
+    print("✓ PASS: memoized")
+    print("All tests passed! ✓")
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""Test the persistent LLM response cache (TTL and LRU eviction)"""
+import os
+import tempfile
+import time
+
+import llm_cache
+
+
+def _fresh_cache(max_bytes=1024 * 1024, ttl=3600):
+    if llm_cache._conn is not None:
+        llm_cache._conn.close()
+    llm_cache._conn = None
+    llm_cache.LLM_CACHE_ENABLED = True
+    llm_cache.LLM_CACHE_PATH = os.path.join(tempfile.mkdtemp(), "llm.sqlite3")
+    llm_cache.LLM_CACHE_MAX_BYTES = max_bytes
+    llm_cache.LLM_CACHE_TTL_SECONDS = ttl
+
+
+def _messages(text):
+    return [{"role": "system", "content": "sys"}, {"role": "user", "content": text}]
+
+
+def test_key_depends_on_model_and_messages():
+    key = llm_cache.cache_key("GLM-4.7", _messages("a"))
+    assert key == llm_cache.cache_key("GLM-4.7", _messages("a"))
+    assert key != llm_cache.cache_key("GLM-4.7", _messages("b"))
+    assert key != llm_cache.cache_key("GLM-4.6", _messages("a"))
+
+
+def test_put_then_get_roundtrip():
+    _fresh_cache()
+    key = llm_cache.cache_key("m", _messages("hello"))
+    assert llm_cache.get(key) is None
+    llm_cache.put(key, "m", '{"keywords": ["x"]}')
+    assert llm_cache.get(key) == '{"keywords": ["x"]}'
+
+
+def test_expired_entries_are_misses():
+    _fresh_cache(ttl=60)
+    key = llm_cache.cache_key("m", _messages("old"))
+    llm_cache.put(key, "m", "stale")
+    llm_cache._conn.execute("UPDATE responses SET created_at = ?", (int(time.time()) - 120,))
+    assert llm_cache.get(key) is None
+
+
+def test_lru_eviction_keeps_recently_used():
+    _fresh_cache(max_bytes=300)
+    keys = [llm_cache.cache_key("m", _messages(str(i))) for i in range(3)]
+    for i, key in enumerate(keys):
+        llm_cache.put(key, "m", "x" * 100)
+        llm_cache._conn.execute("UPDATE responses SET last_used_at = ? WHERE key = ?", (1000 + i, key))
+    llm_cache._conn.execute("UPDATE responses SET last_used_at = 5000 WHERE key = ?", (keys[0],))
+    llm_cache.put(llm_cache.cache_key("m", _messages("new")), "m", "y" * 100)
+    assert llm_cache.get(keys[0]) is not None
+    assert llm_cache.get(keys[1]) is None
+
+
+if __name__ == "__main__":
+    test_key_depends_on_model_and_messages()
+    print("✓ PASS: key covers model and messages")
+    test_put_then_get_roundtrip()
+    print("✓ PASS: put/get roundtrip")
+    test_expired_entries_are_misses()
+    print("✓ PASS: TTL expiry")
+    test_lru_eviction_keeps_recently_used()
+    print("✓ PASS: LRU eviction")
+    print("All tests passed! ✓")
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""Test the resumable LLM checkpoint journal"""
+import os
+import tempfile
+
+import llm_checkpoint
+
+
+def _journal(path):
+    return llm_checkpoint.Journal("test", path=path, enabled=True)
+
+
+def test_record_then_resume_by_signature():
+    path = os.path.join(tempfile.mkdtemp(), "test-llm-checkpoint.jsonl")
+    journal = _journal(path)
+    assert journal.load() == 0
+    journal.record("1", "aaaa0001", ["kraken"], ["kraken"], [["kraken"]])
+    journal.record("2", "aaaa0002", ["boj"], ["boj"], [["boj", "日本央行"]])
+
+    resumed = _journal(path)
+    assert resumed.load() == 2
+    assert resumed.lookup("2", "aaaa0002")["entityGroups"] == [["boj", "日本央行"]]
+    # Title or rules changed since the interrupted run.
+    assert resumed.lookup("1", "bbbb0001") is None
+    assert resumed.lookup("3", "aaaa0003") is None
+
+
+def test_truncated_last_line_is_skipped_and_terminated():
+    path = os.path.join(tempfile.mkdtemp(), "test-llm-checkpoint.jsonl")
+    _journal(path).record("1", "aaaa0001", ["x"], ["x"], [["x"]])
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"eventId": "2", "sigC')
+
+    journal = _journal(path)
+    assert journal.load() == 1
+    journal.record("3", "aaaa0003", ["y"], ["y"], [["y"]])
+    assert _journal(path).load() == 2
+
+
+def test_clear_removes_the_journal():
+    path = os.path.join(tempfile.mkdtemp(), "test-llm-checkpoint.jsonl")
+    journal = _journal(path)
+    journal.record("1", "aaaa0001", ["x"], ["x"], [["x"]])
+    journal.clear()
+    assert not os.path.exists(path)
+    assert journal.lookup("1", "aaaa0001") is None
+
+
+if __name__ == "__main__":
+    test_record_then_resume_by_signature()
+    print("✓ PASS: resume by sigCore")
+    test_truncated_last_line_is_skipped_and_terminated()
+    print("✓ PASS: truncated line")
+    test_clear_removes_the_journal()
+    print("✓ PASS: clear")
+    print("All tests passed! ✓")
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""Test the LLM worker pool and its rate limiter"""
+import threading
+import time
+
+import build_index
+import llm_pool
+
+
+def test_map_ordered_preserves_input_order():
+    def slow_square(x):
+        time.sleep(0.01 * ((7 * x) % 5))
+        return x * x
+
+    assert llm_pool.map_ordered(slow_square, range(20), workers=6) == [x * x for x in range(20)]
+    assert llm_pool.map_ordered(slow_square, [], workers=6) == []
+
+
+def test_limiter_caps_concurrency():
+    limiter = llm_pool.RateLimiter(rate=0, burst=1, max_concurrency=3)
+    lock = threading.Lock()
+    active = [0]
+    peak = [0]
+
+    def work(_):
+        with limiter:
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.02)
+            with lock:
+                active[0] -= 1
+
+    llm_pool.map_ordered(work, range(24), workers=12)
+    assert peak[0] == 3
+
+
+def test_limiter_paces_requests_per_second():
+    limiter = llm_pool.RateLimiter(rate=50, burst=1, max_concurrency=8)
+
+    def work(_):
+        with limiter:
+            return time.monotonic()
+
+    started = time.monotonic()
+    stamps = llm_pool.map_ordered(work, range(11), workers=8)
+    # One token up front, then 10 more at 50/s: at least ~0.2s in total.
+    assert max(stamps) - started >= 0.18
+
+
+def test_batcher_resolves_items_in_position():
+    seen_batches = []
+
+    def double_all(items):
+        seen_batches.append(list(items))
+        return [x * 2 for x in items]
+
+    with llm_pool.OrderedPool(workers=3) as pool:
+        batcher = llm_pool.Batcher(pool, double_all, size=4)
+        futures = [batcher.submit(x) for x in range(10)]
+        batcher.flush()
+        assert [f.result() for f in futures] == [x * 2 for x in range(10)]
+    assert sorted(len(b) for b in seen_batches) == [2, 4, 4]
+
+
+def test_batch_response_is_split_per_event():
+    text = (
+        "```json\n"
+        '{"11": {"keywords": ["btc"], "entityGroups": [["BTC", "比特币"]]}, "12": "oops", "99": {"keywords": ["x"]}}\n'
+        "```"
+    )
+    results = build_index._extract_batch_keywords_and_entities(text, [11, 12, 13])
+    assert list(results) == [11]
+    assert results[11]["entityGroups"] == [["BTC", "比特币"]]
+    assert build_index._extract_batch_keywords_and_entities("not json", [11]) == {}
+
+
+def test_limiter_aimd_halves_then_recovers():
+    limiter = llm_pool.RateLimiter(rate=0, burst=1, max_concurrency=8)
+    limiter.on_rate_limited()
+    assert limiter.max_concurrency == 4
+    limiter.on_rate_limited()  # within the cooldown: one burst of 429s halves once
+    assert limiter.max_concurrency == 4
+    for _ in range(4):
+        limiter.on_success()
+    assert limiter.max_concurrency == 5
+    for _ in range(100):
+        limiter.on_success()
+    assert limiter.max_concurrency == 8
+
+
+def test_llm_errors_are_classified():
+    class APIReachLimitError(Exception):
+        status_code = 429
+
+    class APITimeoutError(Exception):
+        pass
+
+    class APIInternalError(Exception):
+        status_code = 500
+
+    class APIRequestFailedError(Exception):
+        status_code = 400
+
+    assert build_index._classify_llm_error(APIReachLimitError()) == "rate_limit"
+    assert build_index._classify_llm_error(APITimeoutError()) == "timeout"
+    assert build_index._classify_llm_error(APIInternalError()) == "server"
+    assert build_index._classify_llm_error(APIRequestFailedError()) is None
+    assert build_index._classify_llm_error(ValueError("bad json")) is None
+
+
+def test_cascade_escalates_only_on_invalid_entity_groups():
+    answers = {
+        "Will Kraken IPO in 2026?": {"flash": [["kraken"]], "strong": [["kraken"]]},
+        "Will Zeta win?": {"flash": [["crypto"]], "strong": [["zeta"]]},
+    }
+    calls = []
+
+    def fake_generate_keywords(api_key, title, rules, context=None, model=None):
+        calls.append((title, model))
+        return {"keywords": [], "entities": [], "entityGroups": answers[title][model]}
+
+    original = (build_index.generate_keywords, build_index.MODEL_CASCADE)
+    build_index.generate_keywords = fake_generate_keywords
+    build_index.MODEL_CASCADE = ["flash", "strong"]
+    try:
+        assert build_index.generate_keywords_cascade("k", "Will Kraken IPO in 2026?", "")["entityGroups"] == [["kraken"]]
+        assert build_index.generate_keywords_cascade("k", "Will Zeta win?", "")["entityGroups"] == [["zeta"]]
+        assert build_index.generate_keywords_cascade("k", "Will Zeta win?", "", start_tier=1)["entityGroups"] == [["zeta"]]
+    finally:
+        build_index.generate_keywords, build_index.MODEL_CASCADE = original
+    assert calls == [
+        ("Will Kraken IPO in 2026?", "flash"),
+        ("Will Zeta win?", "flash"),
+        ("Will Zeta win?", "strong"),
+        ("Will Zeta win?", "strong"),
+    ]
+    tiers = llm_pool.stats_snapshot()["tiers"]
+    assert (tiers["flash"]["requests"], tiers["flash"]["escalated"]) == (2, 1)
+    assert tiers["flash"]["escalationRate"] == 0.5
+
+
+def test_call_budget_counts_attempts_and_deadline():
+    budget = llm_pool.CallBudget(seconds=0, max_calls=2)
+    assert not budget.exhausted()
+    llm_pool.record_attempt(0.01)
+    llm_pool.record_attempt(0.01, "timeout")
+    assert budget.calls_used() == 2
+    assert budget.exhausted()
+    assert not llm_pool.CallBudget(seconds=0, max_calls=0).exhausted()
+    deadline = llm_pool.CallBudget(seconds=0.02, max_calls=0)
+    assert not deadline.exhausted()
+    time.sleep(0.03)
+    assert deadline.exhausted()
+
+
+def _tier_latencies_ms(model):
+    with llm_pool._call_stats_lock:
+        return list(llm_pool._tier(model)["latenciesMs"])
+
+
+def test_hedge_races_a_duplicate_for_slow_calls():
+    for _ in range(llm_pool.LLM_HEDGE_MIN_SAMPLES):
+        llm_pool.record_attempt(0.01, model="hedge-test")
+    calls = []
+    calls_lock = threading.Lock()
+
+    def call():
+        with calls_lock:
+            calls.append(len(calls))
+            first = len(calls) == 1
+        time.sleep(0.5 if first else 0.0)
+        return "slow" if first else "fast"
+
+    original_rate = llm_pool.LLM_HEDGE_MAX_RATE
+    try:
+        llm_pool.LLM_HEDGE_MAX_RATE = 1.0
+        limiter = llm_pool.RateLimiter(rate=0, burst=1, max_concurrency=4)
+        budget = llm_pool.CallBudget(seconds=0, max_calls=0)
+        before = llm_pool.stats_snapshot()["hedges"]
+        assert llm_pool.call_hedged(call, "hedge-test", limiter) == "fast"
+        after = llm_pool.stats_snapshot()["hedges"]
+        assert (after["fired"] - before["fired"], after["won"] - before["won"]) == (1, 1)
+        # The losing primary keeps its slot until it finishes, then both requests count
+        # against the budget and the primary records its own (slow) latency.
+        time.sleep(0.6)
+        assert limiter._active == 0
+        assert budget.calls_used() == 2
+        assert max(_tier_latencies_ms("hedge-test")) >= 450
+
+        # No free slot for the backup: it is skipped (and counted) before call_hedged returns.
+        calls.clear()
+        single = llm_pool.RateLimiter(rate=0, burst=1, max_concurrency=1)
+        assert llm_pool.call_hedged(call, "hedge-test", single) == "slow"
+        assert len(calls) == 1
+        assert llm_pool.stats_snapshot()["hedges"]["skipped"] - after["skipped"] == 1
+
+        # With the rate cap spent, the slow call is simply awaited.
+        llm_pool.LLM_HEDGE_MAX_RATE = 0.0
+        calls.clear()
+        assert llm_pool.call_hedged(call, "hedge-test", limiter) == "slow"
+        assert len(calls) == 1
+    finally:
+        llm_pool.LLM_HEDGE_MAX_RATE = original_rate
+
+
+def test_attempt_latency_excludes_limiter_wait():
+    limiter = llm_pool.RateLimiter(rate=0, burst=1, max_concurrency=1)
+    limiter.acquire()
+    threading.Timer(0.3, limiter.release).start()
+    started = time.perf_counter()
+    with limiter:
+        llm_pool.timed_attempt(lambda: None, model="queue-test")
+    assert time.perf_counter() - started >= 0.25
+    assert _tier_latencies_ms("queue-test")[-1] < 50
+
+
+if __name__ == "__main__":
+    test_map_ordered_preserves_input_order()
+    print("✓ PASS: results in input order")
+    test_limiter_caps_concurrency()
+    print("✓ PASS: concurrency capped")
+    test_limiter_paces_requests_per_second()
+    print("✓ PASS: requests paced")
+    test_batcher_resolves_items_in_position()
+    print("✓ PASS: batcher results in position")
+    test_batch_response_is_split_per_event()
+    print("✓ PASS: batched response split per event")
+    test_limiter_aimd_halves_then_recovers()
+    print("✓ PASS: AIMD concurrency")
+    test_llm_errors_are_classified()
+    print("✓ PASS: LLM error classes")
+    test_cascade_escalates_only_on_invalid_entity_groups()
+    print("✓ PASS: model cascade")
+    test_call_budget_counts_attempts_and_deadline()
+    print("✓ PASS: call budget")
+    test_hedge_races_a_duplicate_for_slow_calls()
+    print("✓ PASS: hedged requests")
+    test_attempt_latency_excludes_limiter_wait()
+    print("✓ PASS: attempt latency")
+    print("All tests passed! ✓")
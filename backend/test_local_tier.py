@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""Test the dictionary-first local extractor tier that runs before the LLM"""
+import build_index
+
+
+def _local(title):
+    return build_index._local_keywords_and_entities(title)
+
+
+def test_versus_titles_are_resolved_locally():
+    result = _local("KPL: KSG vs DYG (Feb. 26 7:00AM ET)")
+    assert result["entityGroups"] == [["ksg"], ["dyg"]]
+    assert result["confidence"] >= build_index.LOCAL_TIER_MIN_CONFIDENCE
+    result = _local("Boxing: Jake Paul vs. Anthony Joshua")
+    assert result["entityGroups"] == [["jake paul"], ["anthony joshua"]]
+    assert result["keywords"][:2] == ["jake paul", "anthony joshua"]
+
+
+def test_dictionary_terms_are_resolved_locally():
+    result = _local("Bank of Japan decision in December?")
+    assert result["entityGroups"] == [["bank of japan"]]
+    assert result["confidence"] == 1.0
+    # "fed" and "federal reserve" are one entity.
+    assert _local("Will the Federal Reserve (Fed) cut in March?")["entityGroups"] == [["federal reserve"]]
+
+
+def test_uncovered_titles_are_escalated():
+    threshold = build_index.LOCAL_TIER_MIN_CONFIDENCE
+    assert _local("Will Jesus Christ return before 2027?")["confidence"] < threshold
+    # A dictionary hit does not cover the person the market is about.
+    assert _local("Will Former President of South Korea Yoon Suk Yeol be sentenced?")["confidence"] < threshold
+    # One side is too short to be a valid entity term.
+    assert _local("LPL: WBG vs IG (Feb. 25 1:00AM ET)")["confidence"] < threshold
+    assert _local("December 31, 2026")["confidence"] == 0.0
+    # Any capitalized word the groups do not cover sends the title to the LLM.
+    for title in (
+        "Will Trump endorse JD Vance for president before 2027?",
+        "Will Satoshi move any Bitcoin in 2026?",
+        "Will Bitcoin replace SHA-256 before 2027?",
+        "LCK (South Korea)",
+    ):
+        assert _local(title)["confidence"] < threshold, title
+
+
+def test_versus_rule_needs_two_plain_sides():
+    versus = build_index._versus_entity_groups
+    # "vs" inside a quoted phrase, or in a question, is not a matchup.
+    assert versus("Aster \u201cHuman vs AI\u201d: Which team will achieve the higher ROI?") == []
+    assert versus("Aster \u201cHuman vs AI\u201d season") == []
+    assert versus("Who wins Lakers vs Celtics?") == []
+    # Bare "v" is not a separator.
+    assert versus("Lakers v Celtics") == []
+    assert versus("NBA: Lakers vs. Celtics") == [["lakers"], ["celtics"]]
+
+
+if __name__ == "__main__":
+    test_versus_titles_are_resolved_locally()
+    print("✓ PASS: versus titles")
+    test_dictionary_terms_are_resolved_locally()
+    print("✓ PASS: dictionary titles")
+    test_uncovered_titles_are_escalated()
+    print("✓ PASS: escalation")
+    test_versus_rule_needs_two_plain_sides()
+    print("✓ PASS: versus sides")
+    print("All tests passed! ✓")
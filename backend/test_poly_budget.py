@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""Test that the Poly LLM budget is spent on the highest-volume events first"""
+import time
+
+import build_index
+import build_poly_gamma
+import llm_cache
+import llm_pool
+
+
+def _events(volumes):
+    end = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(time.time() + 86400 * 10))
+    return [
+        {
+            "id": str(i),
+            "slug": f"e{i}",
+            "title": f"Will Alpha{i} launch Zeta{i}?",
+            "endDate": end,
+            "volume": volume,
+            "markets": [{"id": f"m{i}", "endDate": end, "question": "Yes"}],
+        }
+        for i, volume in enumerate(volumes)
+    ]
+
+
+def test_budget_cuts_lowest_volume_events():
+    original = (
+        llm_pool.LLM_MAX_CALLS,
+        llm_pool.LLM_CONCURRENCY,
+        llm_pool.LLM_BATCH_SIZE,
+        llm_cache.LLM_CACHE_ENABLED,
+        build_index.LOCAL_TIER,
+        build_index._zhipu_chat_completion_live,
+    )
+    try:
+        llm_pool.LLM_MAX_CALLS = 2
+        # One worker, so the budget check before each event sees every earlier call.
+        llm_pool.LLM_CONCURRENCY = 1
+        llm_pool.LLM_BATCH_SIZE = 1
+        llm_cache.LLM_CACHE_ENABLED = False
+        build_index.LOCAL_TIER = False
+        build_index._zhipu_chat_completion_live = (
+            lambda api_key, messages, model=build_index.MODEL_NAME: '{"keywords":["alpha"],"entityGroups":[["alpha"]]}'
+        )
+        # Gamma order puts the two biggest events last.
+        data = build_poly_gamma.build_poly_data(_events([2e4, 3e4, 5e6, 9e6]), "key", None, checkpoint=None)
+        assert sorted(k for k, e in data["events"].items() if e.get("needsAi")) == ["e0", "e1"]
+
+        # The next run backfills the events left as needsAi before any others.
+        llm_pool.LLM_MAX_CALLS = 1
+        data = build_poly_gamma.build_poly_data(_events([2e4, 3e4, 5e6, 9e6, 8e6]), "key", data, checkpoint=None)
+        assert sorted(k for k, e in data["events"].items() if e.get("needsAi")) == ["e0", "e4"]
+    finally:
+        (
+            llm_pool.LLM_MAX_CALLS,
+            llm_pool.LLM_CONCURRENCY,
+            llm_pool.LLM_BATCH_SIZE,
+            llm_cache.LLM_CACHE_ENABLED,
+            build_index.LOCAL_TIER,
+            build_index._zhipu_chat_completion_live,
+        ) = original
+
+
+if __name__ == "__main__":
+    test_budget_cuts_lowest_volume_events()
+    print("✓ PASS: budget follows volume")
+    print("All tests passed! ✓")
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""Test that Gamma server-side filters never drop events the local filters would keep"""
+import os
+
+import build_poly_gamma
+
+
+def test_only_volume_is_pushed_down():
+    original = (build_poly_gamma.SERVER_FILTERS, os.environ.get("POLY_MIN_VOLUME_NUM"))
+    try:
+        build_poly_gamma.SERVER_FILTERS = True
+        os.environ["POLY_MIN_VOLUME_NUM"] = "25000"
+        # Events without an endDate pass the local expiry check, so the expiry
+        # bound must not be sent as `end_date_min`.
+        assert build_poly_gamma._server_filter_params() == {"volume_min": "25000"}
+        os.environ["POLY_MIN_VOLUME_NUM"] = "0"
+        assert build_poly_gamma._server_filter_params() == {}
+        build_poly_gamma.SERVER_FILTERS = False
+        os.environ["POLY_MIN_VOLUME_NUM"] = "25000"
+        assert build_poly_gamma._server_filter_params() == {}
+    finally:
+        build_poly_gamma.SERVER_FILTERS = original[0]
+        if original[1] is None:
+            os.environ.pop("POLY_MIN_VOLUME_NUM", None)
+        else:
+            os.environ["POLY_MIN_VOLUME_NUM"] = original[1]
+
+
+if __name__ == "__main__":
+    test_only_volume_is_pushed_down()
+    print("✓ PASS: server-side filters")
+    print("All tests passed! ✓")
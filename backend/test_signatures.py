@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""Test v2 event signatures and the compatibility path for pre-v2 (djb2) signatures"""
+import copy
+import os
+import tempfile
+import time
+
+import build_index
+import build_poly_gamma
+import llm_checkpoint
+
+TITLE = "Fed decision in March?"
+MARKET_IDS = ["1", "2", "3"]
+OPTIONS = ["No change", "25 bps cut", "50+ bps cut"]
+RULES = "Resolves per FOMC statement."
+
+
+def test_v2_signatures_are_prefixed_and_unambiguous():
+    core = build_index._event_signature_core(TITLE, RULES)
+    assert core.startswith(build_index.SIGNATURE_PREFIX) and len(core) == 3 + 32
+    assert core == build_index._event_signature_core(f"  {TITLE} ", RULES + "\n")
+    # Field boundaries are length-prefixed, so shifting text between fields changes the hash.
+    assert build_index._event_signature_core("ab", "c") != build_index._event_signature_core("a", "bc")
+    full = build_index._event_signature_full
+    assert full(TITLE, MARKET_IDS, ["a", "b"], "") != full(TITLE, MARKET_IDS, ["a"], "b")
+    assert full(TITLE, MARKET_IDS, OPTIONS, RULES) == full(TITLE, MARKET_IDS, list(reversed(OPTIONS)) + OPTIONS, RULES)
+    assert full(TITLE, MARKET_IDS, OPTIONS, RULES) != full(TITLE, MARKET_IDS[:2], OPTIONS, RULES)
+    # Lone surrogates decoded from JSON still hash.
+    assert build_index._event_signature_core("\ud800", "").startswith("v2:")
+
+
+def test_legacy_signatures_still_match():
+    legacy_full = "26017d27"
+    assert build_index._legacy_event_signature_full(TITLE, MARKET_IDS, OPTIONS, RULES) == legacy_full
+    current = build_index._event_signature_full(TITLE, MARKET_IDS, OPTIONS, RULES)
+    legacy = lambda: build_index._legacy_event_signature_full(TITLE, MARKET_IDS, OPTIONS, RULES)  # noqa: E731
+    assert build_index._signature_matches(legacy_full, current, legacy)
+    assert build_index._signature_matches(current, current, legacy)
+    assert not build_index._signature_matches("deadbeef", current, legacy)
+    # A v2 mismatch never falls back to the legacy hash.
+    assert not build_index._signature_matches("v2:" + "0" * 32, current, legacy)
+
+
+def test_poly_reuses_output_stored_with_legacy_signatures():
+    sig_core = build_index._event_signature_core(TITLE, RULES)
+    sig_full = build_index._event_signature_full(TITLE, MARKET_IDS, OPTIONS, RULES)
+    prev = {
+        "sig": build_index._legacy_event_signature_full(TITLE, MARKET_IDS, OPTIONS, RULES),
+        "sigCore": build_index._legacy_event_signature_core(TITLE, RULES),
+        "keywords": ["fed"],
+        "entities": ["federal reserve"],
+        "entityGroups": [["federal reserve", "fed"]],
+    }
+    migrated = build_poly_gamma._migrate_previous_signatures(prev, TITLE, MARKET_IDS, OPTIONS, RULES, sig_core, sig_full)
+    assert (migrated["sigCore"], migrated["sigFull"]) == (sig_core, sig_full)
+    assert build_poly_gamma._reuse_previous_keywords(migrated, sig_core, sig_full)[2] == [["federal reserve", "fed"]]
+
+    changed_core = build_index._event_signature_core(TITLE, "New rules.")
+    changed_full = build_index._event_signature_full(TITLE, MARKET_IDS, OPTIONS, "New rules.")
+    stale = build_poly_gamma._migrate_previous_signatures(prev, TITLE, MARKET_IDS, OPTIONS, "New rules.", changed_core, changed_full)
+    assert stale["sigCore"] == prev["sigCore"]
+    assert build_poly_gamma._reuse_previous_keywords(stale, changed_core, changed_full) is None
+
+
+def test_checkpoint_resumes_entries_with_legacy_signatures():
+    path = os.path.join(tempfile.mkdtemp(), "test-llm-checkpoint.jsonl")
+    legacy_core = build_index._legacy_event_signature_core(TITLE, RULES)
+    llm_checkpoint.Journal("test", path=path, enabled=True).record("7", legacy_core, ["fed"], ["fed"], [["fed"]])
+    journal = llm_checkpoint.Journal("test", path=path, enabled=True)
+    journal.load()
+    sig_core = build_index._event_signature_core(TITLE, RULES)
+    assert journal.lookup("7", sig_core) is None
+    assert journal.lookup("7", sig_core, legacy_sig_core=lambda: legacy_core)["entityGroups"] == [["fed"]]
+    assert journal.lookup("7", sig_core, legacy_sig_core=lambda: "00000000") is None
+
+
+def test_incremental_build_rewrites_reused_events_as_v2():
+    cutoff = int(time.time()) + 86400
+    children = [
+        {"marketId": mid, "marketTitle": f"Above {mid}", "statusEnum": "Activated", "cutoffAt": cutoff, "rules": RULES,
+         "yesTokenId": f"y{mid}", "noTokenId": f"n{mid}"}
+        for mid in (21, 22)
+    ]
+    markets = [
+        {"marketId": 2, "marketTitle": TITLE, "statusEnum": "Activated", "cutoffAt": cutoff, "rules": RULES, "childMarkets": children}
+    ]
+    parents = {"2": {"cutoffAt": cutoff, "subMarkets": [{"marketId": "21"}, {"marketId": "22"}]}}
+    prev = {
+        "events": {"2": {"title": TITLE, "keywords": ["fed"], "entities": ["fed"], "entityGroups": [["fed"]],
+                         "sig": "26017d27", "sigFull": "26017d27", "sigCore": "1ccfa17e"}},
+        "markets": {"2": {"title": TITLE, "keywords": ["fed"], "entityGroups": [["fed"]], "sigCore": "1ccfa17e"}},
+    }
+    original = build_index.SKIP_AI
+    try:
+        build_index.SKIP_AI = True
+        data = build_index.build_data(copy.deepcopy(markets), None, previous_data=prev, parent_events=parents)
+    finally:
+        build_index.SKIP_AI = original
+    event = data["events"]["2"]
+    assert event["entityGroups"] == [["fed"]]
+    assert event["sigCore"] == build_index._event_signature_core(TITLE, RULES)
+    assert event["sig"] == event["sigFull"] and event["sigFull"].startswith(build_index.SIGNATURE_PREFIX)
+    assert data["markets"]["2"]["sigCore"] == event["sigCore"]
+
+
+if __name__ == "__main__":
+    test_v2_signatures_are_prefixed_and_unambiguous()
+    print("✓ PASS: v2 signatures")
+    test_legacy_signatures_still_match()
+    print("✓ PASS: legacy signatures")
+    test_poly_reuses_output_stored_with_legacy_signatures()
+    print("✓ PASS: poly migration")
+    test_checkpoint_resumes_entries_with_legacy_signatures()
+    print("✓ PASS: checkpoint migration")
+    test_incremental_build_rewrites_reused_events_as_v2()
+    print("✓ PASS: reused events rewritten as v2")
+    print("All tests passed! ✓")
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Test the streaming markets payload reader against the batch parser"""
+import json
+
+import build_index
+
+
+def _chunked(text, size):
+    data = text.encode("utf-8")
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+def _stream_flatten(text, size):
+    reader = build_index._JsonStreamReader(build_index._iter_text_chunks(_chunked(text, size)))
+    out = []
+    for item in build_index._iter_market_payload_items(reader):
+        out.extend(build_index._flatten_markets(item))
+    return out
+
+
+def _batch_flatten(text):
+    return build_index._markets_from_payload(json.loads(text))
+
+
+MARKETS = [
+    {
+        "marketId": 1,
+        "marketTitle": "Bitcoin 价格 above $100k?",
+        "cutoffAt": 1767225599,
+        "volume": 12.5e3,
+        "childMarkets": [
+            {"marketId": 11, "title": "Yes — \"quoted\"", "childMarkets": []},
+            {"marketId": 12, "title": "No", "childMarkets": [{"marketId": 121, "rules": "nested\nrules"}]},
+        ],
+    },
+    {"marketId": 2, "title": "Fed rate decision", "statusEnum": "Activated", "resolvedAt": None, "flag": True},
+    [{"marketId": 3}],
+    "ignored",
+    -7,
+]
+
+
+def test_stream_matches_batch_for_all_payload_variants():
+    variants = [
+        json.dumps(MARKETS, ensure_ascii=False),
+        json.dumps({"code": 0, "meta": {"x": [1, 2]}, "data": MARKETS}, ensure_ascii=False, indent=2),
+        json.dumps({"list": MARKETS, "total": 5}),
+        json.dumps({"list": [{"marketId": 9}], "total": 1, "data": MARKETS}),
+        json.dumps({"data": MARKETS, "list": [{"marketId": 9}]}),
+        json.dumps({"list": MARKETS, "data": None}),
+        "[]",
+        ' { "data" : [ ] } ',
+    ]
+    for text in variants:
+        expected = _batch_flatten(text)
+        for size in (1, 2, 3, 7, 64, 4096):
+            assert _stream_flatten(text, size) == expected, (text[:40], size)
+
+
+def test_stream_rejects_non_list_payload():
+    for text in ('{"data": {"a": 1}}', '{"error": "boom"}', "{}", '"nope"'):
+        try:
+            _stream_flatten(text, 3)
+        except ValueError:
+            continue
+        raise AssertionError(f"expected ValueError for {text!r}")
+
+
+def test_stream_yields_incrementally():
+    text = json.dumps(MARKETS + [{"marketId": 1000 + i} for i in range(200)])
+    chunks = iter(_chunked(text, 16))
+    consumed = []
+
+    def tracking():
+        for chunk in chunks:
+            consumed.append(len(chunk))
+            yield chunk
+
+    reader = build_index._JsonStreamReader(build_index._iter_text_chunks(tracking()))
+    first = next(build_index._iter_market_payload_items(reader))
+    assert first["marketId"] == 1
+    assert sum(consumed) < len(text.encode("utf-8"))
+
+
+if __name__ == "__main__":
+    test_stream_matches_batch_for_all_payload_variants()
+    print("✓ PASS: stream matches batch")
+    test_stream_rejects_non_list_payload()
+    print("✓ PASS: non-list payload rejected")
+    test_stream_yields_incrementally()
+    print("✓ PASS: items yielded before EOF")
+    print("All tests passed! ✓")
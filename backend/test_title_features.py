@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""Test that title helpers give the same answers for a TitleFeatures as for the plain title"""
+import re
+
+import build_index
+
+TITLES = [
+    "Will the Fed cut rates in March 2026?",
+    "BTC/USDT above $100k by December 31?",
+    "  Ethereum ETF approved?  ",
+    "CZ pardoned before 2027?",
+    "Will Changpeng Zhao return to Binance?",
+    "EPL: Arsenal vs Chelsea",
+    "Premier League winner: fedex-cup? (btc_eth, czech)",
+    "KPL: KSG vs DYG (Feb. 26 7:00AM ET)",
+    "",
+]
+
+
+def test_features_match_string_derivation():
+    for title in TITLES:
+        features = build_index.TitleFeatures(title)
+        lower = title.lower()
+        assert features.text == title.strip()
+        assert features.compact == build_index._compact_alnum(title)
+        assert list(features.tokens) == build_index._simple_tokenize(title)
+        for word in ("btc", "eth", "fed", "cz", "epl"):
+            assert (word in features.words) == bool(re.search(rf"\b{word}\b", lower)), (title, word)
+
+
+def test_helpers_accept_features_or_string():
+    response = [["bitcoin"], ["federal reserve", "fed"], ["arsenal"], ["czech"]]
+    for title in TITLES:
+        features = build_index.TitleFeatures(title)
+        allow = {build_index._normalize_keyword(t) for t in build_index._allowed_entity_alias_terms_from_title(title)}
+        assert features.allow_terms == allow
+        assert build_index._fallback_entity_groups_from_title(features) == build_index._fallback_entity_groups_from_title(title)
+        assert build_index._title_ngram_keywords(features, 24) == build_index._title_ngram_keywords(title, 24)
+        assert build_index._local_keywords_and_entities(features) == build_index._local_keywords_and_entities(title)
+        assert build_index._normalize_entity_groups(response, features, allow) == build_index._normalize_entity_groups(response, title, allow)
+        assert build_index._repair_entity_groups(response, [], [], features, allow) == build_index._repair_entity_groups(response, [], [], title, allow)
+
+
+if __name__ == "__main__":
+    test_features_match_string_derivation()
+    print("✓ PASS: feature derivation")
+    test_helpers_accept_features_or_string()
+    print("✓ PASS: helpers")
+    print("All tests passed! ✓")
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""Test that the regex tokenizer returns the same tokens as the per-character loop it replaced"""
+import random
+
+import build_index
+
+
+def _legacy_simple_tokenize(text):
+    """The per-character `_simple_tokenize` before it became a compiled regex."""
+    if not text:
+        return []
+    s = str(text)
+    out = []
+    cur = []
+
+    def alnum(c):
+        o = ord(c)
+        return (48 <= o <= 57) or (65 <= o <= 90) or (97 <= o <= 122)
+
+    for i, ch in enumerate(s):
+        if alnum(ch):
+            cur.append(ch.lower())
+            continue
+        if ch in "/-" and cur and i + 1 < len(s) and alnum(s[i + 1]):
+            cur.append(ch)
+            continue
+        if ch == "$":
+            if cur:
+                out.append("".join(cur))
+                cur = []
+            cur.append("$")
+            continue
+        if cur:
+            out.append("".join(cur))
+            cur = []
+    if cur:
+        out.append("".join(cur))
+    return out
+
+
+def test_documented_rules():
+    tokenize = build_index._simple_tokenize
+    assert tokenize("BTC/USDT above $100k?") == ["btc/usdt", "above", "$100k"]
+    assert tokenize("GPT-6 released by June-30") == ["gpt-6", "released", "by", "june-30"]
+    assert tokenize("a$btc $$eth $ -5 x/ /y a--b") == ["a", "$btc", "$", "$eth", "$", "5", "x", "y", "a", "b"]
+    assert tokenize("") == [] and tokenize(None) == [] and tokenize(" ?! ") == []
+    # Non-ASCII letters never join a token, even ones that lowercase to ASCII.
+    assert tokenize("Kelvin İstanbul café") == ["elvin", "stanbul", "caf"]
+
+
+def test_random_text_matches_legacy():
+    rng = random.Random(23)
+    alphabet = "aZq09$/-_ .,?!\t\n:()#'\"éKİ中²０"
+    for _ in range(5000):
+        text = "".join(rng.choices(alphabet, k=rng.randint(0, 40)))
+        assert build_index._simple_tokenize(text) == _legacy_simple_tokenize(text), repr(text)
+
+
+def test_non_string_input_matches_legacy():
+    for value in (12345, 3.5, ["a/b"], 0, False):
+        assert build_index._simple_tokenize(value) == _legacy_simple_tokenize(value), value
+
+
+if __name__ == "__main__":
+    test_documented_rules()
+    print("✓ PASS: documented rules")
+    test_random_text_matches_legacy()
+    print("✓ PASS: random text")
+    test_non_string_input_matches_legacy()
+    print("✓ PASS: non-string input")
+    print("All tests passed! ✓")